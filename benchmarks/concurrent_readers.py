@@ -0,0 +1,74 @@
+"""stress test IntentEngine snapshots
+
+many reader threads score utterances while a writer keeps registering and
+deregistering intents on the same engine, readers must never fail and
+must always see the intents that are never removed
+"""
+import random
+import threading
+import time
+
+from text_engine import Keyword, KeywordIntent, IntentEngine
+
+READERS = 16
+DURATION = 3.0
+
+
+def main():
+    engine = IntentEngine()
+    look = Keyword(name="look")
+    vocabulary = [Keyword(name=f"word{i}") for i in range(200)]
+    engine.register_intent(KeywordIntent(name="look", required=[look], optional=vocabulary[:5]))
+
+    stop = threading.Event()
+    errors = []
+    reads = [0] * READERS
+    writes = [0]
+
+    def reader(idx: int):
+        rng = random.Random(idx)
+        while not stop.is_set():
+            utterance = "look " + " ".join(rng.sample([k.name for k in vocabulary], 3))
+            try:
+                intent, score = engine.calc_intent(utterance)
+                assert intent is not None and score >= 0.8, utterance
+                engine.calc_intents(utterance)
+            except Exception as e:  # report, don't kill the stress test
+                errors.append(repr(e))
+                return
+            reads[idx] += 1
+
+    def writer():
+        rng = random.Random(-1)
+        i = 0
+        while not stop.is_set():
+            name = f"scene_{i % 500}"
+            if rng.random() < 0.5:
+                engine.register_intent(KeywordIntent(name=name, required=rng.sample(vocabulary, 2)))
+            else:
+                engine.deregister_intent(name)
+            if i % 100 == 0:
+                with engine.batch():
+                    for j in range(10):
+                        engine.register_intent(KeywordIntent(name=f"batch_{j}", required=[look]))
+            i += 1
+            writes[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(DURATION)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"{sum(reads)} reads and {writes[0]} writes in {DURATION}s with {READERS} readers")
+    if errors:
+        print(f"FAILED: {len(errors)} errors, first: {errors[0]}")
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""benchmark turn latency of well behaved players under skewed load
+
+regular players send a command, wait for the reply and think for a
+moment. Meanwhile one player spams commands as fast as they can and
+another triggers a handler burning 50 ms of CPU on every turn
+
+the same load runs on a plain FIFO thread pool and on SessionScheduler,
+the regular players' p99 latency should stay bounded with the scheduler
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from text_engine import GameHandlers, GameIntents, GameScene, IFGameEngine, IntentEngine, Keyword, KeywordIntent
+from text_engine.hosting import TurnResult
+from text_engine.sessions import SessionQuota, SessionScheduler
+from text_engine.utils import percentile
+
+PLAYERS = 20
+THINK = 0.02
+HEAVY = 0.05
+SPAM_BURST = 100  # commands sent every millisecond
+WORKERS = 4
+DURATION = 5.0
+
+
+def heavy(game: IFGameEngine, utterance: str) -> str:
+    end = time.perf_counter() + HEAVY
+    while time.perf_counter() < end:
+        pass
+    return "the walls groan"
+
+
+def make_game(session_id: str, seed: Optional[int]) -> IFGameEngine:
+    intents = GameIntents(parser=IntentEngine(), intents=[
+        KeywordIntent("look", [Keyword("look")], handler=lambda g, u: "a dusty room"),
+        KeywordIntent("heavy", [Keyword("heavy")], handler=heavy)])
+    return IFGameEngine([GameScene("a dusty room", intents=intents)],
+                        GameHandlers(is_win=lambda g: False, is_loss=lambda g: False), seed=seed)
+
+
+class FifoHost:
+    """one shared queue, turns of a session serialized by a lock"""
+
+    def __init__(self, workers: int):
+        self.pool = ThreadPoolExecutor(workers)
+        self.games: Dict[str, IFGameEngine] = {}
+        self.locks: Dict[str, threading.Lock] = {}
+
+    def open(self, session_id: str) -> None:
+        game = make_game(session_id, 0)
+        game.handlers = replace(game.handlers, on_print=lambda g, text: None)
+        game.begin()
+        self.games[session_id] = game
+        self.locks[session_id] = threading.Lock()
+
+    def submit(self, session_id: str, utterance: str) -> 'Future[TurnResult]':
+        return self.pool.submit(self._turn, session_id, utterance)
+
+    def _turn(self, session_id: str, utterance: str) -> TurnResult:
+        with self.locks[session_id]:
+            return TurnResult(running=self.games[session_id].turn(utterance))
+
+    def stop(self) -> None:
+        self.pool.shutdown()
+
+
+def player(host, session_id: str, stop: threading.Event, latencies: List[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        host.submit(session_id, "look").result()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(THINK)
+
+
+def spammer(host, stop: threading.Event) -> None:
+    pending = []
+    while not stop.is_set():
+        pending += [host.submit("spammer", "look") for _ in range(SPAM_BURST)]
+        time.sleep(0.001)
+    for reply in pending:
+        reply.cancel()
+
+
+def slow(host, stop: threading.Event) -> None:
+    while not stop.is_set():
+        host.submit("slow", "heavy").result()
+
+
+def run(host) -> List[float]:
+    for session_id in ["spammer", "slow"] + [f"player{i}" for i in range(PLAYERS)]:
+        host.open(session_id)
+    stop = threading.Event()
+    latencies: List[float] = []
+    threads = [threading.Thread(target=player, args=(host, f"player{i}", stop, latencies))
+               for i in range(PLAYERS)]
+    threads += [threading.Thread(target=spammer, args=(host, stop)),
+                threading.Thread(target=slow, args=(host, stop))]
+    for t in threads:
+        t.start()
+    time.sleep(DURATION)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    print(f"{name:>16} | {len(latencies):>6} | {percentile(latencies, 50) * 1000:>7.1f} | "
+          f"{percentile(latencies, 99) * 1000:>7.1f}")
+
+
+if __name__ == "__main__":
+    print(f"{'host':>16} | {'turns':>6} | {'p50 ms':>7} | {'p99 ms':>7}")
+    fifo = FifoHost(WORKERS)
+    try:
+        report("fifo pool", run(fifo))
+    finally:
+        fifo.stop()
+    quota = SessionQuota(rate=20, burst=5, max_queue=4, turn_budget=0.02, penalty=2.0)
+    with SessionScheduler(make_game, workers=WORKERS, quota=quota) as scheduler:
+        report("SessionScheduler", run(scheduler))
+        metrics = scheduler.metrics()
+    print(f"rate limited {metrics.rate_limited}, queue full {metrics.queue_full}, timeouts {metrics.timeouts}")
@@ -0,0 +1,85 @@
+"""benchmark memory footprint of the compact data classes
+
+compares the regular Keyword, KeywordIntent, GameScene and GameObject
+dataclasses with the slotted variants from text_engine.compact, first per
+object and then for whole worlds loaded by several sessions
+
+samples are rebuilt for every keyword, like they are when loaded from
+.voc files, so the benefit of interning them shows up across sessions
+"""
+import gc
+import tracemalloc
+from typing import Callable
+
+from text_engine import Keyword, KeywordIntent, IntentEngine, GameScene, GameObject, GameIntents
+from text_engine.compact import (CompactKeyword, FrozenKeyword, CompactKeywordIntent,
+                                 FrozenKeywordIntent, CompactGameScene, CompactGameObject)
+
+N_OBJECTS = 10000
+SCENES = 100
+OBJECTS_PER_SCENE = 5
+INTENTS_PER_OBJECT = 3
+SESSIONS = 5
+
+
+def samples(i: int):
+    # fresh string objects, like every load of a .voc file creates
+    return ["".join(["sample ", str(i % 50), " ", s]) for s in ("a", "b", "c", "d")]
+
+
+def measure(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def per_object(keyword_cls, intent_cls, scene_cls, object_cls):
+    kws = [keyword_cls(f"kw{i}", samples(i)) for i in range(4)]
+    parser = GameIntents(intents=[], parser=IntentEngine())
+    return {
+        "keyword": measure(lambda: [keyword_cls(f"kw{i}", samples(i)) for i in range(N_OBJECTS)]),
+        "intent": measure(lambda: [intent_cls(f"intent{i}", required=kws[:1], optional=kws[1:])
+                                   for i in range(N_OBJECTS)]),
+        "scene": measure(lambda: [scene_cls(f"scene {i}") for i in range(N_OBJECTS)]),
+        "object": measure(lambda: [object_cls(kws[0], parser, "nothing happens")
+                                   for i in range(N_OBJECTS)]),
+    }
+
+
+def world(keyword_cls, intent_cls, scene_cls, object_cls):
+    scenes = []
+    for s in range(SCENES):
+        objects = []
+        for o in range(OBJECTS_PER_SCENE):
+            name = keyword_cls(f"object{s}_{o}", samples(o))
+            intents = [intent_cls(f"intent{i}", required=[keyword_cls(f"verb{i}", samples(i)), name])
+                       for i in range(INTENTS_PER_OBJECT)]
+            objects.append(object_cls(name, GameIntents(intents=intents, parser=IntentEngine()),
+                                      "nothing happens"))
+        scenes.append(scene_cls(f"you are in room {s}", game_objects=objects))
+    return scenes
+
+
+if __name__ == "__main__":
+    regular = (Keyword, KeywordIntent, GameScene, GameObject)
+    compact = (CompactKeyword, CompactKeywordIntent, CompactGameScene, CompactGameObject)
+    frozen = (FrozenKeyword, FrozenKeywordIntent, CompactGameScene, CompactGameObject)
+
+    print(f"bytes per object ({N_OBJECTS} instances)")
+    print(f"{'type':>8} | {'regular':>8} | {'compact':>8} | {'frozen':>8}")
+    results = [per_object(*classes) for classes in (regular, compact, frozen)]
+    for kind in results[0]:
+        print(f"{kind:>8} | " + " | ".join(f"{r[kind] / N_OBJECTS:>8.1f}" for r in results))
+
+    print(f"\nKiB per world ({SCENES} scenes x {OBJECTS_PER_SCENE} objects x "
+          f"{INTENTS_PER_OBJECT} intents), {SESSIONS} sessions")
+    print(f"{'sessions':>8} | {'regular':>8} | {'compact':>8} | {'frozen':>8}")
+    for n in (1, SESSIONS):
+        sizes = [measure(lambda: [world(*classes) for _ in range(n)]) / 1024
+                 for classes in (regular, compact, frozen)]
+        print(f"{n:>8} | " + " | ".join(f"{size:>8.0f}" for size in sizes))
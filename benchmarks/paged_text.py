@@ -0,0 +1,58 @@
+"""benchmark reading one page of a large in-game book
+
+compares reading and decoding the whole file to pick a page, what
+get_text used to do on every call, with the memory mapped TextStore that
+indexes the file once and decodes only the requested page
+"""
+import os
+import random
+import tempfile
+import time
+
+from text_engine.dialog import DialogRenderer
+
+PAGES = 2000
+PARAGRAPHS_PER_PAGE = 8
+READS = 2000
+
+
+def write_book(directory: str) -> None:
+    rng = random.Random(0)
+    words = "the old tome whispers of drowned cities and stars that are not right".split()
+    with open(os.path.join(directory, "book.txt"), "w") as f:
+        for _ in range(PAGES):
+            for _ in range(PARAGRAPHS_PER_PAGE):
+                f.write(" ".join(rng.choice(words) for _ in range(60)) + "\n")
+            f.write("\n")
+
+
+def read_whole(directory: str, page: int) -> str:
+    with open(os.path.join(directory, "book.txt")) as f:
+        return f.read().split("\n\n")[page]
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        write_book(directory)
+        size = os.path.getsize(os.path.join(directory, "book.txt"))
+        rng = random.Random(1)
+        pages = [rng.randrange(PAGES) for _ in range(READS)]
+
+        start = time.perf_counter()
+        for page in pages[:100]:
+            read_whole(directory, page)
+        whole = (time.perf_counter() - start) / 100
+
+        renderer = DialogRenderer(directory)
+        start = time.perf_counter()
+        renderer.get_document("book")
+        index = time.perf_counter() - start
+        start = time.perf_counter()
+        for page in pages:
+            renderer.get_text("book", page=page)
+        paged = (time.perf_counter() - start) / READS
+
+        assert renderer.get_text("book", page=pages[0]) == read_whole(directory, pages[0])
+        print(f"book: {size / 1024 / 1024:.1f} MiB, {PAGES} pages")
+        print(f"read whole file per page: {whole * 1e6:10.1f} us")
+        print(f"mapped page read:         {paged * 1e6:10.1f} us (index built once in {index * 1000:.1f} ms)")
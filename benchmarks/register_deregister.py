@@ -0,0 +1,53 @@
+"""benchmark incremental intent registration
+
+registers and deregisters thousands of intents on IntentEngines of
+increasing size, per-operation cost should stay flat as the total
+number of registered intents grows, both with intents spread over a
+random vocabulary and with every intent anchored on the same verb, the
+usual case of one required verb per intent
+
+IntentEngine publishes a new index snapshot on every change, snapshots
+are ``immutables`` maps that share structure, so a change only copies
+the paths it touches
+"""
+import random
+import time
+
+from text_engine import Keyword, KeywordIntent, IntentEngine
+
+VOCABULARY = [Keyword(name=f"word{i}") for i in range(500)]
+USE = Keyword(name="use")
+CYCLES = 5000
+
+
+def make_intent(name: str, rng: random.Random) -> KeywordIntent:
+    return KeywordIntent(name=name,
+                         required=rng.sample(VOCABULARY, 2),
+                         optional=rng.sample(VOCABULARY, 3))
+
+
+def make_verb_intent(name: str, rng: random.Random) -> KeywordIntent:
+    return KeywordIntent(name=name,
+                         required=[USE],
+                         optional=rng.sample(VOCABULARY, 3))
+
+
+def bench(n_intents: int, rng: random.Random, make=make_intent) -> float:
+    engine = IntentEngine()
+    for i in range(n_intents):
+        engine.register_intent(make(f"world_{i}", rng))
+    scene_intents = [make(f"scene_{i}", rng) for i in range(CYCLES)]
+    start = time.perf_counter()
+    for intent in scene_intents:
+        engine.register_intent(intent)
+        engine.deregister_intent(intent.name)
+    elapsed = time.perf_counter() - start
+    assert len(engine.intents) == n_intents
+    return elapsed / CYCLES * 1e6
+
+
+if __name__ == "__main__":
+    rng = random.Random(42)
+    print(f"{'intents':>8} | {'random anchors us':>17} | {'shared verb us':>14}  (per register+deregister)")
+    for n in (10, 100, 1000, 10000, 50000):
+        print(f"{n:>8} | {bench(n, rng):>17.2f} | {bench(n, rng, make_verb_intent):>14.2f}")
@@ -0,0 +1,46 @@
+"""benchmark full games of EldritchEscape through transcript replay
+
+plays a scripted session once while recording it, then replays the
+transcript many times with no I/O, checking every replay reproduces the
+recorded output exactly and reporting turns per second
+"""
+import os.path
+import sys
+
+ELDRITCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eldritch_escape")
+sys.path.insert(0, ELDRITCH_DIR)
+
+from eldritch_escape import EldritchEscape
+from text_engine.replay import record, replay
+
+SEED = 1234
+REPLAYS = 200
+SCRIPT = ["look", "look at the altar", "take the key", "listen to the cassette", "read the book",
+          "smell the slime", "open the door", "help", "look at the mirror", "destroy the mirror",
+          "touch the painting", "drop the key", "listen to the cassette", "move the floorboards"]
+
+
+def make_game(seed: int) -> EldritchEscape:
+    return EldritchEscape(locale_directory=ELDRITCH_DIR, seed=seed)
+
+
+def scripted_input(game: EldritchEscape, prompt: str) -> str:
+    if game.current_turn > len(SCRIPT):
+        raise EOFError
+    return SCRIPT[game.current_turn - 1]
+
+
+if __name__ == "__main__":
+    game = EldritchEscape(locale_directory=ELDRITCH_DIR, seed=SEED,
+                          on_input=scripted_input, on_print=lambda g, text: None)
+    transcript = record(game)
+    game.run()
+    print(f"recorded {len(transcript.inputs)} turns, {len(transcript.outputs)} outputs")
+
+    turns, seconds = 0, 0.0
+    for _ in range(REPLAYS):
+        result = replay(make_game, transcript)
+        assert result.matched, f"replay diverged at output {result.mismatch}"
+        turns += result.turns
+        seconds += result.seconds
+    print(f"{REPLAYS} replays: {turns} turns in {seconds:.3f}s, {turns / seconds:.0f} turns/s")
@@ -0,0 +1,32 @@
+"""benchmark per turn overhead of the turn scheduler
+
+plays turns of a minimal game while more and more events are pending far
+in the future, plus a few repeating events firing every turn, the cost of
+a turn should stay flat as the number of pending events grows
+"""
+import time
+
+from text_engine import IFGameEngine, GameHandlers, GameScene
+
+TURNS = 20000
+
+
+def bench(pending: int) -> float:
+    game = IFGameEngine([GameScene("an empty room")],
+                        GameHandlers(is_win=lambda g: False, is_loss=lambda g: False,
+                                     on_print=lambda g, text: None))
+    for i in range(pending):
+        game.schedule_at(TURNS + 1000 + i, lambda g: None)
+    for i in range(10):
+        game.schedule_every(1 + i % 3, lambda g: None)
+    game.begin()
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        game.turn("look")
+    return (time.perf_counter() - start) / TURNS * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'pending':>8} | us per turn")
+    for n in (0, 100, 10000, 1000000):
+        print(f"{n:>8} | {bench(n):.2f}")
@@ -0,0 +1,90 @@
+"""benchmark ShardedHost throughput from 1 to N worker processes
+
+client threads play EldritchEscape sessions back to back with no think
+time, the dialogs are loaded once by the parent and shared with the
+forked workers, throughput should grow with the number of workers up to
+the number of cores
+
+at the end a session is migrated between workers mid game to check it
+keeps playing from the same state
+"""
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine.dialog import DialogRenderer
+from text_engine.hosting import ShardedHost
+from text_engine.loadtest import make_utterance, scene_intents
+
+ELDRITCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "eldritch_escape")
+CLIENTS = 32
+DURATION = 5.0
+MAX_WORKERS = os.cpu_count() or 1
+
+DIALOGS = DialogRenderer(os.path.join(ELDRITCH_DIR, "en", "dialogs"))
+INTENTS = scene_intents(EldritchEscape(ELDRITCH_DIR))
+
+
+def preload() -> None:
+    DIALOGS.preload()
+
+
+def make_session(session_id: str, seed: Optional[int]) -> EldritchEscape:
+    return EldritchEscape(ELDRITCH_DIR, seed=seed, dialog_renderer=DIALOGS)
+
+
+def client(host: ShardedHost, idx: int, stop: threading.Event, counts: list) -> None:
+    rng = random.Random(idx)
+    games = 0
+    while not stop.is_set():
+        session_id = f"client{idx}-game{games}"
+        games += 1
+        host.open(session_id, seed=rng.randrange(2 ** 32))
+        running = True
+        while running and not stop.is_set():
+            running = host.turn(session_id, make_utterance(INTENTS, rng)).running
+            counts[idx] += 1
+        if running:
+            host.close(session_id)
+
+
+def bench(workers: int) -> float:
+    with ShardedHost(make_session, workers=workers, preload=preload) as host:
+        stop = threading.Event()
+        counts = [0] * CLIENTS
+        threads = [threading.Thread(target=client, args=(host, i, stop, counts)) for i in range(CLIENTS)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        return sum(counts) / (time.perf_counter() - start)
+
+
+def check_migration() -> None:
+    with ShardedHost(make_session, workers=2, preload=preload) as host:
+        script = ["take the key", "read the book", "look", "smell the slime", "listen to the cassette"]
+        host.open("a", seed=7)
+        host.open("b", seed=7)
+        for utterance in script[:2]:
+            host.turn("a", utterance)
+            host.turn("b", utterance)
+        host.migrate("b", 1 - host.worker_of("b"))
+        for utterance in script[2:]:
+            assert host.turn("a", utterance).output == host.turn("b", utterance).output
+    print("migration: ok")
+
+
+if __name__ == "__main__":
+    print(f"{'workers':>7} | {'turns/s':>8} | speedup")
+    base = None
+    for n in range(1, MAX_WORKERS + 1):
+        tps = bench(n)
+        base = base or tps
+        print(f"{n:>7} | {tps:>8.0f} | {tps / base:.2f}x")
+    check_migration()
@@ -0,0 +1,71 @@
+"""benchmark cold start: import time and time to the first turn of EldritchEscape
+
+every measurement runs in a fresh interpreter, the median of several runs
+is compared with a budget and the script exits with an error when a budget
+is exceeded, so it can guard against startup regressions in CI
+
+also fails if modules that should only load on first use (json_database,
+quebra_frases) were imported to play the first turn
+"""
+import argparse
+import json
+import os.path
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import text_engine
+package = time.perf_counter()
+from text_engine import IFGameEngine
+engine = time.perf_counter()
+from eldritch_escape.eldritch_escape import EldritchEscape
+game = EldritchEscape(on_print=lambda g, text: None, seed=0)
+game.begin()
+game.turn("look around")
+turn = time.perf_counter()
+print(json.dumps({"import text_engine": package - start,
+                  "import engine": engine - start,
+                  "first turn": turn - start,
+                  "lazy modules loaded": [m for m in LAZY if m in sys.modules]}))
+"""
+
+LAZY = ["json_database", "quebra_frases"]
+
+# milliseconds, generous enough for slow CI machines
+BUDGETS = {"import text_engine": 20, "import engine": 150, "first turn": 400}
+
+
+def probe() -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run([sys.executable, "-c", f"LAZY = {LAZY!r}\n{PROBE}"],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="measure text_engine cold start")
+    parser.add_argument("--runs", type=int, default=7)
+    for name, budget in BUDGETS.items():
+        parser.add_argument("--" + name.replace(" ", "-"), type=float, default=budget,
+                            help=f"budget for '{name}' in ms (default {budget})")
+    args = parser.parse_args()
+
+    probe()  # writes the bytecode caches, not part of the measurement
+    runs = [probe() for _ in range(args.runs)]
+    failed = False
+    for name in BUDGETS:
+        budget = getattr(args, name.replace(" ", "_"))
+        median = statistics.median(run[name] for run in runs) * 1000
+        ok = median <= budget
+        failed |= not ok
+        print(f"{name:>18}: {median:7.1f} ms (budget {budget:.0f} ms) {'ok' if ok else 'OVER BUDGET'}")
+    loaded = sorted({m for run in runs for m in run["lazy modules loaded"]})
+    if loaded:
+        failed = True
+        print(f"modules imported before first use: {', '.join(loaded)}")
+    sys.exit(1 if failed else 0)
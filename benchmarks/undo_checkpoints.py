@@ -0,0 +1,73 @@
+"""benchmark keeping the last turns of a session restorable
+
+compares deep copying the whole game state before every turn with the
+CheckpointRing, which only copies the state fields a turn changed, by
+time per turn, memory per checkpoint and time to restore the oldest turn
+"""
+import random
+import time
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine.loadtest import make_utterance, scene_intents
+from text_engine.memory import MemoryWalker
+
+TURNS = 200
+DEPTH = 20
+
+
+def make_game(checkpoints: int) -> EldritchEscape:
+    game = EldritchEscape(seed=0, on_print=lambda g, text: None, checkpoints=checkpoints)
+    # a scene with more state, like a bigger game, so copying all of it shows
+    scene = game.active_scene
+    scene.journal = [f"entry {i}: the walls whisper" for i in range(500)]
+    scene.state_fields = scene.state_fields + ("journal",)
+    game.begin()
+    return game
+
+
+def play(game: EldritchEscape, before_turn=None) -> float:
+    rng = random.Random(0)
+    intents = scene_intents(game)
+    spent = 0.0
+    for _ in range(TURNS):
+        start = time.perf_counter()
+        if before_turn:
+            before_turn(game)
+        game.turn(make_utterance(intents, rng))
+        spent += time.perf_counter() - start
+        game.running.set()  # keep playing after a loss
+    return spent / TURNS
+
+
+def size_of(*roots) -> int:
+    walker = MemoryWalker()
+    walker.add("all", *roots)
+    return walker.report.total
+
+
+if __name__ == "__main__":
+    baseline = make_game(0)
+    plain = play(baseline)
+
+    game = make_game(0)
+    snapshots = []
+    per_turn = play(game, lambda g: snapshots.append(g.get_state()))
+    snapshots = snapshots[-DEPTH:]
+    start = time.perf_counter()
+    game.set_state(snapshots[0])
+    restore = time.perf_counter() - start
+    print(f"{'approach':>16} | {'turn us':>8} | {'bytes/checkpoint':>16} | {'restore oldest us':>17}")
+    print(f"{'deepcopy':>16} | {(per_turn - plain) * 1e6:>8.1f} | {size_of(snapshots) / DEPTH:>16.0f} | "
+          f"{restore * 1e6:>17.1f}")
+
+    game = make_game(DEPTH)
+    per_turn = play(game)
+    ring = game.checkpoints
+    # what the ring holds beyond the newest checkpoint, a full copy of the state
+    walker = MemoryWalker(shared=[ring[-1]])
+    walker.add("all", list(ring))
+    start = time.perf_counter()
+    game.undo(DEPTH)
+    restore = time.perf_counter() - start
+    print(f"{'CheckpointRing':>16} | {(per_turn - plain) * 1e6:>8.1f} | "
+          f"{walker.report.session_total / (DEPTH - 1):>16.0f} | {restore * 1e6:>17.1f}")
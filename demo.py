@@ -1,5 +1,5 @@
 """simple single scene game with no game objects"""
-from text_engine import (GameHandlers, GameScene, Keyword, KeywordIntent, GameIntents, IFGameEngine)
+from text_engine import (GameHandlers, GameScene, Keyword, KeywordIntent, GameIntents, IFGameEngine, IntentEngine)
 
 
 class TheRoom(GameScene):
@@ -43,10 +43,12 @@ class TheRoom(GameScene):
         # "back" intent in each object to refocus the scene
         # game.active_scene.active_object = -1
         super().__init__("you are in a dimly lit room",
+                         # each room gets its own parser, the handlers are bound to this room's state
                          intents=GameIntents([take_key_intent,
                                               look_intent,
                                               use_key_intent,
-                                              open_door_intent]))
+                                              open_door_intent],
+                                             parser=IntentEngine()))
 
     # scene logic/intents
     def on_take_key(self, game: IFGameEngine, utterance: str):
@@ -95,8 +97,8 @@ class EscapeRoom(IFGameEngine):
             scenes=[TheRoom()],
             handlers=GameHandlers(on_end=self.on_end,
                                   on_start=self.on_start,
-                                  on_win=lambda k: print("Congratulations! You escaped the room."),
-                                  on_lose=lambda k: print("You ran out of oxygen and died!"),
+                                  on_win=lambda k: k.print("Congratulations! You escaped the room."),
+                                  on_lose=lambda k: k.print("You ran out of oxygen and died!"),
                                   is_loss=self.is_loss, is_win=self.is_win))
 
     def on_start(self, game: IFGameEngine):
@@ -7,15 +7,19 @@ this allows easy translation while also abstracting the game engine away
 completely new games can be made by just changing resource files
 """
 import os.path
-import random
+from typing import Optional
 
 from text_engine import GameHandlers, GameScene, Keyword, KeywordIntent, GameIntents, IFGameEngine, IntentEngine
 from text_engine.dialog import DialogRenderer
 from text_engine.intents import BuiltinKeywords
 from text_engine.engine import GetUserInputHandler, PrintOutputHandler
+from text_engine.scheduler import depends_on
 
 
 class TheCursedRoom(GameScene):
+    # what changes during play, compared every turn for undo checkpoints
+    state_fields = ("active_object", "got_key", "n_listens", "inventory", "destroyed", "max_sanity", "sanity")
+
     def __init__(self, locale_folder: str, lang: str, default_response: str):
         self.got_key = False
         self.n_listens = 0
@@ -133,7 +137,7 @@ class TheCursedRoom(GameScene):
     def decrease_sanity(self, game: IFGameEngine, decrement: int):
         self.sanity -= decrement
         if self.sanity <= 0:
-            return f"{game.get_dialog('no_more_sanity')}\n{game.dialog_renderer.get_text('sanity')}: 0/{self.max_sanity}."
+            return f"{game.get_dialog('no_more_sanity')}\n{game.get_dialog('sanity_level', sanity=0, max_sanity=self.max_sanity)}"
         stages = [
             game.get_dialog("sanity_1"),
             game.get_dialog("sanity_2"),
@@ -142,11 +146,11 @@ class TheCursedRoom(GameScene):
             game.get_dialog("sanity_5")
         ]
         level = max(0, min(self.sanity // 2, len(stages) - 1))
-        return f"{stages[level]}\n{game.dialog_renderer.get_text('sanity')}: {self.sanity}/{self.max_sanity}."
+        return f"{stages[level]}\n{game.get_dialog('sanity_level', sanity=self.sanity, max_sanity=self.max_sanity)}"
 
     def increase_sanity(self, game: IFGameEngine, increment: int):
         self.sanity += increment
-        return f"{game.dialog_renderer.get_text('sanity')}: {self.sanity}/{self.max_sanity}."
+        return game.get_dialog("sanity_level", sanity=self.sanity, max_sanity=self.max_sanity)
 
     def escape_via_floorboards(self, game: IFGameEngine, utterance: str):
         # Sanity threshold to allow moving the floorboards
@@ -350,9 +354,9 @@ class TheCursedRoom(GameScene):
                 items.append(mirror_message)
             if "cassette" not in self.destroyed:
                 items.append(cassette_message)
-            if "painting" not in self.destroyed and random.choice([True, False, False]):
+            if "painting" not in self.destroyed and game.rng.choice([True, False, False]):
                 items.append(painting_message)
-            random.shuffle(items)
+            game.rng.shuffle(items)
 
             if game.current_turn > 5:
                 # after N turns start mentioning the floor to give a clue how to escape
@@ -423,7 +427,7 @@ class TheCursedRoom(GameScene):
             return game.get_dialog("touch_altar")
         elif self.slime.match(utterance):
             response = game.get_dialog("touch_slime")
-            sanity_impact = random.choice([1, 2, 3])
+            sanity_impact = game.rng.choice([1, 2, 3])
             return f"{response}\n{self.decrease_sanity(game, sanity_impact)}"
         else:
             return self.on_error(game, utterance)
@@ -452,10 +456,10 @@ class TheCursedRoom(GameScene):
         elif self.cassette.match(utterance):
             if "cassette" in self.destroyed:
                 return game.get_dialog("destroy_cassette_aftermath")
-            recordings = [l for l in game.dialog_renderer.get_text("listen_cassette").split("\n") if l]
-            if self.n_listens >= len(recordings):
+            recordings = game.dialog_renderer.get_document("listen_cassette")
+            if self.n_listens >= recordings.n_paragraphs:
                 return game.get_dialog("cassette_damaged")
-            response = game.get_dialog("listen_cassette_start") + "\n" + recordings[self.n_listens]
+            response = game.get_dialog("listen_cassette_start") + "\n" + recordings.paragraph(self.n_listens)
             self.n_listens += 1
             # if listened N times start to lose sanity
             if self.n_listens > 5 or self.sanity < self.max_sanity / 3:
@@ -493,29 +497,38 @@ class TheCursedRoom(GameScene):
 
 
 class EldritchEscape(IFGameEngine):
-    def __init__(self, locale_directory: str, lang: str = "en",
+    def __init__(self, locale_directory: str = os.path.dirname(__file__), lang: str = "en",
                  on_input: GetUserInputHandler = lambda g, u: input(u),
-                 on_print: PrintOutputHandler = lambda g, u: print(u)):
+                 on_print: PrintOutputHandler = lambda g, u: print(u),
+                 seed: Optional[int] = None,
+                 dialog_renderer: Optional[DialogRenderer] = None,
+                 checkpoints: int = 0):
         # on_input and on_print can be used to e.g. wrap the game in a voice interface
-        dialog_directory = os.path.join(locale_directory, lang, "dialogs")
-        dialog_renderer = DialogRenderer(dialog_directory)
-        default_response = dialog_renderer.get_dialog("default") + "\n" + dialog_renderer.get_dialog("help_commands")
+        # seed makes the session reproducible, e.g. to replay a recorded transcript
+        # dialog_renderer can be shared by many sessions, e.g. preloaded before forking workers
+        # checkpoints is how many turns game.undo() can take back, e.g. after destroying the cassette,
+        # off by default so hosted sessions and benchmarks don't pay for it
+        if dialog_renderer is None:
+            dialog_renderer = DialogRenderer(os.path.join(locale_directory, lang, "dialogs"))
 
-        room = TheCursedRoom(locale_folder=locale_directory, lang=lang, default_response=default_response)
+        room = TheCursedRoom(locale_folder=locale_directory, lang=lang, default_response="")
 
         callbacks = GameHandlers(on_end=self.on_end, on_start=self.on_start,
                                  on_win=self.on_win, on_lose=self.on_lose,
                                  is_loss=self.is_loss, is_win=self.is_win,
                                  end_turn=self.on_end_turn,
                                  on_input=on_input, on_print=on_print)
-        super().__init__(dialog_renderer=dialog_renderer, scenes=[room], handlers=callbacks)
+        super().__init__(dialog_renderer=dialog_renderer, scenes=[room], handlers=callbacks, seed=seed,
+                         checkpoints=checkpoints)
+        # drawn from the session rng, only available now
+        room.description = self.get_dialog("default") + "\n" + self.get_dialog("help_commands")
 
     def on_end_turn(self, game: IFGameEngine):
         # destroying the mirror stops random events
         if "mirror" not in game.active_scene.destroyed:
             game.speak_dialog('random_event')
             # random chance of decreasing sanity
-            if random.randint(1, 50) % 4 == 0:
+            if game.rng.randint(1, 50) % 4 == 0:
                 game.print(game.active_scene.decrease_sanity(game, 1))
 
     def on_win(self, game: IFGameEngine):
@@ -525,8 +538,7 @@ class EldritchEscape(IFGameEngine):
         game.speak_dialog("lose")
 
     def on_start(self, game: IFGameEngine):
-        text = game.dialog_renderer.get_text("intro")
-        game.print(text)
+        game.speak_text("intro")
 
     def on_end(self, game: IFGameEngine):
         game.speak_dialog("game_over")
@@ -534,6 +546,7 @@ class EldritchEscape(IFGameEngine):
     def is_win(self, game: IFGameEngine) -> bool:
         return not game.running.is_set()
 
+    @depends_on("active_scene.sanity")
     def is_loss(self, game: IFGameEngine) -> bool:
         current_scene: TheCursedRoom = game.active_scene
         if hasattr(current_scene, 'sanity') and current_scene.sanity <= 0:
@@ -543,4 +556,4 @@ class EldritchEscape(IFGameEngine):
 
 if __name__ == "__main__":
     # TODO lang from argparse
-    EldritchEscape(locale_directory=os.path.dirname(__file__), lang="en").run()
+    EldritchEscape(locale_directory=os.path.dirname(__file__), lang="en", checkpoints=10).run()
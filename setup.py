@@ -61,5 +61,6 @@ setup(
     author_email='jarbasai@mailfence.com',
     description='interactive fiction engine',
     long_description=get_description(),
-    long_description_content_type="text/markdown"
+    long_description_content_type="text/markdown",
+    install_requires=required("requirements.txt")
 )
@@ -0,0 +1,32 @@
+import unittest
+
+from text_engine.compact import CompactGameScene, CompactKeyword, FrozenKeyword, FrozenKeywordIntent
+from text_engine.engine import GameScene
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+
+
+class TestCompact(unittest.TestCase):
+    def test_isinstance_of_regular_classes(self):
+        self.assertIsInstance(FrozenKeyword("look"), Keyword)
+        self.assertIsInstance(CompactKeyword("look"), Keyword)
+        self.assertIsInstance(FrozenKeywordIntent("look", [FrozenKeyword("look")]), KeywordIntent)
+        self.assertIsInstance(CompactGameScene("a room"), GameScene)
+        self.assertFalse(hasattr(FrozenKeyword("look"), "__dict__"))
+
+    def test_update_frozen_keyword(self):
+        look = FrozenKeyword("look", ["look"])
+        held = {look}
+        engine = IntentEngine()
+        engine.register_intent(FrozenKeywordIntent("look", [look]))
+        self.assertEqual(engine.update_keyword("look", ["peek"]), 1)
+        # the frozen keyword is untouched, its hash stays valid
+        self.assertEqual(look.samples, ("look",))
+        self.assertIn(look, held)
+        intent, score = engine.calc_intent("peek")
+        self.assertEqual(intent.name, "look")
+        self.assertEqual(intent.required[0].samples, ("peek",))
+        self.assertEqual(engine.calc_intent("look"), (None, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
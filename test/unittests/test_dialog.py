@@ -0,0 +1,45 @@
+import os
+import random
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from text_engine.dialog import DialogRenderer, DialogTemplate
+
+
+class TestDialogTemplate(unittest.TestCase):
+    def test_named_slots(self):
+        template = DialogTemplate("you pick up the {item}, it weighs {weight:.1f} kg")
+        self.assertTrue(template.has_slots)
+        self.assertEqual(template.render({"item": "key", "weight": 0.25}), "you pick up the key, it weighs 0.2 kg")
+
+    def test_missing_slots_are_kept(self):
+        template = DialogTemplate("the {item!r} glows {color:>5}")
+        self.assertEqual(template.render({"color": "red"}), "the {item!r} glows   red")
+
+    def test_attribute_and_index_slots(self):
+        template = DialogTemplate("{player.name} has {items[0]}")
+        self.assertEqual(template.render({"player": SimpleNamespace(name="Ann"), "items": ["a lamp"]}),
+                         "Ann has a lamp")
+        self.assertEqual(template.render({"player": None}), "{player.name} has {items[0]}")
+
+    def test_plain_lines(self):
+        for text in ["no slots here", "a lone { brace", "{}"]:
+            template = DialogTemplate(text)
+            self.assertFalse(template.has_slots)
+            self.assertEqual(template.render({"item": "key"}), text)
+
+
+class TestDialogRenderer(unittest.TestCase):
+    def test_slots_named_like_the_arguments(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "greet.dialog"), "w") as f:
+                f.write("hello {name}, the dice say {rng}\n")
+            renderer = DialogRenderer(directory)
+            self.assertEqual(renderer.get_dialog("greet", random.Random(0), name="Ann", rng=4),
+                             "hello Ann, the dice say 4")
+            self.assertEqual(renderer.get_dialog("greet"), "hello {name}, the dice say {rng}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from text_engine.engine import GameHandlers, GameIntents, GameScene, IFGameEngine
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+
+
+class Room(GameScene):
+    state_fields = ("destroyed",)
+
+    def __init__(self):
+        super().__init__("A room with a box and a vase.", intents=GameIntents(parser=IntentEngine(), intents=[
+            KeywordIntent("destroy", [Keyword("destroy", ["smash"])], optional=[Keyword("box"), Keyword("vase")],
+                          handler=self.on_destroy),
+            KeywordIntent("undo", [Keyword("undo")], handler=self.on_undo)]))
+        self.destroyed = []
+
+    def on_destroy(self, game, utterance):
+        self.destroyed.append("vase" if "vase" in utterance else "box")
+        return "Smashed."
+
+    def on_undo(self, game, utterance):
+        return "Undone." if game.undo() else "Nothing to undo."
+
+
+class TestUndo(unittest.TestCase):
+    def setUp(self):
+        self.printed = []
+        self.room = Room()
+        self.game = IFGameEngine([self.room], GameHandlers(is_win=lambda g: False, is_loss=lambda g: False,
+                                                           on_print=lambda g, text: self.printed.append(text)),
+                                 checkpoints=5)
+        self.game.begin()
+
+    def test_undo_command(self):
+        self.game.turn("smash the box")
+        self.game.turn("smash the vase")
+        self.assertEqual(self.room.destroyed, ["box", "vase"])
+        self.assertEqual(self.game.current_turn, 3)
+
+        self.assertTrue(self.game.turn("undo"))
+        self.assertEqual(self.printed[-1], "Undone.")
+        self.assertEqual(self.room.destroyed, ["box"])
+        self.assertEqual(self.game.current_turn, 2)
+
+        self.game.turn("undo")
+        self.assertEqual(self.room.destroyed, [])
+        self.assertEqual(self.game.current_turn, 1)
+        self.game.turn("undo")
+        self.assertEqual(self.printed[-1], "Nothing to undo.")
+        self.assertEqual(self.game.current_turn, 2)  # a turn that undid nothing is played as usual
+
+        self.game.turn("smash the vase")
+        self.assertEqual(self.room.destroyed, ["vase"])
+        self.assertEqual(self.game.current_turn, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
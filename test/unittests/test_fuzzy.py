@@ -0,0 +1,49 @@
+import unittest
+
+from text_engine.fuzzy import FuzzyIndex, edit_distance
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def test_corrections(self):
+        index = FuzzyIndex(["open", "door", "grab"], max_distance=1)
+        self.assertEqual(index.correct("opne the dor"), "open the door")
+        self.assertEqual(index.lookup("garb"), "grab")  # transposition
+        self.assertIsNone(index.lookup("window"))
+        self.assertIsNone(index.lookup("dr"))  # too short to correct
+        self.assertEqual(index.correct("open the door"), "open the door")
+        self.assertEqual(edit_distance("kitten", "sitting", 5), 3)
+
+    def test_words_are_reference_counted(self):
+        index = FuzzyIndex(["door", "door"])
+        index.remove("door")
+        self.assertEqual(index.lookup("dor"), "door")
+        index.remove("door")
+        self.assertIsNone(index.lookup("dor"))
+        self.assertEqual(index.index, {})
+
+
+class TestEngineFuzzy(unittest.TestCase):
+    def test_index_follows_registrations(self):
+        engine = IntentEngine(fuzzy=True)
+        engine.register_intent(KeywordIntent("open", [Keyword("open")]))
+        self.assertEqual(engine.calc_intent("opne")[0].name, "open")
+        fuzzy = engine._fuzzy_index
+
+        take = KeywordIntent("take", [Keyword("take", ["grab", "take"])])
+        engine.register_intent(take)
+        intent, score, corrected = engine.resolve("garb it")
+        self.assertEqual((intent.name, corrected), ("take", "grab it"))
+        self.assertLess(score, 0.8)  # fuzzy hits rank below exact ones
+
+        engine.deregister_intent("take")
+        self.assertEqual(engine.resolve("garb it"), (None, 0.0, "garb it"))
+        take.required[0].samples = ["take", "seize"]
+        engine.register_intent(take)
+        self.assertEqual(engine.resolve("sieze it")[2], "seize it")
+        self.assertIs(engine._fuzzy_index, fuzzy)  # updated, not rebuilt
+        self.assertEqual(sorted(fuzzy.words), ["open", "seize", "take"])
+
+
+if __name__ == "__main__":
+    unittest.main()
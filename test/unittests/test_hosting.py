@@ -0,0 +1,37 @@
+import threading
+import unittest
+from typing import Optional
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine.hosting import ShardedHost
+
+
+def make_session(session_id: str, seed: Optional[int]) -> EldritchEscape:
+    return EldritchEscape(seed=seed)
+
+
+class TestMigration(unittest.TestCase):
+    def test_turns_during_migration_are_not_lost(self):
+        script = ["look", "take the key", "read the book", "look", "smell the slime", "listen to the cassette",
+                  "look", "take the key"]  # the game is lost two turns later
+        with ShardedHost(make_session, workers=2) as host:
+            host.open("a", seed=7)
+            host.open("b", seed=7)
+            done = threading.Event()
+
+            def migrate():
+                while not done.is_set():
+                    host.migrate("b", 1 - host.worker_of("b"))
+
+            mover = threading.Thread(target=migrate)
+            mover.start()
+            try:
+                for utterance in script:
+                    self.assertEqual(host.turn("b", utterance).output, host.turn("a", utterance).output)
+            finally:
+                done.set()
+                mover.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import os.path
+import subprocess
+import sys
+import unittest
+
+import text_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import json, sys
+import text_engine
+loaded = {"package": sorted(m for m in sys.modules if m.startswith("text_engine."))}
+text_engine.IFGameEngine
+loaded["engine"] = "text_engine.engine" in sys.modules
+from eldritch_escape.eldritch_escape import EldritchEscape
+game = EldritchEscape(on_print=lambda g, text: None, seed=0)
+game.begin()
+game.turn("look around")
+loaded["lazy"] = [m for m in ("json_database", "quebra_frases") if m in sys.modules]
+print(json.dumps(loaded))
+"""
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_heavy_modules_load_on_first_use(self):
+        # a fresh interpreter, this one already imported everything
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        loaded = json.loads(out)
+        self.assertEqual(loaded["package"], [])
+        self.assertTrue(loaded["engine"])
+        self.assertEqual(loaded["lazy"], [])
+
+    def test_exports(self):
+        from text_engine.intents import IntentEngine
+        self.assertIs(text_engine.IntentEngine, IntentEngine)
+        self.assertIn("IFGameEngine", dir(text_engine))
+        with self.assertRaises(AttributeError):
+            text_engine.NoSuchClass
+
+
+if __name__ == "__main__":
+    unittest.main()
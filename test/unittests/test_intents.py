@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+import threading
+import unittest
+
+from text_engine.intents import BuiltinKeywords, IntentEngine, IntentIndex, Keyword, KeywordIntent
+
+
+class TestBundle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_deregister_removes_from_bundle(self):
+        engine = IntentEngine(intent_cache=self.directory)
+        engine.register_intent(KeywordIntent("look", [Keyword("look")]))
+        engine.register_intent(KeywordIntent("take", [Keyword("take", ["take", "grab"])]))
+        engine.save_all()
+        engine.deregister_intent("take")
+        self.assertEqual(engine.save_all(), 2)  # the intent and its keyword
+
+        loaded = IntentEngine()
+        self.assertEqual(loaded.load_all(self.directory), 1)
+        self.assertEqual(list(loaded.intents), ["look"])
+        self.assertEqual(loaded.calc_intent("grab it"), (None, 0.0))
+        self.assertEqual(engine.save_all(), 0)  # the bundle is up to date
+
+    def test_concurrent_deregisters(self):
+        engine = IntentEngine(intent_cache=self.directory)
+        for i in range(50):
+            engine.register_intent(KeywordIntent(f"intent{i}", [Keyword(f"word{i}")]))
+        engine.save_all()
+        threads = [threading.Thread(target=engine.deregister_intent, args=(f"intent{i}",)) for i in range(0, 50, 2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.save_all()
+        self.assertEqual(IntentEngine().load_all(self.directory), 25)
+
+    def test_per_file_layout_shares_keywords(self):
+        look = Keyword("look", ["look", "peek"])
+        engine = IntentEngine()
+        engine.register_intent(KeywordIntent("look", [look]))
+        engine.register_intent(KeywordIntent("look_box", [look], optional=[Keyword("box")]))
+        engine.save_all(self.directory, bundle=False)
+
+        loaded = IntentEngine()
+        self.assertEqual(loaded.load_all(self.directory), 2)
+        self.assertIs(loaded.intents["look"].required[0], loaded.intents["look_box"].required[0])
+
+
+class TestRegistration(unittest.TestCase):
+    def test_intents_in_registration_order(self):
+        engine = IntentEngine()
+        names = [f"intent{i}" for i in range(100)]
+        for name in names:
+            engine.register_intent(KeywordIntent(name, [Keyword(name)]))
+        engine.deregister_intent("intent50")
+        names.remove("intent50")
+        engine.register_intent(KeywordIntent("intent7", [Keyword("seven")]))  # replaced in place
+        self.assertEqual(list(engine.intents), names)
+        self.assertEqual(len(engine.intents), 99)
+        self.assertNotIn("intent50", engine.intents)
+        self.assertEqual(engine.intents["intent7"].required[0].name, "seven")
+
+class TestAdaptiveOrder(unittest.TestCase):
+    def test_ties_keep_registration_order(self):
+        look = Keyword("look")
+        engine = IntentEngine(adaptive_order=True)
+        engine.register_intent(KeywordIntent("look_room", [look], optional=[Keyword("room")]))
+        engine.register_intent(KeywordIntent("look_other", [look], optional=[Keyword("other")]))
+        engine.import_stats({"look_other": {"hits": 50}})  # evaluated first
+        self.assertEqual(engine.evaluation_order[0].name, "look_other")
+        for utterance in ("look", "look room", "look other", "look room other"):
+            intent, score = engine.calc_intent(utterance)
+            self.assertEqual((intent, score), engine.calc_intents(utterance)[0])
+        self.assertEqual(engine.calc_intent("look room other")[0].name, "look_room")
+
+
+class TestNormalization(unittest.TestCase):
+    def setUp(self):
+        self.engine = IntentEngine(normalizer=BuiltinKeywords("en").normalizer)
+        self.engine.register_intent(KeywordIntent("bring", [Keyword("bring")], optional=[Keyword("box")]))
+        self.engine.register_intent(KeywordIntent("open", [Keyword("open", ["open door"])]))
+
+    def test_matches_word_forms(self):
+        self.assertEqual(self.engine.calc_intent("Opening the doors")[0].name, "open")
+        self.assertEqual(self.engine.calc_intent("bring the boxes")[0].name, "bring")
+
+    def test_stems_match_whole_tokens_only(self):
+        self.assertEqual(self.engine.calc_intent("look at the brown box"), (None, 0.0))
+        self.assertEqual(self.engine.calc_intent("use the door opener"), (None, 0.0))
+
+
+class TestKeywordEdits(unittest.TestCase):
+    def setUp(self):
+        self.look = Keyword("look")
+        self.engine = IntentEngine(cache_size=10)
+        self.engine.register_intent(KeywordIntent("look", [self.look]))
+
+    def test_edits_reach_the_index(self):
+        self.assertEqual(self.engine.calc_intent("peek"), (None, 0.0))
+        self.look.samples.append("peek")  # in place
+        self.assertEqual(self.engine.calc_intent("peek")[1], 0.8)
+        self.look.samples = ["stare"]
+        self.assertEqual(self.engine.calc_intent("peek"), (None, 0.0))
+        self.assertEqual(self.engine.calc_intents("stare")[0][1], 0.8)
+
+    def test_lookups_only_scan_after_an_edit(self):
+        self.engine.calc_intent("look")
+        scans = []
+        stale = IntentIndex.stale
+        IntentIndex.stale = lambda index, kids=None: scans.append(kids) or stale(index, kids)
+        try:
+            for _ in range(3):
+                self.engine.calc_intent("look")
+            self.assertEqual(scans, [])
+            self.look.samples = ["stare"]
+            self.engine.calc_intent("look")
+            self.engine.calc_intent("look")
+            self.assertEqual(scans, [{id(self.look)}])  # only the edited keyword is checked
+        finally:
+            IntentIndex.stale = stale
+
+
+class TestPredictionCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = IntentEngine(cache_size=2)
+        self.engine.register_intent(KeywordIntent("look", [Keyword("look")]))
+
+    def test_hits_on_normalized_utterance(self):
+        self.engine.calc_intent("look")
+        self.assertEqual(self.engine.calc_intent("  LOOK ")[0].name, "look")
+        stats = self.engine.cache_stats()
+        self.assertEqual((stats["size"], stats["hits"], stats["misses"]), (1, 1, 1))
+
+    def test_register_invalidates(self):
+        self.assertEqual(self.engine.calc_intent("take the key"), (None, 0.0))
+        generation = self.engine.generation
+        self.engine.register_intent(KeywordIntent("take", [Keyword("take")]))
+        self.assertGreater(self.engine.generation, generation)
+        self.assertEqual(self.engine.calc_intent("take the key")[0].name, "take")
+        self.assertEqual(self.engine.cache_stats()["hits"], 0)
+        self.engine.deregister_intent("take")
+        self.assertEqual(self.engine.calc_intent("take the key"), (None, 0.0))
+
+    def test_least_recently_used_evicted(self):
+        for utterance in ["look", "look up", "look", "look down"]:
+            self.engine.calc_intent(utterance)
+        self.engine.clear_cache()
+        self.assertEqual(self.engine.cache_stats()["size"], 0)
+        for utterance in ["look", "look up", "look", "look down", "look", "look up"]:
+            self.engine.calc_intent(utterance)
+        # "look up" was the least recently used when "look down" came in
+        self.assertEqual(self.engine.cache_stats()["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
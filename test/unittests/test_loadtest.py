@@ -0,0 +1,47 @@
+import random
+import unittest
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine.loadtest import NOISE, make_utterance, run_stage, scene_intents, think_time
+
+
+class TestPlayerModel(unittest.TestCase):
+    def setUp(self):
+        self.game = EldritchEscape(seed=0, on_print=lambda g, text: None)
+        self.intents = scene_intents(self.game)
+
+    def test_utterances_trigger_scene_intents(self):
+        rng = random.Random(0)
+        parser = self.game.active_scene.intents.parser
+        for _ in range(50):
+            utterance = make_utterance(self.intents, rng, noise=0.0)
+            self.assertIsNotNone(parser.calc_intent(utterance)[0], utterance)
+
+    def test_noise(self):
+        rng = random.Random(0)
+        self.assertIn(make_utterance(self.intents, rng, noise=1.0), NOISE)
+        self.assertIn(make_utterance([], rng, noise=0.0), NOISE)
+
+    def test_think_time(self):
+        rng = random.Random(0)
+        self.assertEqual(think_time("0")(rng), 0.0)
+        self.assertEqual(think_time("const:0.25")(rng), 0.25)
+        self.assertTrue(1 <= think_time("uniform:1,2")(rng) <= 2)
+        with self.assertRaises(ValueError):
+            think_time("poisson:1")
+
+
+class TestStage(unittest.TestCase):
+    def test_short_stage(self):
+        factory = lambda: EldritchEscape(seed=0, on_print=lambda g, text: None)
+        result = run_stage(factory, sessions=2, duration=0.2, think=think_time("0"))
+        self.assertEqual(result.errors, [])
+        self.assertGreater(result.turns, 0)
+        self.assertEqual(len(result.latencies), result.turns)
+        self.assertGreaterEqual(result.games, 2)
+        self.assertGreater(result.memory_per_session, 0)
+        self.assertLessEqual(result.percentile(50), result.percentile(99))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from text_engine.locale_build import Budgets, build, compile_file, estimate_expansions, find_collisions
+
+
+class TestLocaleBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        self.write("open.voc", "(open|unlock) [the] door\nopen")
+        self.write("unlock.voc", "unlock the door\n# a comment\nturn the key")
+        self.write("hello.dialog", "(hi|hello) (there|friend)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_estimate_is_an_upper_bound(self):
+        self.assertEqual(estimate_expansions("(open|unlock) [the] door"), 4)
+        self.assertEqual(estimate_expansions("(x|y)(1|2|3)"), 6)
+        self.assertEqual(estimate_expansions("((a|b) c|d)"), 3)
+        self.assertEqual(estimate_expansions("plain text"), 1)
+
+    def test_compile_file(self):
+        report = compile_file(os.path.join(self.directory, "open.voc"))
+        self.assertEqual((report.templates, report.expansions, report.largest_template), (2, 5, 4))
+        self.assertIn("unlock the door", report.lines)
+        self.assertEqual(report.violations(Budgets()), [])
+        self.assertEqual(len(report.violations(Budgets(max_template=3, max_file=4))), 2)
+
+    def test_huge_template_is_skipped(self):
+        path = self.write("huge.voc", "(a|b|c|d|e|f|g|h|i|j) " * 6)
+        report = compile_file(path, Budgets(max_template=10))
+        self.assertEqual(report.expansions, 0)
+        self.assertEqual(report.skipped[0][1], 10 ** 6)
+        self.assertTrue(report.violations(Budgets(max_template=10)))
+
+    def test_unreadable_file(self):
+        report = compile_file(os.path.join(self.directory, "missing.voc"))
+        self.assertTrue(report.error.startswith("can't read file"))
+
+    def test_build_and_collisions(self):
+        serial = build([self.directory], jobs=1)
+        parallel = build([self.directory], jobs=2)
+        self.assertEqual([r.path for r in serial], [r.path for r in parallel])
+        self.assertEqual([r.expansions for r in serial], [r.expansions for r in parallel])
+        self.assertEqual([r.name for r in serial], ["hello", "open", "unlock"])
+        collisions = find_collisions([r for r in serial if r.path.endswith(".voc")])
+        self.assertEqual(list(collisions), ["unlock the door"])
+
+
+if __name__ == "__main__":
+    unittest.main()
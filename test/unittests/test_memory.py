@@ -0,0 +1,57 @@
+import sys
+import unittest
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine import IntentEngine, Keyword, KeywordIntent
+from text_engine.memory import MemoryWalker
+from text_engine.utils import load_object
+
+
+class TestMemoryReport(unittest.TestCase):
+    def test_objects_counted_once(self):
+        words = ["word"] * 3 + ["other"]
+        walker = MemoryWalker()
+        walker.add("first", words)
+        walker.add("second", words, "new")
+        self.assertEqual(walker.report.objects, 4)  # the list, "word", "other" and "new"
+        self.assertIn("first", walker.report.session)
+        self.assertEqual(walker.report.session["second"], sys.getsizeof("new"))
+
+    def test_shared_roots(self):
+        common = ["a dusty room"]
+        walker = MemoryWalker(shared=[common])
+        walker.add("dialogs", [common, "only mine"])
+        self.assertGreater(walker.report.shared["dialogs"], 0)
+        self.assertGreater(walker.report.session["dialogs"], 0)
+
+    def test_engine_categories(self):
+        engine = IntentEngine()
+        engine.register_intent(KeywordIntent("look", [Keyword("look", ["look", "look around"])]))
+        engine.calc_intent("look around")
+        report = engine.memory_report()
+        for category in ("keywords", "intents", "intent index", "prediction cache"):
+            self.assertGreater(report.session.get(category, 0), 0, category)
+
+    def test_sessions_share_game_data(self):
+        game, other = EldritchEscape(seed=0), EldritchEscape(seed=0)
+        alone = game.memory_report()
+        shared = game.memory_report(shared=[other])
+        self.assertEqual(alone.total, shared.total)
+        self.assertLess(shared.session_total, alone.session_total)
+
+
+class TestLoadObject(unittest.TestCase):
+    def test_load(self):
+        self.assertIs(load_object("text_engine.memory:MemoryWalker"), MemoryWalker)
+        self.assertIs(load_object("text_engine.memory:MemoryReport.format"),
+                      load_object("text_engine.memory:MemoryReport").format)
+
+    def test_bad_spec(self):
+        with self.assertRaises(ValueError):
+            load_object("text_engine.memory")
+        with self.assertRaises(AttributeError):
+            load_object("text_engine.memory:nothing")
+
+
+if __name__ == "__main__":
+    unittest.main()
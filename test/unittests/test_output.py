@@ -0,0 +1,55 @@
+import unittest
+
+from text_engine.engine import GameHandlers, GameIntents, GameScene, IFGameEngine
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+from text_engine.output import BufferedSink
+
+
+def shout(game, utterance):
+    game.print("you shout")
+    game.print("nobody answers")
+    return "the echo fades"
+
+
+class TestBufferedSink(unittest.TestCase):
+    def make_game(self, sink: BufferedSink) -> IFGameEngine:
+        intents = GameIntents(parser=IntentEngine(), intents=[
+            KeywordIntent("shout", [Keyword("shout")], handler=shout)])
+        return IFGameEngine([GameScene("a dark cave", intents=intents)],
+                            GameHandlers(is_win=lambda g: False, is_loss=lambda g: False,
+                                         on_print=lambda g, text: self.printed.append(text)),
+                            output=sink)
+
+    def setUp(self):
+        self.printed = []
+
+    def test_one_print_per_turn_in_order(self):
+        game = self.make_game(BufferedSink())
+        game.begin()
+        game.flush()
+        self.printed.clear()
+        game.turn("shout")
+        self.assertEqual(self.printed, [])  # nothing emitted before the flush
+        game.flush()
+        self.assertEqual(self.printed, ["you shout\nnobody answers\nthe echo fades"])
+        game.flush()
+        self.assertEqual(len(self.printed), 1)  # an empty buffer prints nothing
+
+    def test_flushed_early_over_the_limits(self):
+        game = self.make_game(BufferedSink(max_lines=2, separator=" / "))
+        sink = game.output
+        for text in ["one", "two", "three"]:
+            sink.write(game, text)
+        self.assertEqual(self.printed, ["one / two"])
+        game.flush()
+        self.assertEqual(self.printed, ["one / two", "three"])
+
+        self.printed.clear()
+        game.output = sink = BufferedSink(max_chars=6)
+        for text in ["abc", "def", "g"]:
+            sink.write(game, text)
+        self.assertEqual(self.printed, ["abc\ndef"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import random
+import tempfile
+import unittest
+
+from text_engine.dialog import DialogRenderer
+from text_engine.prerender import MANIFEST_FILE, ArtifactCache, prerender, stub_render
+
+
+class TestPrerender(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dialogs = os.path.join(self.tmp.name, "dialogs")
+        os.makedirs(self.dialogs)
+        self.write("greet", "(hello|hi) there\nhello there")
+        self.write("bye", "hello there\nyour sanity is {sanity}")
+        self.cache = ArtifactCache(os.path.join(self.tmp.name, "cache"), ".txt")
+        self.rendered = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> None:
+        with open(os.path.join(self.dialogs, name + ".dialog"), "w") as f:
+            f.write(text)
+
+    def render(self, text: str) -> bytes:
+        self.rendered.append(text)
+        if text == "boom":
+            raise RuntimeError("renderer crashed")
+        return stub_render(text)
+
+    def test_only_new_lines_are_rendered(self):
+        report = prerender(self.dialogs, self.cache, self.render, workers=2)
+        self.assertEqual((report.dialogs, report.lines, report.unique), (2, 5, 2))
+        self.assertEqual((report.rendered, report.cached), (2, 0))
+        self.assertEqual(report.skipped, ["your sanity is {sanity}"])
+        self.assertEqual(sorted(self.rendered), ["hello there", "hi there"])
+        with open(self.cache.get("hi there"), "rb") as f:
+            self.assertEqual(f.read(), b"hi there")
+
+        self.write("greet", "hi there\ngood evening")
+        self.rendered.clear()
+        report = prerender(self.dialogs, self.cache, self.render)
+        self.assertEqual(self.rendered, ["good evening"])
+        self.assertEqual((report.rendered, report.cached), (1, 2))
+
+    def test_prune(self):
+        prerender(self.dialogs, self.cache, self.render)
+        with open(os.path.join(self.cache.directory, "notes.txt"), "w") as f:
+            f.write("put there by hand")
+        self.write("greet", "hello there")
+        report = prerender(self.dialogs, self.cache, self.render, prune=True)
+        self.assertEqual(report.pruned, 1)
+        self.assertIsNone(ArtifactCache(self.cache.directory, ".txt").get("hi there"))
+        self.assertIsNotNone(self.cache.get("hello there"))
+        self.assertTrue(os.path.isfile(os.path.join(self.cache.directory, MANIFEST_FILE)))
+        self.assertTrue(os.path.isfile(os.path.join(self.cache.directory, "notes.txt")))
+
+    def test_failures_and_salt(self):
+        self.write("crash", "boom")
+        report = prerender(self.dialogs, self.cache, self.render)
+        self.assertEqual(list(report.failed), ["boom"])
+        self.assertEqual(report.rendered, 2)
+        salted = ArtifactCache(self.cache.directory, ".txt", salt="another voice")
+        self.assertIsNone(salted.get("hello there"))
+
+    def test_renderer_finds_artifacts(self):
+        prerender(self.dialogs, self.cache, self.render)
+        renderer = DialogRenderer(self.dialogs, artifacts=self.cache)
+        text, path = renderer.get_dialog_artifact("greet", random.Random(0))
+        self.assertIsNotNone(path)
+        self.assertEqual(path, self.cache.path_of(self.cache.key(text)))
+        self.assertIsNone(renderer.artifact("your sanity is 3"))  # lines with slots are not pre-rendered
+
+
+if __name__ == "__main__":
+    unittest.main()
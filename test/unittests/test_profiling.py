@@ -0,0 +1,74 @@
+import sys
+import threading
+import time
+import unittest
+
+from text_engine.engine import GameHandlers, GameIntents, GameScene, IFGameEngine
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+from text_engine.profiling import SamplingProfiler, classify
+
+
+def current_phase():
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return classify(frames)
+
+
+class TestPhases(unittest.TestCase):
+    def setUp(self):
+        self.phases = {}
+        self.busy = threading.Event()
+        intents = GameIntents(parser=IntentEngine(), intents=[
+            KeywordIntent("look", [Keyword("look")], handler=self.on_look),
+            KeywordIntent("wait", [Keyword("wait")], handler=self.on_wait)])
+        self.game = IFGameEngine([GameScene("a dark cave", intents=intents)],
+                                 GameHandlers(is_win=lambda g: False, is_loss=self.is_loss,
+                                              end_turn=self.end_turn, on_print=self.on_print))
+
+    def on_look(self, game, utterance):
+        self.phases["handler"] = current_phase()
+        return "nothing to see"
+
+    def on_wait(self, game, utterance):
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            pass
+        return "time passes"
+
+    def is_loss(self, game):
+        self.phases["is_loss"] = current_phase()
+        return False
+
+    def end_turn(self, game):
+        self.phases["end_turn"] = current_phase()
+
+    def on_print(self, game, text):
+        self.phases["on_print"] = current_phase()
+
+    def test_labels(self):
+        self.assertIsNone(current_phase())  # not playing a turn
+        self.game.begin()
+        self.game.turn("look")
+        self.assertEqual(self.phases, {"handler": "handler", "is_loss": "callbacks",
+                                       "end_turn": "callbacks", "on_print": "output"})
+
+    def test_sampled_profile(self):
+        self.game.begin()
+        player = threading.Thread(target=self.game.turn, args=("wait",))
+        profiler = SamplingProfiler(duration=5, interval=0.001)
+        player.start()
+        profiler.start()
+        player.join()
+        profile = profiler.stop()
+        self.assertGreater(profile.samples, 0)
+        self.assertEqual(list(profile.phases())[0], "handler")
+        line = profile.collapsed().splitlines()[0]
+        self.assertTrue(line.startswith("handler;"))
+        self.assertIn("on_wait (test_profiling.py:", line)
+
+
+if __name__ == "__main__":
+    unittest.main()
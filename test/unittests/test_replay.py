@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from eldritch_escape.eldritch_escape import EldritchEscape
+from text_engine.replay import Transcript, record, replay
+
+SCRIPT = ["look", "take the key", "read the book", "look", "smell the slime", "listen to the cassette"]
+
+
+def make_game(seed: int) -> EldritchEscape:
+    return EldritchEscape(seed=seed, on_print=lambda g, text: None)
+
+
+def play(seed: int) -> Transcript:
+    game = make_game(seed)
+    inputs = iter(SCRIPT)
+
+    def scripted(g, prompt):
+        try:
+            return next(inputs)
+        except StopIteration:
+            raise EOFError from None
+
+    game.handlers.on_input = scripted
+    transcript = record(game)
+    game.run()
+    return transcript
+
+
+class TestReplay(unittest.TestCase):
+    def test_seeded_replay_matches(self):
+        transcript = play(7)
+        self.assertEqual(transcript.inputs, SCRIPT)
+        for _ in range(2):
+            result = replay(make_game, transcript)
+            self.assertTrue(result.matched)
+            self.assertEqual(result.outputs, transcript.outputs)
+            self.assertEqual(result.turns, len(SCRIPT))
+
+    def test_changed_output_is_reported(self):
+        transcript = play(7)
+        transcript.outputs[3] = "something else"
+        self.assertEqual(replay(make_game, transcript).mismatch, 3)
+
+    def test_save_and_load(self):
+        transcript = play(3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "session.json")
+            transcript.save(path)
+            self.assertEqual(Transcript.from_file(path), transcript)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from text_engine.engine import GameIntents, GameObject, GameScene
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+from text_engine.routing import SceneRouter
+
+
+def reply(text):
+    return lambda game, utterance: text
+
+
+class TestSceneRouter(unittest.TestCase):
+    def setUp(self):
+        self.look = Keyword("look")
+        self.objects = [GameObject(Keyword(f"box{i}"), GameIntents([KeywordIntent(
+            f"open{i}", [Keyword("open")], handler=reply(f"opened box{i}"))], parser=IntentEngine()), "a box")
+            for i in range(20)]
+        self.scene = GameScene("a room", self.objects, intents=GameIntents(
+            [KeywordIntent("look", [self.look], handler=reply("looked"))], parser=IntentEngine()),
+            router=SceneRouter())
+
+    def test_routes_to_named_object(self):
+        self.assertEqual(self.scene.interact(None, "open box7"), "opened box7")
+        self.assertEqual(self.scene.active_object, 7)
+        self.assertEqual(self.scene.interact(None, "open it"), "opened box7")
+        self.assertEqual(self.scene.interact(None, "open box3 and box7"), "opened box7")  # focus kept
+        self.assertEqual(self.scene.interact(None, "look"), "looked")
+
+    def test_turns_dont_sync_every_engine(self):
+        self.scene.interact(None, "look")
+        synced = []
+        sync = IntentEngine.sync_keywords
+        IntentEngine.sync_keywords = lambda engine: synced.append(engine) or sync(engine)
+        try:
+            for _ in range(5):
+                self.scene.interact(None, "open box1")
+            self.assertEqual(synced, [])
+            self.look.samples = ["peek"]  # an edit is picked up on the next turn
+            self.assertEqual(self.scene.interact(None, "peek"), "looked")
+        finally:
+            IntentEngine.sync_keywords = sync
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import threading
+import time
+import unittest
+
+from text_engine.engine import GameScene
+from text_engine.scenes import SceneLoader, SceneRegistry
+
+
+class Room(GameScene):
+    state_fields = ("visits",)
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.visits = 0
+
+
+class TestSceneRegistry(unittest.TestCase):
+    def test_remove_keeps_order_and_positions(self):
+        scenes = [Room(f"room{i}") for i in range(10)]
+        registry = SceneRegistry(scenes)
+        registry.remove(scenes[3])
+        registry.remove(0)
+        self.assertEqual(len(registry), 8)
+        self.assertEqual([scene.description for scene in registry],
+                         [f"room{i}" for i in (1, 2, 4, 5, 6, 7, 8, 9)])
+        self.assertIs(registry[0], scenes[1])
+        self.assertIs(registry[-1], scenes[9])
+        self.assertEqual(registry.index(scenes[4]), 2)
+        self.assertNotIn(scenes[3], registry)
+        registry.add(scenes[3])
+        self.assertEqual(registry.index(scenes[3]), 8)
+        for scene in scenes[1:]:  # tombstones get compacted along the way
+            registry.remove(scene)
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.keys(), [])
+
+    def test_lazy_scenes_are_evicted_and_restored(self):
+        built = []
+
+        def loader(name):
+            return SceneLoader(factory=lambda: built.append(name) or Room(name))
+
+        registry = SceneRegistry(budget=2)
+        for name in ("hall", "cellar", "attic"):
+            registry.add_loader(name, loader(name))
+        registry.activate("hall").visits = 3
+        registry.activate("cellar")
+        registry.activate("attic")
+        self.assertFalse(registry.is_loaded("hall"))  # least recently used
+        self.assertTrue(registry.is_loaded("cellar"))
+        self.assertEqual(registry.activate("hall").visits, 3)
+        self.assertEqual(built, ["hall", "cellar", "attic", "hall"])
+        self.assertEqual(len(registry.loaded()), 2)
+
+    def test_prefetch_uses_a_single_thread(self):
+        registry = SceneRegistry(prefetch=True)
+        gate = threading.Event()
+        main = threading.current_thread()
+
+        def factory(name):
+            def build():
+                if threading.current_thread() is not main:
+                    gate.wait(5)  # prefetching is slower than the player
+                return Room(name)
+            return build
+
+        for i in range(20):
+            registry.add_loader(f"room{i}", SceneLoader(factory=factory(f"room{i}"),
+                                                        adjacent=[f"room{i + 1}", f"room{i + 2}"]))
+        before = threading.active_count()
+        for i in range(0, 20, 3):
+            registry.activate(f"room{i}")
+        self.assertLessEqual(threading.active_count(), before + 1)
+        gate.set()
+        for _ in range(100):
+            if registry._prefetcher is None:
+                break
+            time.sleep(0.01)
+        # only the scenes next to the last activated one are still prefetched
+        self.assertTrue(registry.is_loaded("room19"))
+        self.assertFalse(registry.is_loaded("room5"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from types import SimpleNamespace
+
+from text_engine.scheduler import CachedCheck, TurnScheduler, depends_on
+
+
+class TestTurnScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = TurnScheduler()
+        self.fired = []
+
+    def callback(self, name: str):
+        return lambda game: self.fired.append(name)
+
+    def test_turn_then_scheduling_order(self):
+        self.scheduler.schedule_at(3, self.callback("c"))
+        self.scheduler.schedule_at(2, self.callback("a"))
+        self.scheduler.schedule_at(2, self.callback("b"))
+        self.assertEqual(self.scheduler.run_due(None, 1), 0)
+        self.scheduler.run_due(None, 2)
+        self.assertEqual(self.fired, ["a", "b"])
+        self.scheduler.run_due(None, 5)
+        self.assertEqual(self.fired, ["a", "b", "c"])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_repeating(self):
+        self.scheduler.schedule_at(1, self.callback("tick"), interval=2)
+        for turn in range(1, 7):
+            self.scheduler.run_due(None, turn)
+        self.assertEqual(len(self.fired), 3)  # turns 1, 3 and 5
+        self.assertEqual(len(self.scheduler), 1)
+        with self.assertRaises(ValueError):
+            self.scheduler.schedule_at(1, self.callback("never"), interval=0)
+
+    def test_cancel(self):
+        events = []
+        self.scheduler.schedule_at(1, lambda game: self.scheduler.cancel(events[3]))
+        events += [self.scheduler.schedule_at(1, self.callback(str(i))) for i in range(4)]
+        self.scheduler.cancel(events[1])
+        self.scheduler.cancel(events[1])
+        self.assertEqual(len(self.scheduler), 4)
+        self.scheduler.run_due(None, 1)
+        self.assertEqual(self.fired, ["0", "2"])  # 3 was cancelled by an earlier callback
+        self.scheduler.cancel(events[0])  # already fired
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_compaction(self):
+        events = [self.scheduler.schedule_at(i, self.callback(str(i))) for i in range(10)]
+        for event in events[:6]:
+            self.scheduler.cancel(event)
+        self.assertEqual(len(self.scheduler._heap), 4)
+        self.scheduler.run_due(None, 10)
+        self.assertEqual(self.fired, ["6", "7", "8", "9"])
+
+
+class TestCachedCheck(unittest.TestCase):
+    def test_only_evaluated_when_fields_change(self):
+        calls = []
+
+        @depends_on("active_scene.sanity", "active_scene.inventory")
+        def is_loss(game):
+            calls.append(game.active_scene.sanity)
+            return game.active_scene.sanity <= 0
+
+        scene = SimpleNamespace(sanity=2, inventory=[])
+        game = SimpleNamespace(active_scene=scene)
+        check = CachedCheck(is_loss)
+        self.assertFalse(check(game))
+        self.assertFalse(check(game))
+        self.assertEqual(len(calls), 1)
+        scene.inventory.append("key")  # changed in place
+        check(game)
+        self.assertEqual(len(calls), 2)
+        scene.sanity = 0
+        self.assertTrue(check(game))
+        game.active_scene = SimpleNamespace(sanity=5, inventory=["key"])
+        self.assertFalse(check(game))
+        self.assertEqual(calls, [2, 2, 0, 5])
+
+    def test_undeclared_always_evaluated(self):
+        calls = []
+        check = CachedCheck(lambda game: calls.append(1) or False)
+        for _ in range(3):
+            check(None)
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import unittest
+from typing import Optional
+
+from text_engine import GameHandlers, GameIntents, GameScene, IFGameEngine, IntentEngine, Keyword, KeywordIntent
+from text_engine.sessions import SessionQuota, SessionScheduler
+from text_engine.utils import percentile
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSessionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+    def make_game(self, session_id: str, seed: Optional[int]) -> IFGameEngine:
+        def stuck(game, utterance):
+            self.release.wait(5)
+            return "the walls groan"
+
+        intents = GameIntents(parser=IntentEngine(), intents=[
+            KeywordIntent("look", [Keyword("look")], handler=lambda g, u: "a dusty room"),
+            KeywordIntent("stuck", [Keyword("stuck")], handler=stuck)])
+        return IFGameEngine([GameScene("a dusty room", intents=intents)],
+                            GameHandlers(is_win=lambda g: False, is_loss=lambda g: False), seed=seed)
+
+    def test_token_bucket(self):
+        clock = Clock()
+        quota = SessionQuota(rate=1.0, burst=2, turn_budget=None)
+        scheduler = SessionScheduler(self.make_game, quota=quota, clock=clock)  # not started, turns stay queued
+        scheduler.open("a")
+        replies = [scheduler.submit("a", "look") for _ in range(3)]
+        self.assertFalse(replies[0].done())
+        self.assertFalse(replies[1].done())
+        self.assertEqual(replies[2].result().status, "rate_limited")
+        clock.now = 1.0  # one token back
+        self.assertFalse(scheduler.submit("a", "look").done())
+        self.assertEqual(scheduler.submit("a", "look").result().status, "rate_limited")
+        self.assertEqual(scheduler.metrics().rate_limited, 2)
+        scheduler.stop()
+        self.assertEqual(replies[0].result().status, "closed")
+
+    def test_queue_full(self):
+        quota = SessionQuota(rate=None, max_queue=2, turn_budget=None)
+        scheduler = SessionScheduler(self.make_game, quota=quota, clock=Clock())
+        scheduler.open("a")
+        replies = [scheduler.submit("a", "look") for _ in range(3)]
+        self.assertEqual(replies[2].result().status, "queue_full")
+        self.assertEqual(scheduler.metrics().queue_depths, {"a": 2})
+        scheduler.stop()
+
+    def test_timeout_reply_while_handler_runs(self):
+        quota = SessionQuota(rate=None, turn_budget=0.05, penalty=0.0)
+        with SessionScheduler(self.make_game, workers=1, quota=quota) as scheduler:
+            scheduler.open("a")
+            result = scheduler.turn("a", "stuck")
+            self.assertEqual(result.status, "timeout")
+            self.assertTrue(result.running)
+            # the handler still holds the only worker, the next turn waits for it
+            reply = scheduler.submit("a", "look")
+            self.assertFalse(reply.done())
+            self.assertEqual(scheduler.metrics().running, 1)
+            self.release.set()
+            output = reply.result(5).output
+            self.assertIn("the walls groan", output)  # the late output comes with the next reply
+            self.assertIn("a dusty room", output)
+            self.assertEqual(scheduler.metrics().timeouts, 1)
+
+    def test_open_same_id_concurrently(self):
+        entered = threading.Event()
+        factory = self.make_game
+
+        def slow_factory(session_id, seed):
+            entered.set()
+            self.release.wait(5)
+            return factory(session_id, seed)
+
+        scheduler = SessionScheduler(slow_factory, quota=SessionQuota(turn_budget=None))
+        opener = threading.Thread(target=scheduler.open, args=("a",))
+        opener.start()
+        try:
+            entered.wait(5)
+            with self.assertRaises(KeyError):
+                scheduler.open("a")
+        finally:
+            self.release.set()
+            opener.join()
+        self.assertEqual(scheduler.sessions(), ["a"])
+        with self.assertRaises(KeyError):
+            scheduler.open("a")
+
+
+class TestPercentile(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = [float(i) for i in range(100, 0, -1)]
+        self.assertEqual(percentile(values, 50), 51.0)
+        self.assertEqual(percentile(values, 99), 100.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
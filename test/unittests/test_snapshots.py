@@ -0,0 +1,65 @@
+import random
+import threading
+import time
+import unittest
+
+from text_engine.intents import IntentEngine, Keyword, KeywordIntent
+
+READERS = 8
+DURATION = 1.0
+
+
+class TestConcurrentReaders(unittest.TestCase):
+    def test_readers_see_consistent_snapshots(self):
+        engine = IntentEngine(adaptive_order=True, reorder_interval=10)
+        look = Keyword("look")
+        words = [Keyword(f"word{i:02d}") for i in range(50)]  # fixed width, no word is part of another
+        engine.register_intent(KeywordIntent("look", [look]))
+        stop = threading.Event()
+        errors = []
+
+        def reader(seed: int):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                i = rng.randrange(len(words))
+                try:
+                    # a batch registers or removes both intents of a word together
+                    names = {intent.name for intent, _ in engine.calc_intents(f"look word{i:02d}")}
+                    self.assertIn("look", names)
+                    pair = names & {f"a{i}", f"b{i}"}
+                    self.assertIn(len(pair), (0, 2), names)
+                    best, score = engine.calc_intent(f"word{i:02d}")
+                    self.assertIn(best.name if best else None, (None, f"a{i}"))
+                    index = engine.index
+                    self.assertEqual(set(index.intents), set(index.sequence))
+                    self.assertEqual(set(index.intents), set(index.links))
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        def writer():
+            rng = random.Random(-1)
+            while not stop.is_set():
+                i = rng.randrange(len(words))
+                with engine.batch():
+                    if f"a{i}" in engine.intents:
+                        engine.deregister_intent(f"a{i}")
+                        engine.deregister_intent(f"b{i}")
+                    else:
+                        engine.register_intent(KeywordIntent(f"a{i}", [words[i]]))
+                        engine.register_intent(KeywordIntent(f"b{i}", [words[i]]))
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(DURATION)
+        stop.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertGreater(engine.stats["look"].hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from text_engine.textstore import TextDocument, TextStore
+
+BOOK = "Chapter one.\r\nIt was dark.  \n\n\n  \nChapter two.\nThe end.\n"
+
+
+class TestTextDocument(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "book.txt")
+        self.write(BOOK)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text: str, mtime: int = 1_000_000_000) -> None:
+        with open(self.path, "w", newline="") as f:
+            f.write(text)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_pages_and_paragraphs(self):
+        doc = TextDocument(self.path)
+        self.assertEqual((doc.n_pages, doc.n_paragraphs), (2, 4))
+        self.assertEqual(doc.paragraph(1), "It was dark.")
+        self.assertEqual(doc.page(0), "Chapter one.\nIt was dark.")
+        self.assertEqual(doc.page(1), "Chapter two.\nThe end.")
+        self.assertEqual(list(doc.iter_paragraphs(1)), ["Chapter two.", "The end."])
+        self.assertEqual(len(list(doc.iter_paragraphs())), 4)
+        with self.assertRaises(IndexError):
+            doc.page(2)
+
+    def test_empty_file(self):
+        self.write("")
+        doc = TextDocument(self.path)
+        self.assertEqual((doc.n_pages, doc.text()), (0, ""))
+
+    def test_remapped_after_edit(self):
+        doc = TextDocument(self.path)
+        self.assertEqual(doc.n_pages, 2)
+        self.write("Short.\n", mtime=2_000_000_000)  # truncated in place
+        self.assertEqual((doc.n_pages, doc.page(0)), (1, "Short."))
+
+    def test_iteration_survives_edit(self):
+        doc = TextDocument(self.path)
+        paragraphs = doc.iter_paragraphs()
+        self.assertEqual(next(paragraphs), "Chapter one.")
+        self.write("One.\nTwo.\n", mtime=2_000_000_000)
+        self.assertEqual(list(paragraphs), ["Two."])  # continues from the same paragraph number
+
+
+class TestTextStore(unittest.TestCase):
+    def test_documents_by_name(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "notes"))
+            with open(os.path.join(directory, "notes", "diary.txt"), "w") as f:
+                f.write("Day one.\n")
+            store = TextStore(directory)
+            store.preload()
+            doc = store.get(os.path.join("notes", "diary"))
+            self.assertIs(store.get(os.path.join("notes", "diary")), doc)
+            self.assertEqual(doc.text(), "Day one.\n")
+            store.reload()
+            self.assertIsNot(store.get(os.path.join("notes", "diary")), doc)
+
+
+if __name__ == "__main__":
+    unittest.main()
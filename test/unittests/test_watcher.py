@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from text_engine import IntentEngine, Keyword, KeywordIntent
+from text_engine.dialog import DialogRenderer
+from text_engine.watcher import LocaleWatcher
+
+
+def write(path: str, text: str, mtime: int) -> None:
+    with open(path, "w") as f:
+        f.write(text)
+    os.utime(path, ns=(mtime, mtime))  # mtime resolution varies, set it explicitly
+
+
+class TestLocaleWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+        os.makedirs(os.path.join(self.directory, "dialogs"))
+        self.voc = os.path.join(self.directory, "look.voc")
+        self.dialog = os.path.join(self.directory, "dialogs", "hello.dialog")
+        write(self.voc, "look\n", 1_000_000_000)
+        write(self.dialog, "hi there\n", 1_000_000_000)
+        self.engine = IntentEngine()
+        self.engine.register_intent(KeywordIntent("look", [Keyword("look", ["look"])]))
+        self.renderer = DialogRenderer(os.path.join(self.directory, "dialogs"))
+        self.watcher = LocaleWatcher(self.directory, engines=[self.engine],
+                                     renderers=[self.renderer], use_inotify=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_edited_keyword(self):
+        self.assertEqual(self.engine.calc_intent("examine the room"), (None, 0.0))
+        write(self.voc, "look\nexamine\n", 2_000_000_000)
+        self.assertEqual(self.watcher.poll(), [self.voc])
+        self.assertEqual(self.engine.calc_intent("examine the room")[0].name, "look")
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_edited_dialog(self):
+        self.assertEqual(self.renderer.get_dialog("hello"), "hi there")
+        write(self.dialog, "welcome back\n", 2_000_000_000)
+        self.assertEqual(self.watcher.poll(), [self.dialog])
+        self.assertEqual(self.renderer.get_dialog("hello"), "welcome back")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,29 @@
-from text_engine.engine import (GameHandlers, IFGameEngine,
-                                GameScene, GameObject, GameIntents)
-from text_engine.intents import Keyword, KeywordIntent, IntentEngine
+import importlib
+
+# the public classes are imported on first access (PEP 562), so tools that
+# only need e.g. text_engine.utils don't pay for importing the whole engine
+_EXPORTS = {
+    "GameHandlers": "text_engine.engine",
+    "IFGameEngine": "text_engine.engine",
+    "GameScene": "text_engine.engine",
+    "GameObject": "text_engine.engine",
+    "GameIntents": "text_engine.engine",
+    "Keyword": "text_engine.intents",
+    "KeywordIntent": "text_engine.intents",
+    "IntentEngine": "text_engine.intents",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # cached, __getattr__ is not called again
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 # TODO - decide on a fancy name
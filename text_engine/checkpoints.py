@@ -0,0 +1,173 @@
+"""rewind a game to one of its last turns
+
+a CheckpointRing records the state of a game before every turn: turn
+number, random stream, active scene and the state fields of every loaded
+scene. Checkpoints share structure, a field that did not change since the
+previous checkpoint is not copied again, so a checkpoint costs memory in
+proportion to what the turn changed. Every checkpoint is complete, restoring
+one costs the same no matter how many turns ago it was taken
+
+declare ``state_fields`` on scenes so only the attributes that actually
+change are compared every turn, see text_engine.scenes.scene_state
+"""
+import copy
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Deque, Dict, Hashable, Mapping, Optional, Tuple
+
+from immutables import Map as FrozenMap
+
+from text_engine.scenes import state_fields
+
+if TYPE_CHECKING:
+    from text_engine.engine import IFGameEngine
+
+
+@dataclass(frozen=True)
+class RngState:
+    """
+    State of a random.Random, split so unchanged generator words are shared.
+
+    The Mersenne Twister only regenerates its 624 words every 624 draws,
+    in between only the position changes.
+    """
+    version: int
+    words: Tuple[int, ...]
+    position: int
+    gauss_next: Optional[float]
+
+    @classmethod
+    def capture(cls, rng, previous: Optional['RngState'] = None) -> 'RngState':
+        version, internal, gauss_next = rng.getstate()
+        words = internal[:-1]
+        if previous is not None and previous.words == words:
+            words = previous.words
+        return cls(version, words, internal[-1], gauss_next)
+
+    def apply(self, rng) -> None:
+        rng.setstate((self.version, self.words + (self.position,), self.gauss_next))
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    State of a game before a turn.
+
+    Attributes:
+        turn: The turn about to be played.
+        running: Whether the game was running.
+        active_scene: Key of the active scene.
+        rng: State of the session's random stream.
+        scenes: State fields of every loaded scene, by scene key. Values
+            are private copies, shared with the previous checkpoint when
+            they did not change.
+    """
+    turn: int
+    running: bool
+    active_scene: Hashable
+    rng: RngState
+    scenes: Mapping[Hashable, Mapping[str, Any]]
+
+
+def _empty() -> Mapping:
+    return FrozenMap()
+
+
+def _updated(mapping: FrozenMap, changes: Dict[Any, Any]) -> FrozenMap:
+    """a copy of a snapshot mapping with some keys changed, the mapping itself is not modified"""
+    if not changes:
+        return mapping
+    return mapping.update(changes)
+
+
+class CheckpointRing:
+    """
+    The last ``size`` checkpoints of a game, oldest first.
+
+    Attributes:
+        size: Number of turns that can be undone.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("a checkpoint ring holds at least 1 checkpoint")
+        self.size = size
+        self._ring: Deque[Checkpoint] = deque(maxlen=size)
+        self._last: Optional[Checkpoint] = None  # diffed against, may have been popped by restore
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def __getitem__(self, idx: int) -> Checkpoint:
+        return self._ring[idx]
+
+    def clear(self) -> None:
+        self._ring.clear()
+        self._last = None
+
+    def record(self, game: 'IFGameEngine') -> Checkpoint:
+        """
+        Checkpoint the game, copying only the fields changed since the last checkpoint.
+        """
+        last = self._last
+        scenes = last.scenes if last is not None else _empty()
+        changed_scenes = {}
+        registry = game.scenes
+        current = [(key, scene, state_fields(scene, fields), False)
+                   for key, scene, fields in registry.loaded_items()]
+        current += [(key, state, list(state), True) for key, state in registry.unloaded_states().items()]
+        for key, source, names, is_snapshot in current:
+            previous = scenes.get(key)
+            changes = {}
+            for name in names:
+                value = source[name] if is_snapshot else getattr(source, name)
+                if previous is None or name not in previous or previous[name] != value:
+                    changes[name] = copy.deepcopy(value)
+            if previous is None:
+                changed_scenes[key] = _updated(_empty(), changes)
+            elif changes:
+                changed_scenes[key] = _updated(previous, changes)
+        checkpoint = Checkpoint(turn=game.current_turn,
+                                running=game.running.is_set(),
+                                active_scene=game._active_scene,
+                                rng=RngState.capture(game.rng, last.rng if last is not None else None),
+                                scenes=_updated(scenes, changed_scenes))
+        self._ring.append(checkpoint)
+        self._last = checkpoint
+        return checkpoint
+
+    def restore(self, game: 'IFGameEngine', turns: int = 1) -> Checkpoint:
+        """
+        Rewind the game to its state before the last ``turns`` turns.
+
+        The restored checkpoint and every newer one are dropped, the next
+        turn records it again. Raises IndexError if not enough turns are recorded.
+        """
+        if turns < 1 or turns > len(self._ring):
+            raise IndexError(f"can not undo {turns} turns, {len(self._ring)} recorded")
+        for _ in range(turns - 1):
+            self._ring.pop()
+        checkpoint = self._ring.pop()
+        registry = game.scenes
+        for key in registry.keys():
+            state = checkpoint.scenes.get(key)
+            if state is None:
+                registry.forget(key)  # first loaded after the checkpoint, built again on demand
+                continue
+            if not registry.is_loaded(key):
+                registry.restore({registry.index(key): dict(state)})
+                continue
+            scene = registry.get(key)
+            for name, value in state.items():
+                if getattr(scene, name, None) != value:  # unchanged fields are not copied again
+                    setattr(scene, name, copy.deepcopy(value))
+        game.current_turn = checkpoint.turn
+        checkpoint.rng.apply(game.rng)
+        game._active_scene = checkpoint.active_scene
+        registry.activate(checkpoint.active_scene)  # lazy scenes over the budget are unloaded again
+        if checkpoint.running:
+            game.running.set()
+        else:
+            game.running.clear()
+        self._last = checkpoint
+        return checkpoint
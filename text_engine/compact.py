@@ -0,0 +1,107 @@
+"""compact variants of the engine data classes
+
+every Keyword, KeywordIntent, GameScene and GameObject carries an instance
+__dict__, in big worlds played by many sessions at once that adds up, the
+classes here keep the same fields and methods but store them in __slots__
+
+keyword samples and intent keywords are stored as tuples, samples are
+interned so the same phrase loaded by many sessions is only stored once
+
+the Frozen* variants are immutable and hashable, use them for definitions
+that are shared between sessions, scenes and objects keep per session state
+(active_object...) so they only come in the mutable flavor
+
+subclassing works as usual, e.g. ``class TheCursedRoom(CompactGameScene)``,
+subclasses get an instance __dict__ for their own attributes unless they
+declare __slots__ themselves
+
+the compact classes don't inherit from the regular ones, that would bring
+back the instance __dict__, they are registered as virtual subclasses
+instead, so ``isinstance(FrozenKeyword("look"), Keyword)`` holds
+"""
+import sys
+from dataclasses import dataclass, field, fields, MISSING
+from typing import Any, Callable, Dict, List, Optional
+
+from text_engine.engine import GameScene, GameObject
+from text_engine.intents import Keyword, KeywordIntent
+
+# attributes generated by @dataclass, recreated for the new class
+_GENERATED = ("__dict__", "__weakref__", "__init__", "__repr__", "__eq__", "__hash__",
+              "__setattr__", "__delattr__", "__match_args__",
+              "__dataclass_fields__", "__dataclass_params__",
+              "__abstractmethods__", "_abc_impl")  # ABCMeta bookkeeping of the regular classes
+
+
+def _getstate(self) -> List[Any]:
+    return [getattr(self, name) for name in self.__slots__]
+
+
+def _setstate(self, state: List[Any]) -> None:
+    for name, value in zip(self.__slots__, state):
+        object.__setattr__(self, name, value)  # frozen instances can be unpickled too
+
+
+def _slotted(cls: type, name: str, frozen: bool = False,
+             overrides: Optional[Dict[str, Callable]] = None) -> type:
+    """
+    Recreate a dataclass with __slots__, optionally frozen.
+
+    dataclass(slots=True) only exists since python 3.10, this does the same:
+    the class is built as a dataclass first, so field defaults end up in
+    __init__, then recreated with __slots__ in place of the default class
+    attributes.
+
+    Args:
+        cls: The dataclass to copy fields and methods from.
+        name: Name of the new class.
+        frozen: Make instances immutable and hashable.
+        overrides: Methods replacing the ones of cls.
+    """
+    cls_fields = fields(cls)
+    names = tuple(f.name for f in cls_fields)
+    namespace = {k: v for k, v in vars(cls).items() if k not in _GENERATED and k not in names}
+    namespace.update(overrides or {})
+    namespace["__annotations__"] = {f.name: f.type for f in cls_fields}
+    namespace["__qualname__"] = name
+    namespace["__module__"] = __name__
+    for f in cls_fields:
+        if f.default is not MISSING:
+            namespace[f.name] = f.default
+        elif f.default_factory is not MISSING:
+            namespace[f.name] = field(default_factory=f.default_factory)
+    if frozen:
+        namespace["__getstate__"] = _getstate
+        namespace["__setstate__"] = _setstate
+    built = dataclass(frozen=frozen)(type(name, (), namespace))
+
+    namespace = {k: v for k, v in vars(built).items()
+                 if k not in ("__dict__", "__weakref__") and k not in names}
+    namespace["__slots__"] = names
+    slotted = type(name, (), namespace)
+    cls.register(slotted)  # isinstance checks against the regular class keep working
+    return slotted
+
+
+def _keyword_post_init(self) -> None:
+    samples = self.samples or (self.name,)
+    object.__setattr__(self, "samples", tuple(sys.intern(s) for s in samples))
+
+
+def _intent_post_init(self) -> None:
+    object.__setattr__(self, "required", tuple(self.required))
+    object.__setattr__(self, "optional", tuple(self.optional or ()))
+    object.__setattr__(self, "excludes", tuple(self.excludes or ()))
+
+
+CompactKeyword = _slotted(Keyword, "CompactKeyword",
+                          overrides={"__post_init__": _keyword_post_init,
+                                     "__setattr__": Keyword.__setattr__})  # records sample edits
+FrozenKeyword = _slotted(Keyword, "FrozenKeyword", frozen=True,
+                         overrides={"__post_init__": _keyword_post_init})
+CompactKeywordIntent = _slotted(KeywordIntent, "CompactKeywordIntent",
+                                overrides={"__post_init__": _intent_post_init})
+FrozenKeywordIntent = _slotted(KeywordIntent, "FrozenKeywordIntent", frozen=True,
+                               overrides={"__post_init__": _intent_post_init})
+CompactGameScene = _slotted(GameScene, "CompactGameScene")
+CompactGameObject = _slotted(GameObject, "CompactGameObject")
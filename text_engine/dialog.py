@@ -1,26 +1,155 @@
 import os.path
 import random
-from typing import Optional
+import string
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from text_engine.textstore import TextDocument, TextStore
 from text_engine.utils import load_template_file
 
+_FORMATTER = string.Formatter()
+
+
+class DialogTemplate:
+    """
+    A dialog line with named slots, e.g. ``"you pick up the {item}"``.
+
+    The line is parsed once, rendering only looks up and formats the slots.
+    Slots missing from the call are left in the text as they are, lines
+    without slots (or that are not valid format strings) are returned as written.
+    """
+    __slots__ = ("text", "_parts")
+
+    def __init__(self, text: str):
+        self.text = text
+        # (literal, field, conversion, format_spec), field is None for the trailing literal
+        self._parts: Optional[List[Tuple[str, Optional[str], Optional[str], str]]] = None
+        if "{" not in text:
+            return
+        try:
+            parts = [(literal, field, conversion, spec or "")
+                     for literal, field, spec, conversion in _FORMATTER.parse(text)]
+        except ValueError:
+            return
+        if any(field for _, field, _, _ in parts):
+            self._parts = parts
+
+    @property
+    def has_slots(self) -> bool:
+        return self._parts is not None
+
+    def render(self, slots: Dict[str, Any]) -> str:
+        if self._parts is None:
+            return self.text
+        out = []
+        for literal, field, conversion, spec in self._parts:
+            out.append(literal)
+            if field is None:
+                continue
+            try:
+                value = _FORMATTER.get_field(field, (), slots)[0]
+            except (KeyError, IndexError, AttributeError):
+                out.append(_placeholder(field, conversion, spec))
+                continue
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            out.append(format(value, spec))
+        return "".join(out)
+
+    def __repr__(self) -> str:
+        return f"DialogTemplate({self.text!r})"
+
+
+def _placeholder(field: str, conversion: Optional[str], spec: str) -> str:
+    return "{" + field + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}"
+
+
+def compile_dialog(path: str) -> List[DialogTemplate]:
+    """expand a .dialog file and compile its lines"""
+    return [DialogTemplate(line) for line in load_template_file(path)]
+
 
 class DialogRenderer:
-    def __init__(self, directory: Optional[str] = None):
+    def __init__(self, directory: Optional[str] = None, artifacts: Optional['ArtifactCache'] = None):
         self.directory = directory
+        self.artifacts = artifacts  # pre-rendered lines, see text_engine.prerender
+        self._lines: Dict[str, List[DialogTemplate]] = {}
+        self.texts = TextStore(directory) if directory else None
 
-    def get_dialog(self, name: str) -> str:
-        """returns a random line from a dialog file"""
+    def get_dialog(self, name: str, rng: Optional[random.Random] = None, /, **slots: Any) -> str:
+        """returns a random line from a dialog file, picked with rng if given, e.g. a seeded per session stream
+
+        named slots in the line, e.g. {item}, are filled from the keyword arguments,
+        name and rng are positional only so slots may use those names too"""
         if not self.directory:
             return name
-        path = os.path.join(self.directory, name + ".dialog")
-        lines = load_template_file(path)
-        return random.choice(lines)
+        lines = self._lines.get(name)
+        if lines is None:
+            path = os.path.join(self.directory, name + ".dialog")
+            lines = self._lines[name] = compile_dialog(path)
+        return (rng or random).choice(lines).render(slots)
+
+    def get_dialog_artifact(self, name: str, rng: Optional[random.Random] = None, /,
+                            **slots: Any) -> Tuple[str, Optional[str]]:
+        """like get_dialog, also returns the path of the line's pre-rendered artifact, None if there is none"""
+        text = self.get_dialog(name, rng, **slots)
+        return text, self.artifact(text)
+
+    def artifact(self, text: str) -> Optional[str]:
+        """path of the pre-rendered artifact of a line, e.g. from an on_print hook, None if there is none"""
+        if self.artifacts is None:
+            return None
+        return self.artifacts.get(text)
+
+    def preload(self) -> None:
+        """load every dialog file up front, e.g. before forking worker processes that share them"""
+        if not self.directory:
+            return
+        for root, _, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(".dialog"):
+                    path = os.path.join(root, fname)
+                    name = os.path.splitext(os.path.relpath(path, self.directory))[0]
+                    self._lines[name] = compile_dialog(path)
+        self.texts.preload()
+
+    def get_text(self, name: str, page: Optional[int] = None) -> str:
+        """sometimes we need to load a full text file, not line by line
 
-    def get_text(self, name: str) -> str:
-        """sometimes we need to load a full text file, not line by line"""
+        text files are memory mapped and indexed once, pass page to only read one page,
+        pages are separated by blank lines"""
         if not self.directory:
             return name
-        path = os.path.join(self.directory, name + ".txt")
-        with open(path) as f:
-            return f.read()
+        doc = self.texts.get(name)
+        return doc.text() if page is None else doc.page(page)
+
+    def iter_text(self, name: str, page: Optional[int] = None) -> Iterator[str]:
+        """yields the paragraphs (non blank lines) of a text file one at a time, of a single page if given"""
+        if not self.directory:
+            yield name
+            return
+        yield from self.texts.get(name).iter_paragraphs(page)
+
+    def get_document(self, name: str) -> TextDocument:
+        """the indexed text file, for page and paragraph counts or random access"""
+        return self.texts.get(name)
+
+    def memory_report(self, shared: Iterable[Any] = ()) -> 'MemoryReport':
+        """bytes used by the cached dialog lines and text files, see text_engine.memory"""
+        from text_engine.memory import MemoryWalker
+        walker = MemoryWalker(shared)
+        self._measure_memory(walker)
+        return walker.report
+
+    def _measure_memory(self, walker: 'MemoryWalker') -> None:
+        walker.add("dialog lines", self._lines)
+        walker.add("texts", self.texts)
+        walker.add("dialog renderer", self)
+
+    def reload(self, name: Optional[str] = None) -> None:
+        """drop cached dialog lines so they are read again on next use, all of them if no name is given"""
+        if name is None:
+            self._lines = {}
+        else:
+            self._lines.pop(name, None)
+        if self.texts is not None:
+            self.texts.reload(name)
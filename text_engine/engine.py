@@ -1,9 +1,16 @@
+import random
 import threading
+from abc import ABCMeta
 from dataclasses import dataclass
-from typing import Callable, List, Union, Tuple, Optional
+from typing import Any, Callable, ClassVar, Dict, Iterable, List, Union, Tuple, Optional, Hashable
 
+from text_engine.checkpoints import CheckpointRing
 from text_engine.dialog import DialogRenderer
 from text_engine.intents import Keyword, KeywordIntent, IntentEngine
+from text_engine.output import OutputSink
+from text_engine.routing import SceneRouter
+from text_engine.scheduler import TurnScheduler, ScheduledEvent, CachedCheck, EventCallback
+from text_engine.scenes import SceneRegistry, SceneLoader
 
 # Typing aliases
 GetUserInputHandler = Optional[Callable[['IFGameEngine', str], str]]  # args: game, input_prompt
@@ -22,6 +29,8 @@ class GameHandlers:
     Attributes:
         is_win: Callable that determines if the game is won.
         is_loss: Callable that determines if the game is lost.
+            Decorate conditions with scheduler.depends_on so they are only
+            evaluated again when the state they read changed.
         on_start: Called before the first game turn.
         on_win: Called when the game is won.
         on_lose: Called when the game is lost.
@@ -49,6 +58,17 @@ class GameHandlers:
     on_print: PrintOutputHandler = lambda g, u: print(u)  # allow games to handle print their own way
 
 
+_DEFAULT_PARSER: Optional[IntentEngine] = None
+
+
+def _default_parser() -> IntentEngine:
+    """the IntentEngine shared by GameIntents created without a parser, built on first use"""
+    global _DEFAULT_PARSER
+    if _DEFAULT_PARSER is None:
+        _DEFAULT_PARSER = IntentEngine()
+    return _DEFAULT_PARSER
+
+
 @dataclass
 class GameIntents:
     """
@@ -59,9 +79,11 @@ class GameIntents:
         parser: IntentEngine used for parsing intents.
     """
     intents: List[KeywordIntent]
-    parser: IntentEngine = IntentEngine()
+    parser: Optional[IntentEngine] = None  # shared default engine if not given
 
     def __post_init__(self):
+        if self.parser is None:
+            self.parser = _default_parser()
         for intent in self.intents:
             self.parser.register_intent(intent)
 
@@ -75,14 +97,24 @@ class GameIntents:
         Returns:
             A tuple containing the matched intent (if any) and its confidence score.
         """
-        intents = self.parser.calc_intents(utterance)
-        if intents:
-            return intents[0]
-        return None, 0.0
+        return self.parser.calc_intent(utterance)
+
+    def parse(self, utterance: str) -> Tuple[Optional[KeywordIntent], float, str]:
+        """
+        Predict the intent for a given utterance, tolerating typos if the parser allows it.
+
+        Args:
+            utterance: The user's input.
+
+        Returns:
+            A tuple containing the matched intent (if any), its confidence
+            score and the utterance it matched, with typos corrected.
+        """
+        return self.parser.resolve(utterance)
 
 
 @dataclass
-class GameScene:
+class GameScene(metaclass=ABCMeta):
     """
     Represents a scene in the game.
 
@@ -91,11 +123,18 @@ class GameScene:
         game_objects: List of objects within the scene.
         active_object: Index of the currently active game object.
         intents: GameIntents for handling scene-specific interactions.
+        router: Optional SceneRouter, picks the object and intent in a single
+            pass and focuses objects named in the utterance automatically.
+        state_fields: Class attribute naming the attributes that make up the
+            scene's state, used by snapshots and checkpoints. None snapshots
+            every attribute holding plain data.
     """
+    state_fields: ClassVar[Optional[Tuple[str, ...]]] = None
     description: str
     game_objects: Optional[List['GameObject']] = None
     active_object: int = -1  # idx from game_objects
     intents: Optional[GameIntents] = None
+    router: Optional[SceneRouter] = None
 
     def __post_init__(self):
         self.game_objects = self.game_objects or []
@@ -115,11 +154,13 @@ class GameScene:
         Returns:
             A response string based on the interaction.
         """
+        if self.router:
+            return self.router.interact(self, game, utterance)
         if self.intents:
-            intent, score = self.intents.predict(utterance)
+            intent, score, corrected = self.intents.parse(utterance)
             if score > 0.5:
                 # change scenes here if needed via game.activate/add/remove_scene
-                return intent.handler(game, utterance)
+                return intent.handler(game, corrected)
 
         if not self.game_objects or self.active_object == -1:
             return self.description
@@ -129,7 +170,7 @@ class GameScene:
 
 
 @dataclass
-class GameObject:
+class GameObject(metaclass=ABCMeta):
     """
     Represents an object within a game scene.
 
@@ -157,7 +198,7 @@ class GameObject:
         Returns:
             A response string based on the interaction.
         """
-        intent, score = self.intent_handlers.predict(utterance)
+        intent, score, utterance = self.intent_handlers.parse(utterance)
         # change game.active_scene.active_object here as needed
         if score < 0.5:
             return self.default_dialog
@@ -169,117 +210,353 @@ class IFGameEngine(threading.Thread):
     Interactive Fiction Game Engine.
 
     Attributes:
-        scenes: List of game scenes.
+        scenes: Registry of game scenes, a plain list of scenes is also accepted.
         handlers: Event callbacks.
         dialog_renderer: Renderer for dialog texts.
+        output: Sink receiving printed text, by default every line goes
+            straight to handlers.on_print, use a BufferedSink to emit
+            each turn's output at once.
+        seed: Seed of the session's random stream ``rng``, picked at random
+            if not given, a game played again with the same seed and
+            inputs produces the same output.
+        checkpoints: Number of turns that can be undone, see undo. 0 disables
+            checkpoints. Scenes should declare their ``state_fields``.
     """
 
     def __init__(self,
-                 scenes: List['GameScene'],
+                 scenes: Union[List['GameScene'], SceneRegistry],
                  handlers: GameHandlers,
-                 dialog_renderer: Optional[DialogRenderer] = None):
+                 dialog_renderer: Optional[DialogRenderer] = None,
+                 output: Optional[OutputSink] = None,
+                 seed: Optional[int] = None,
+                 checkpoints: int = 0):
         super().__init__()
         self.current_turn: int = 1
-        self.scenes = scenes
+        self.scenes = scenes if isinstance(scenes, SceneRegistry) else SceneRegistry(scenes)
         self.handlers = handlers
         self.running = threading.Event()
-        self._active_scene = 0
         self.dialog_renderer = dialog_renderer
+        self.output = output or OutputSink()
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)  # use this instead of the random module in game logic
+        self.scheduler = TurnScheduler()
+        self._checks: Dict[Callable, CachedCheck] = {}
+        self.checkpoints: Optional[CheckpointRing] = CheckpointRing(checkpoints) if checkpoints else None
+        self._in_turn = False
+        self._turn_undone = False  # undo was called by the turn in progress
         assert len(self.scenes) > 0
+        self._active_scene: Hashable = self.scenes.key_of(0)
+
+    def memory_report(self, shared: Iterable[Any] = ()) -> 'MemoryReport':
+        """
+        Bytes used by this session, by category.
+
+        Walks the intent engines of the loaded scenes, the dialog renderer,
+        the scenes and the session state. Data also reachable from the
+        shared objects, and the default intent engine shared by GameIntents
+        created without a parser, is reported as shared.
+
+        Args:
+            shared: Objects known to be shared, e.g. another session of the same game.
+
+        Returns:
+            A MemoryReport, see text_engine.memory.
+        """
+        from text_engine.memory import MemoryWalker
+        walker = MemoryWalker(shared)
+        if _DEFAULT_PARSER is not None:
+            walker.mark_shared(_DEFAULT_PARSER)
+        engines = {}
+        for scene in self.scenes.loaded():
+            if scene.intents:
+                engines[id(scene.intents.parser)] = scene.intents.parser
+            for obj in scene.game_objects:
+                engines[id(obj.intent_handlers.parser)] = obj.intent_handlers.parser
+        for engine in engines.values():
+            engine._measure_memory(walker)
+        if self.dialog_renderer is not None:
+            self.dialog_renderer._measure_memory(walker)
+        walker.add("scenes", self.scenes)
+        walker.add("scheduler", self.scheduler, self._checks)
+        walker.add("checkpoints", self.checkpoints)
+        walker.add("session", self)
+        return walker.report
 
     def print(self, text: str):
         """Print a message to the console."""
-        self.handlers.on_print(self, text)
+        self.output.write(self, text)
+
+    def flush(self):
+        """Emit any output still buffered by the output sink."""
+        self.output.flush(self)
 
-    def get_dialog(self, name: str) -> str:
+    def get_dialog(self, name: str, /, **slots: Any) -> str:
         """
         Retrieve a dialog by name.
 
         Args:
             name: The name of the dialog.
+            **slots: Values for the named slots of the dialog, e.g. ``item="key"`` for ``{item}``,
+                slots may also be called ``name``.
 
         Returns:
             The dialog text.
         """
-        return self.dialog_renderer.get_dialog(name)
+        return self.dialog_renderer.get_dialog(name, self.rng, **slots)
 
-    def speak_dialog(self, name: str):
-        """Retrieve and print a dialog by name."""
-        self.print(self.get_dialog(name))
+    def get_dialog_artifact(self, name: str, /, **slots: Any) -> Tuple[str, Optional[str]]:
+        """
+        Retrieve a dialog by name, with the path of its pre-rendered artifact.
+
+        Returns:
+            The dialog text and the artifact path, None if the line was not
+            pre-rendered, see text_engine.prerender.
+        """
+        return self.dialog_renderer.get_dialog_artifact(name, self.rng, **slots)
+
+    def speak_dialog(self, name: str, /, **slots: Any):
+        """Retrieve and print a dialog by name, filling its named slots."""
+        self.print(self.get_dialog(name, **slots))
+
+    def speak_text(self, name: str, page: Optional[int] = None):
+        """
+        Print a long text file paragraph by paragraph.
+
+        Each paragraph is read from the memory mapped file and printed as
+        soon as it is decoded, so ``on_print`` receives the text incrementally.
+
+        Args:
+            name: The name of the text file.
+            page: Only print this page, pages are separated by blank lines.
+        """
+        for paragraph in self.dialog_renderer.iter_text(name, page):
+            self.print(paragraph)
 
     @property
     def active_scene(self) -> 'GameScene':
         """Return the currently active scene."""
-        return self.scenes[self._active_scene]
+        return self.scenes.get(self._active_scene)
 
-    def activate_scene(self, scene: Union[int, 'GameScene']):
+    def activate_scene(self, scene: Union[int, Hashable, 'GameScene']):
         """
         Activate a specific scene.
 
         Args:
-            scene: The scene to activate (by index or instance).
+            scene: The scene to activate (by index, key or instance).
         """
-        if isinstance(scene, int):
-            self._active_scene = scene
-        else:
-            self._active_scene = self.scenes.index(scene)
+        self._active_scene = self.scenes.key_of(scene)
+        self.scenes.activate(self._active_scene)
         self.print(self.active_scene.description)
 
-    def add_scene(self, scene: 'GameScene'):
-        """Add a new scene to the game."""
-        if scene not in self.scenes:
-            self.scenes.append(scene)
+    def add_scene(self, scene: 'GameScene', key: Optional[Hashable] = None):
+        """Add a new scene to the game, optionally under a key."""
+        self.scenes.add(scene, key)
+
+    def add_scene_loader(self, key: Hashable, factory: Callable[[], 'GameScene'],
+                         adjacent: Optional[List[Hashable]] = None,
+                         state_fields: Optional[List[str]] = None):
+        """
+        Add a scene that is only built when first activated.
+
+        Args:
+            key: The key used to activate the scene.
+            factory: Callable that builds the scene.
+            adjacent: Keys of scenes reachable from this one, for prefetching.
+            state_fields: Attributes kept when the scene is unloaded.
+        """
+        self.scenes.add_loader(key, SceneLoader(factory=factory,
+                                                adjacent=adjacent or [],
+                                                state_fields=state_fields))
 
-    def remove_scene(self, scene: Union[int, 'GameScene']):
+    def remove_scene(self, scene: Union[int, Hashable, 'GameScene']):
         """
         Remove a scene from the game.
 
         Args:
-            scene: The scene to remove (by index or instance).
+            scene: The scene to remove (by index, key or instance).
         """
-        if isinstance(scene, int):
-            scene = self.scenes[scene]
         self.scenes.remove(scene)
 
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Snapshot the session: turn, random stream and the state of every scene.
+
+        The snapshot only holds plain data, it can be pickled and restored
+        with set_state into a game built the same way, e.g. in another process.
+        Scheduled events are not included.
+        """
+        return {"turn": self.current_turn,
+                "running": self.running.is_set(),
+                "seed": self.seed,
+                "rng": self.rng.getstate(),
+                "active_scene": self.scenes.index(self._active_scene),
+                "scenes": self.scenes.snapshot()}
+
+    def set_state(self, state: Dict[str, Any]):
+        """Restore a snapshot taken with get_state."""
+        self.current_turn = state["turn"]
+        self.seed = state["seed"]
+        self.rng.setstate(state["rng"])
+        self.scenes.restore(state["scenes"])
+        self._active_scene = self.scenes.key_of(state["active_scene"])
+        if state["running"]:
+            self.running.set()
+        else:
+            self.running.clear()
+        if self.checkpoints is not None:
+            self.checkpoints.clear()  # older turns belong to another timeline
+
+    def undo(self, turns: int = 1) -> bool:
+        """
+        Rewind the session to its state before the last turns.
+
+        Restores the turn counter, random stream, active scene and scene
+        state, also after a lost or won turn, without printing anything.
+        Scheduled events and scenes added after the checkpoint are not
+        rewound.
+
+        Called during a turn, e.g. by the handler of an "undo" intent, the
+        turn in progress is rewound too and ends once the handler returns:
+        its answer is printed but nothing else of the turn runs, the turn
+        counter doesn't advance.
+
+        Args:
+            turns: Number of turns to undo, not counting the turn in progress.
+
+        Returns:
+            False if checkpoints are disabled or fewer turns were recorded.
+        """
+        if self._in_turn:
+            turns += 1  # the checkpoint recorded by the turn in progress
+        if self.checkpoints is None or not 0 < turns <= len(self.checkpoints):
+            return False
+        self.checkpoints.restore(self, turns)
+        self._turn_undone = self._in_turn
+        return True
+
     def run(self):
         """Run the game loop."""
+        self.begin()
+        while self.running.is_set():
+            self.flush()  # the whole previous turn is emitted before waiting for input
+            try:
+                utt = self.handlers.on_input(self, "> ")
+            except EOFError:  # input closed, e.g. end of a replayed transcript
+                break
+            self.turn(utt)
+        self.finish()
+
+    def begin(self):
+        """
+        Start the game without a game loop, see turn.
+
+        Hosts that receive input from elsewhere (a web server, a worker
+        process...) call begin once, then turn for every input while
+        running is set, then finish.
+        """
         self.running.set()
         if self.handlers.on_start:
             self.handlers.on_start(self)
         self.print(self.active_scene.description)
-        while self.running.is_set():
-            if self.handlers.before_turn:
+        if self.handlers.before_turn:
+            self.handlers.before_turn(self)
+
+    def turn(self, utterance: str) -> bool:
+        """
+        Play a single turn.
+
+        Args:
+            utterance: The user's input.
+
+        Returns:
+            True if the game is still running.
+        """
+        if self.checkpoints is not None:
+            self.checkpoints.record(self)
+        if self.handlers.before_interaction:
+            self.handlers.before_interaction(self, utterance)
+
+        self._in_turn, self._turn_undone = True, False
+        try:
+            ans = self.active_scene.interact(self, utterance)
+        finally:
+            self._in_turn = False
+
+        if self.handlers.after_interaction:
+            self.handlers.after_interaction(self, utterance, ans)
+
+        if ans:
+            self.print(ans)
+
+        if self._turn_undone:
+            # rewound to before an earlier turn, which is played again next
+            if self.running.is_set() and self.handlers.before_turn:
                 self.handlers.before_turn(self)
-            utt = input("> ")
+            return self.running.is_set()
+
+        if self._check(self.handlers.is_win):
+            if self.handlers.on_win:
+                self.handlers.on_win(self)
+            self.running.clear()
+            return False
+        if self._check(self.handlers.is_loss):
+            if self.handlers.on_lose:
+                self.handlers.on_lose(self)
+            self.running.clear()
+            return False
+        if self.handlers.end_turn:
+            self.handlers.end_turn(self)
+        self.scheduler.run_due(self, self.current_turn)
+        self.advance()
+        if self.handlers.after_turn:
+            self.handlers.after_turn(self)
+        if self.running.is_set() and self.handlers.before_turn:
+            self.handlers.before_turn(self)
+        return self.running.is_set()
+
+    def finish(self):
+        """End the game, see begin."""
+        self.running.clear()
+        if self.handlers.on_end:
+            self.handlers.on_end(self)
+        self.flush()
 
-            if self.handlers.before_interaction:
-                self.handlers.before_interaction(self, utt)
+    def _check(self, condition: Callable[['IFGameEngine'], bool]) -> bool:
+        """evaluate a win/loss condition, skipped if its declared dependencies didn't change"""
+        check = self._checks.get(condition)
+        if check is None:
+            check = self._checks[condition] = CachedCheck(condition)
+        return check(self)
+
+    def schedule_at(self, turn: int, callback: EventCallback) -> ScheduledEvent:
+        """
+        Call ``callback(game)`` at the end of the given turn, after end_turn.
 
-            ans = self.active_scene.interact(self, utt)
+        Returns:
+            The scheduled event, see cancel.
+        """
+        return self.scheduler.schedule_at(turn, callback)
 
-            if self.handlers.after_interaction:
-                self.handlers.after_interaction(self, utt, ans)
+    def schedule_in(self, turns: int, callback: EventCallback) -> ScheduledEvent:
+        """Call ``callback(game)`` at the end of the turn ``turns`` turns from now."""
+        return self.scheduler.schedule_at(self.current_turn + turns, callback)
 
-            if ans:
-                self.print(ans)
+    def schedule_every(self, interval: int, callback: EventCallback,
+                       start: Optional[int] = None) -> ScheduledEvent:
+        """
+        Call ``callback(game)`` every ``interval`` turns.
 
-            if self.handlers.is_win(self):
-                if self.handlers.on_win:
-                    self.handlers.on_win(self)
-                break
-            if self.handlers.is_loss(self):
-                if self.handlers.on_lose:
-                    self.handlers.on_lose(self)
-                break
-            if self.handlers.end_turn:
-                self.handlers.end_turn(self)
-            self.advance()
-            if self.handlers.after_turn:
-                self.handlers.after_turn(self)
+        Args:
+            interval: Turns between calls.
+            callback: Called with the game.
+            start: First turn to fire on, by default ``interval`` turns from now.
+        """
+        start = self.current_turn + interval if start is None else start
+        return self.scheduler.schedule_at(start, callback, interval=interval)
 
-        self.running.clear()
-        if self.handlers.on_end:
-            self.handlers.on_end(self)
+    def cancel(self, event: ScheduledEvent):
+        """Cancel a scheduled event."""
+        self.scheduler.cancel(event)
 
     def advance(self):
         """advance to next turn"""
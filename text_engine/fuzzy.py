@@ -0,0 +1,142 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+from text_engine.utils import word_tokenize
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """
+    All the strings obtained by deleting up to max_distance characters from word.
+    """
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus transpositions).
+
+    Returns max_distance + 1 as soon as the distance is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def keyword_tokens(kw: 'Keyword') -> List[str]:
+    """
+    The vocabulary words of a keyword, the tokens of its samples.
+    """
+    return [token for sample in kw.samples for token in word_tokenize(sample.lower())]
+
+
+class FuzzyIndex:
+    """
+    Symmetric deletion index for typo tolerant lookup of vocabulary words.
+
+    Every word is stored under all the strings obtained by deleting up to
+    ``max_distance`` characters. A lookup generates the same deletions for
+    the typed token, so it only touches the few words sharing a deletion
+    instead of computing edit distances against the whole vocabulary.
+
+    Words are reference counted, the same word added for several keywords
+    stays in the index until it was removed as many times, so the index can
+    follow keywords being added and removed.
+
+    Attributes:
+        max_distance: Maximum edit distance of a correction.
+        min_length: Tokens shorter than this are never corrected.
+    """
+
+    def __init__(self, words: Iterable[str] = (), max_distance: int = 1, min_length: int = 3):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.words: Dict[str, int] = {}  # word -> times added
+        self.index: Dict[str, Set[str]] = {}
+        for word in words:
+            self.add(word)
+
+    @classmethod
+    def from_keywords(cls, keywords: Mapping[int, 'Keyword'], max_distance: int = 1,
+                      min_length: int = 3) -> 'FuzzyIndex':
+        """
+        Build an index over the tokens of all keyword samples.
+        """
+        return cls((token for kw in keywords.values() for token in keyword_tokens(kw)),
+                   max_distance=max_distance, min_length=min_length)
+
+    def add(self, word: str) -> None:
+        """
+        Add a vocabulary word.
+        """
+        if len(word) < self.min_length:
+            return
+        count = self.words.get(word, 0)
+        self.words[word] = count + 1
+        if count:
+            return
+        for variant in deletes(word, self.max_distance):
+            self.index.setdefault(variant, set()).add(word)
+
+    def remove(self, word: str) -> None:
+        """
+        Remove a vocabulary word, once removed as many times as it was added.
+        """
+        count = self.words.get(word)
+        if count is None:
+            return
+        if count > 1:
+            self.words[word] = count - 1
+            return
+        del self.words[word]
+        for variant in deletes(word, self.max_distance):
+            variants = self.index.get(variant)
+            if variants is not None:
+                variants.discard(word)
+                if not variants:
+                    del self.index[variant]
+
+    def lookup(self, token: str) -> Optional[str]:
+        """
+        Get the closest vocabulary word within max_distance, None if there is none.
+        """
+        if token in self.words:
+            return token
+        if len(token) < self.min_length:
+            return None
+        candidates = set()
+        for variant in deletes(token, self.max_distance):
+            candidates |= self.index.get(variant, set())
+        best, best_distance = None, self.max_distance + 1
+        for word in sorted(candidates):  # sorted so ties always resolve the same way
+            distance = edit_distance(token, word, self.max_distance)
+            if distance < best_distance:
+                best, best_distance = word, distance
+        return best
+
+    def correct(self, utterance: str) -> str:
+        """
+        Replace every token that is not in the vocabulary by its closest word, if any.
+
+        The utterance is returned unchanged when nothing was corrected.
+        """
+        tokens = word_tokenize(utterance.lower())
+        corrected = [self.lookup(token) or token for token in tokens]
+        if corrected == tokens:
+            return utterance
+        return " ".join(corrected)
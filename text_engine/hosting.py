@@ -0,0 +1,320 @@
+"""host game sessions on several worker processes
+
+the GIL limits a single process to one core, ShardedHost forks worker
+processes that each play a share of the sessions
+
+read-only world data (keywords, intents, dialogs...) is built once by the
+parent in ``preload`` and inherited copy-on-write by the forked workers, it
+is moved to the permanent GC generation with gc.freeze() before forking so
+garbage collections in the workers don't touch (and copy) its pages
+
+sessions are assigned to workers by consistent hashing of the session id,
+a session can move to another worker through its get_state() snapshot
+
+workers are forked, this needs a platform with fork (linux, macos)
+"""
+import bisect
+import gc
+import hashlib
+import multiprocessing
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from text_engine.engine import IFGameEngine
+from text_engine.intents import DEBUG
+
+SessionFactory = Callable[[str, Optional[int]], IFGameEngine]  # args: session_id, seed
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Every node is placed on the ring ``replicas`` times, adding or removing
+    a node only moves the keys of that node.
+    """
+
+    def __init__(self, nodes: Optional[List[int]] = None, replicas: int = 64):
+        self.replicas = replicas
+        self._hashes: List[int] = []
+        self._nodes: Dict[int, int] = {}  # hash -> node
+        for node in nodes or []:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, node: int) -> None:
+        for replica in range(self.replicas):
+            h = self._hash(f"{node}:{replica}")
+            if h not in self._nodes:
+                bisect.insort(self._hashes, h)
+                self._nodes[h] = node
+
+    def remove(self, node: int) -> None:
+        for replica in range(self.replicas):
+            h = self._hash(f"{node}:{replica}")
+            if self._nodes.get(h) == node:
+                del self._nodes[h]
+                self._hashes.remove(h)
+
+    def node_for(self, key: str) -> int:
+        if not self._hashes:
+            raise LookupError("hash ring is empty")
+        idx = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[self._hashes[idx]]
+
+
+@dataclass
+class TurnResult:
+    """
+    Output of a request to a hosted session.
+
+    Attributes:
+        output: Everything the game printed.
+        running: False once the game ended, the session is closed then.
+        status: "ok", or why the turn was not (fully) played, e.g.
+            "rate_limited" or "timeout" from a SessionScheduler.
+    """
+    output: List[str] = field(default_factory=list)
+    running: bool = True
+    status: str = "ok"
+
+
+def _worker_main(conn: 'multiprocessing.connection.Connection', factory: SessionFactory) -> None:
+    gc.enable()  # disabled by the parent while forking
+    games: Dict[str, IFGameEngine] = {}
+    outputs: Dict[str, List[str]] = {}
+
+    def build(session_id: str, seed: Optional[int]) -> IFGameEngine:
+        game = factory(session_id, seed)
+        out = outputs[session_id] = []
+        game.handlers = replace(game.handlers, on_print=lambda g, text: out.append(text))
+        games[session_id] = game
+        return game
+
+    def result(session_id: str, running: bool) -> TurnResult:
+        out = outputs.get(session_id, [])
+        res = TurnResult(output=list(out), running=running)
+        out.clear()
+        if not running:
+            games.pop(session_id, None)
+            outputs.pop(session_id, None)
+        return res
+
+    while True:
+        try:
+            op, session_id, payload = conn.recv()
+        except EOFError:
+            return
+        try:
+            if op == "stop":
+                conn.send(("ok", len(games)))
+                return
+            elif op == "open":
+                game = build(session_id, payload)
+                game.begin()
+                game.flush()
+                reply = result(session_id, game.running.is_set())
+            elif op == "turn":
+                game = games[session_id]
+                running = game.turn(payload)
+                if not running:
+                    game.finish()
+                game.flush()
+                reply = result(session_id, running)
+            elif op == "get_state":
+                reply = games[session_id].get_state()
+            elif op == "set_state":
+                game = build(session_id, payload["seed"])
+                game.set_state(payload)
+                reply = None
+            elif op == "close":
+                game = games.get(session_id)
+                if game is not None:
+                    game.finish()
+                    game.flush()
+                reply = result(session_id, False)
+            elif op == "drop":
+                games.pop(session_id, None)
+                outputs.pop(session_id, None)
+                reply = None
+            elif op == "count":
+                reply = len(games)
+            else:
+                raise ValueError(f"unknown operation: {op}")
+            conn.send(("ok", reply))
+        except Exception as e:
+            try:
+                conn.send(("error", e))
+            except Exception:  # not picklable
+                conn.send(("error", RuntimeError(repr(e))))
+
+
+class _Worker:
+    def __init__(self, ctx, factory: SessionFactory):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, factory), daemon=True)
+        self.lock = threading.Lock()  # one request at a time per worker
+        self.process.start()
+        child.close()
+
+    def request(self, op: str, session_id: Optional[str] = None, payload: Any = None) -> Any:
+        with self.lock:
+            self.conn.send((op, session_id, payload))
+            status, reply = self.conn.recv()
+        if status == "error":
+            raise reply
+        return reply
+
+
+class ShardedHost:
+    """
+    Plays game sessions on a pool of forked worker processes.
+
+    Requests are thread safe, requests for sessions on different workers
+    run in parallel. Requests for the same session are played one at a
+    time, a turn that arrives while the session migrates waits for the
+    handoff and is played on the new worker.
+
+    Attributes:
+        factory: Builds the game of a session, called in the worker process.
+        n_workers: Number of worker processes.
+        preload: Called once in the parent before forking, builds the
+            shared read-only world data that the factory uses.
+        replicas: Points per worker on the consistent hash ring.
+    """
+
+    def __init__(self, factory: SessionFactory, workers: Optional[int] = None,
+                 preload: Optional[Callable[[], None]] = None, replicas: int = 64):
+        self.factory = factory
+        self.n_workers = workers or os.cpu_count() or 1
+        self.preload = preload
+        self.ring = HashRing(replicas=replicas)
+        self._workers: Dict[int, _Worker] = {}
+        self._placement: Dict[str, int] = {}  # session id -> worker, for open sessions
+        self._session_locks: Dict[str, threading.Lock] = {}  # held while a request or migration runs
+        self._lock = threading.Lock()
+
+    def start(self) -> 'ShardedHost':
+        """Build the shared world and fork the workers."""
+        ctx = multiprocessing.get_context("fork")
+        gc.disable()  # no collections between building the world and freezing it
+        try:
+            if self.preload:
+                self.preload()
+            gc.freeze()  # move everything to the permanent generation, never scanned by the workers
+            for idx in range(self.n_workers):
+                self._workers[idx] = _Worker(ctx, self.factory)
+                self.ring.add(idx)
+        finally:
+            gc.enable()
+        if DEBUG:
+            print(f"   - DEBUG: started {self.n_workers} workers, {gc.get_freeze_count()} frozen objects")
+        return self
+
+    def stop(self) -> None:
+        """Stop all workers, open sessions are discarded."""
+        for worker in self._workers.values():
+            try:
+                worker.request("stop")
+            except (EOFError, OSError):
+                pass
+            worker.process.join(timeout=5)
+        if self._workers:
+            gc.unfreeze()
+        self._workers.clear()
+        self._placement.clear()
+        self._session_locks.clear()
+
+    def __enter__(self) -> 'ShardedHost':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def worker_of(self, session_id: str) -> int:
+        """The worker a session is, or would be, played on."""
+        worker = self._placement.get(session_id)
+        return self.ring.node_for(session_id) if worker is None else worker
+
+    @contextmanager
+    def _hold(self, session_id: str) -> Iterator[None]:
+        """hold a session, its other requests wait until released"""
+        with self._lock:
+            lock = self._session_locks.setdefault(session_id, threading.Lock())
+        with lock:
+            yield
+
+    def _request(self, op: str, session_id: str, payload: Any = None) -> Any:
+        with self._hold(session_id):
+            # the worker is looked up once held, a migration may have just moved the session
+            return self._workers[self.worker_of(session_id)].request(op, session_id, payload)
+
+    def open(self, session_id: str, seed: Optional[int] = None) -> TurnResult:
+        """
+        Start a game for a new session.
+
+        Returns:
+            The game's opening output.
+        """
+        with self._hold(session_id):
+            worker = self.worker_of(session_id)
+            with self._lock:
+                self._placement[session_id] = worker
+            res = self._workers[worker].request("open", session_id, seed)
+        if not res.running:
+            self._forget(session_id)
+        return res
+
+    def turn(self, session_id: str, utterance: str) -> TurnResult:
+        """
+        Play a turn of a session, the session is closed once the game ends.
+        """
+        res = self._request("turn", session_id, utterance)
+        if not res.running:
+            self._forget(session_id)
+        return res
+
+    def close(self, session_id: str) -> TurnResult:
+        """
+        End a session's game early.
+        """
+        res = self._request("close", session_id)
+        self._forget(session_id)
+        return res
+
+    def get_state(self, session_id: str) -> Dict[str, Any]:
+        """Snapshot a session, see IFGameEngine.get_state."""
+        return self._request("get_state", session_id)
+
+    def migrate(self, session_id: str, worker: int) -> None:
+        """
+        Move a session to another worker through its state snapshot.
+
+        The session is held until the handoff is committed, its turns
+        arriving meanwhile wait and are then played on the new worker.
+        """
+        with self._hold(session_id):
+            source = self.worker_of(session_id)
+            if source == worker:
+                return
+            state = self._workers[source].request("get_state", session_id)
+            self._workers[worker].request("set_state", session_id, state)
+            with self._lock:
+                self._placement[session_id] = worker
+            self._workers[source].request("drop", session_id)
+
+    def sessions(self) -> Dict[str, int]:
+        """Open sessions and the worker each one is played on."""
+        with self._lock:
+            return dict(self._placement)
+
+    def _forget(self, session_id: str) -> None:
+        with self._lock:
+            self._placement.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
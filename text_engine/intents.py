@@ -1,26 +1,130 @@
+import json
 import os.path
-from dataclasses import dataclass
-from typing import List, Dict, Tuple, Optional, Callable
+from abc import ABCMeta
+import threading
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import FrozenInstanceError, dataclass, replace
+from typing import Any, List, Deque, Dict, Tuple, Optional, Callable, Set, Mapping, MutableMapping, Iterator, Iterable, FrozenSet, Sequence
 
-from json_database import JsonStorage
+from text_engine.fuzzy import FuzzyIndex, keyword_tokens
+from text_engine.normalize import Normalizer
 from text_engine.utils import load_template_file
 
+from immutables import Map as FrozenMap
+
 DEBUG = False  # just a helper during development
 
+BUNDLE_FILE = "engine.json"  # single file written by IntentEngine.save_all
+BUNDLE_VERSION = 1
+
+
+def _json_storage(path: str) -> 'JsonStorage':
+    # json_database is slow to import and only needed when saving/loading files
+    from json_database import JsonStorage
+    return JsonStorage(path)
+
+
 # Type alias for intent handler functions
 IntentHandler = Callable[['IFGameEngine', str], str]
 
 
+class _SampleEdits:
+    """
+    Log of the keywords whose samples were edited after they were created.
+
+    Every edit bumps ``generation``, intent engines compare it with the
+    generation they last synced at before each lookup and only then compile
+    the edited keywords again, see IntentEngine.sync_keywords.
+    """
+
+    def __init__(self, size: int = 1024):
+        self.generation = 0
+        self._log: Deque[Tuple[int, Optional[int]]] = deque(maxlen=size)  # (generation, keyword id)
+        self._lock = threading.Lock()
+
+    def record(self, kid: Optional[int]) -> None:
+        """
+        Record an edit of the keyword with the given id, None if not known.
+        """
+        with self._lock:
+            self.generation += 1
+            self._log.append((self.generation, kid))
+
+    def since(self, generation: int) -> Tuple[int, Optional[Set[int]]]:
+        """
+        Get the current generation and the ids of the keywords edited after
+        the given one, None if some are not known or the log doesn't reach
+        back that far.
+        """
+        with self._lock:
+            if self._log and self._log[0][0] > generation + 1:
+                return self.generation, None
+            kids = {kid for gen, kid in self._log if gen > generation}
+            return self.generation, None if None in kids else kids
+
+
+_sample_edits = _SampleEdits()
+
+
+def samples_generation() -> int:
+    """
+    Generation of keyword sample edits, changes whenever the samples of any keyword are edited.
+    """
+    return _sample_edits.generation
+
+
+class _Samples(list):
+    """keyword samples, edits in place are recorded like assigning new samples"""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return _Samples, (list(self),)
+
+
+def _recording(method: Callable) -> Callable:
+    def edit(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        _sample_edits.record(None)  # the list doesn't know its keyword
+        return result
+    edit.__name__ = method.__name__
+    return edit
+
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(_Samples, _name, _recording(getattr(list, _name)))
+
+
+def _set_keyword_attr(kw: 'Keyword', name: str, value: Any) -> None:
+    """assign a keyword attribute, samples assigned after __init__ are recorded as an edit"""
+    if name != "samples":
+        object.__setattr__(kw, name, value)
+        return
+    edited = getattr(kw, "samples", None) is not None
+    object.__setattr__(kw, name, _Samples(value) if isinstance(value, list) else value)
+    if edited:
+        _sample_edits.record(id(kw))
+
+
 @dataclass
-class Keyword:
+class Keyword(metaclass=ABCMeta):
     """
     Represents a keyword with associated sample phrases for matching.
+
+    Samples can be edited after the keyword was registered, by assignment
+    (e.g. Keyword.reload) or in place, the edit is recorded and every intent
+    engine using the keyword compiles it again on its next lookup.
     """
     name: str
     samples: Optional[List[str]] = None
 
     def __post_init__(self):
-        self.samples = self.samples or [self.name]
+        if not self.samples:
+            object.__setattr__(self, "samples", _Samples([self.name]))
+
+    __setattr__ = _set_keyword_attr
 
     @property
     def file_path(self) -> str:
@@ -68,7 +172,7 @@ class Keyword:
 
 
 @dataclass
-class KeywordIntent:
+class KeywordIntent(metaclass=ABCMeta):
     """
     Represents an intent defined by required, optional, and excluded keywords.
     """
@@ -95,7 +199,7 @@ class KeywordIntent:
         """
         path = os.path.join(directory, self.file_path)
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        db = JsonStorage(path)
+        db = _json_storage(path)
         db["name"] = self.name
         db["required"] = [k.name for k in self.required]
         db["optional"] = [k.name for k in self.optional]
@@ -111,7 +215,7 @@ class KeywordIntent:
         """
         Load an intent from a file.
         """
-        db = JsonStorage(path)
+        db = _json_storage(path)
         required = [Keyword(name) for name in db["required"]]
         optional = [Keyword(name) for name in db["optional"]]
         excludes = [Keyword(name) for name in db["excludes"]]
@@ -129,7 +233,7 @@ class KeywordIntent:
         """
         path = os.path.join(directory, self.file_path)
         if os.path.isfile(path):
-            db = JsonStorage(path)
+            db = _json_storage(path)
             self.name = db["name"]
             self.required = [Keyword(name) for name in db["required"]]
             self.optional = [Keyword(name) for name in db["optional"]]
@@ -154,64 +258,997 @@ class KeywordIntent:
         return max(0.8 + 0.2 * optional_score, 0.5)
 
 
+@dataclass
+class IntentStats:
+    """
+    Usage counters collected by the IntentEngine for a single intent.
+
+    Attributes:
+        hits: Number of times the intent was the best match for an utterance.
+        near_misses: Number of times the intent matched but lost to another intent.
+    """
+    hits: int = 0
+    near_misses: int = 0
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over the samples of many keywords.
+
+    Finds every keyword with a sample contained in the utterance, the same
+    check as Keyword.match, in one pass over the utterance regardless of how
+    many keywords and samples were compiled. Samples are read at compile
+    time, compile again after they change. With a normalizer, samples and
+    utterances are normalized by it instead of just lowercased.
+    """
+
+    def __init__(self, keywords: Mapping[int, Keyword], normalizer: Optional[Normalizer] = None):
+        self.normalizer = normalizer
+        self.goto: List[Dict[str, int]] = [{}]
+        self.outputs: List[FrozenSet[int]] = []
+        self.always: Set[int] = set()  # keywords with an empty sample match anything
+        outputs: List[Set[int]] = [set()]
+        for kid, kw in keywords.items():
+            for sample in compile_samples(kw, normalizer):
+                if not sample:
+                    self.always.add(kid)
+                    continue
+                node = 0
+                for ch in sample:
+                    nxt = self.goto[node].get(ch)
+                    if nxt is None:
+                        nxt = self.goto[node][ch] = len(self.goto)
+                        self.goto.append({})
+                        outputs.append(set())
+                    node = nxt
+                outputs[node].add(kid)
+        # breadth first, so failure links of shorter prefixes are ready first
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                outputs[nxt] |= outputs[self.fail[nxt]]
+        self.outputs = [frozenset(o) for o in outputs]
+
+    def match(self, utterance: str) -> Set[int]:
+        """
+        Get the ids of the keywords that match the utterance.
+        """
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set(self.always)
+        node = 0
+        for ch in normalize(utterance, self.normalizer):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if outputs[node]:
+                found |= outputs[node]
+        return found
+
+
+def compile_samples(kw: Keyword, normalizer: Optional[Normalizer] = None) -> Tuple[str, ...]:
+    """
+    The forms of a keyword's samples that utterances are matched against, without duplicates.
+
+    Normalized samples are padded with a space on each side, like normalized
+    utterances, so they only match whole tokens: a stem like "open" must not
+    match inside "opener".
+    """
+    if normalizer is None:
+        return tuple(dict.fromkeys(sample.lower() for sample in kw.samples))
+    return tuple(f" {sample} " if sample else sample for sample in normalizer.normalize_samples(kw.samples))
+
+
+def normalize(utterance: str, normalizer: Optional[Normalizer] = None) -> str:
+    """
+    The form of an utterance that keyword samples are matched against.
+    """
+    return f" {normalizer(utterance)} " if normalizer is not None else utterance.lower()
+
+
+def _thaw(mapping: FrozenMap) -> MutableMapping:
+    """get an editable copy of a snapshot mapping, sharing structure with it"""
+    return mapping.mutate()
+
+
+def _freeze(mapping: MutableMapping) -> FrozenMap:
+    """turn an editable copy back into a snapshot mapping"""
+    return mapping.finish()
+
+
+class IntentIndex:
+    """
+    Inverted index from keywords to the intents that use them.
+
+    Every distinct keyword is matched once per utterance, no matter how many
+    intents share it, and only intents anchored on a matched required keyword
+    are scored. Intents are inserted and deleted incrementally, the cost of
+    an update depends on the number of keywords of that intent, not on the
+    number of intents in the index.
+
+    A frozen index is an immutable snapshot that can be read from many
+    threads, edits happen on a copy obtained from transaction() and are
+    published with freeze(). Mappings are ``immutables`` maps (HAMTs), the
+    copy shares structure with the snapshot so an edit only copies the
+    paths it touches.
+
+    Keyword samples are normalized when a keyword is first indexed, along
+    with a copy of the samples they came from. stale() finds keywords whose
+    samples were edited since, in place or by assignment (e.g. by
+    Keyword.reload), refresh() compiles them again. Edits are recorded as
+    they happen, IntentEngine.sync_keywords only looks for stale keywords
+    after one.
+    """
+    _MAPPINGS = ("intents", "sequence", "keywords", "samples", "sources", "refcounts",
+                 "buckets", "unanchored", "anchors", "links")
+
+    def __init__(self, normalizer: Optional[Normalizer] = None):
+        self.normalizer = normalizer
+        empty = FrozenMap
+        self.intents: Mapping[str, KeywordIntent] = empty()
+        self.sequence: Mapping[str, int] = empty()  # registration order, used to break ties
+        self.keywords: Mapping[int, Keyword] = empty()  # keyed by id, different Keyword objects may share a name
+        self.samples: Mapping[int, Tuple[str, ...]] = empty()  # normalized samples by keyword id
+        self.sources: Mapping[int, Sequence[str]] = empty()  # the samples they were normalized from
+        self.refcounts: Mapping[int, int] = empty()
+        self.buckets: Mapping[int, FrozenMap] = empty()  # anchor keyword -> intents by name
+        self.unanchored: Mapping[str, KeywordIntent] = empty()  # intents without required keywords always score
+        self.anchors: Mapping[str, Optional[int]] = empty()
+        self.links: Mapping[str, Tuple[int, ...]] = empty()
+        self.touched: Set[int] = set()  # ids of the keywords added, removed or compiled again by the transaction
+        self._next_seq = 0
+
+    def transaction(self) -> 'IntentIndex':
+        """
+        Get an editable copy of this index, call freeze() on it once done.
+        """
+        index = IntentIndex.__new__(IntentIndex)
+        index.normalizer = self.normalizer
+        for attr in self._MAPPINGS:
+            setattr(index, attr, _thaw(getattr(self, attr)))
+        index.touched = set()
+        index._next_seq = self._next_seq
+        return index
+
+    def freeze(self) -> 'IntentIndex':
+        """
+        Finish editing, the index must not be modified afterwards.
+        """
+        for attr in self._MAPPINGS:
+            setattr(self, attr, _freeze(getattr(self, attr)))
+        return self
+
+    def add(self, intent: KeywordIntent) -> None:
+        """
+        Insert an intent, replacing any intent with the same name.
+        """
+        old = self.intents.get(intent.name)
+        if old is not None:
+            self._unlink(old.name)
+        else:
+            self.sequence[intent.name] = self._next_seq
+            self._next_seq += 1
+        self.intents[intent.name] = intent
+        self._link(intent)
+
+    def remove(self, name: str) -> Optional[KeywordIntent]:
+        """
+        Delete an intent by name.
+        """
+        intent = self.intents.pop(name, None)
+        if intent is not None:
+            self._unlink(name)
+            self.sequence.pop(name)
+        return intent
+
+    def _link(self, intent: KeywordIntent) -> None:
+        kws = {id(kw): kw for kw in intent.required + intent.optional + intent.excludes}
+        for kid, kw in kws.items():
+            if kid not in self.keywords:
+                self.keywords[kid] = kw
+                self._compile(kid, kw)
+            self.refcounts[kid] = self.refcounts.get(kid, 0) + 1
+        self.links[intent.name] = tuple(kws)
+        if intent.required:
+            # anchor on the required keyword shared by the fewest intents
+            anchor = min((id(kw) for kw in intent.required),
+                         key=lambda kid: len(self.buckets.get(kid, ())))
+            # buckets are persistent too, shared with older snapshots
+            self.buckets[anchor] = self.buckets.get(anchor, FrozenMap()).set(intent.name, intent)
+        else:
+            anchor = None
+            self.unanchored[intent.name] = intent
+        self.anchors[intent.name] = anchor
+
+    def _unlink(self, name: str) -> None:
+        anchor = self.anchors.pop(name)
+        if anchor is None:
+            self.unanchored.pop(name)
+        else:
+            bucket = self.buckets[anchor].delete(name)
+            if bucket:
+                self.buckets[anchor] = bucket
+            else:
+                self.buckets.pop(anchor)
+        for kid in self.links.pop(name):
+            self.refcounts[kid] -= 1
+            if not self.refcounts[kid]:
+                self.refcounts.pop(kid)
+                self.touched.add(kid)
+                self.keywords.pop(kid)
+                self.samples.pop(kid)
+                self.sources.pop(kid)
+
+    def _compile(self, kid: int, kw: Keyword) -> None:
+        self.touched.add(kid)
+        samples = kw.samples
+        # tuples can't change in place, lists are copied to notice in place edits
+        self.sources[kid] = samples if isinstance(samples, tuple) else list(samples)
+        self.samples[kid] = compile_samples(kw, self.normalizer)
+
+    def refresh(self, kw: Keyword) -> None:
+        """
+        Normalize the samples of an indexed keyword again after they changed.
+        """
+        if id(kw) in self.keywords:
+            self._compile(id(kw), kw)
+
+    def stale(self, kids: Optional[Iterable[int]] = None) -> List[Keyword]:
+        """
+        Get the indexed keywords whose samples changed since they were compiled.
+
+        Args:
+            kids: Only check the keywords with these ids, by default all of them.
+        """
+        sources = self.sources
+        if kids is None:
+            return [kw for kid, kw in self.keywords.items() if kw.samples != sources[kid]]
+        keywords = self.keywords
+        return [keywords[kid] for kid in kids
+                if kid in keywords and keywords[kid].samples != sources[kid]]
+
+    def match(self, utterance: str) -> Set[int]:
+        """
+        Get the ids of all indexed keywords that match the utterance.
+        """
+        utterance = normalize(utterance, self.normalizer)
+        return {kid for kid, samples in self.samples.items()
+                if any(sample in utterance for sample in samples)}
+
+    def candidates(self, matched: Set[int]) -> List[KeywordIntent]:
+        """
+        Get the intents that may score above zero given the matched keywords.
+        """
+        found = list(self.unanchored.values())
+        for kid in matched:
+            bucket = self.buckets.get(kid)
+            if bucket:
+                found.extend(bucket.values())
+        return found
+
+    @staticmethod
+    def score(intent: KeywordIntent, matched: Set[int]) -> float:
+        """
+        Score an intent against pre-matched keywords, same result as KeywordIntent.score
+        """
+        if any(id(k) in matched for k in intent.excludes):
+            return 0.0
+        if not all(id(k) in matched for k in intent.required):
+            return 0.0
+        matched_optional = sum(1 for k in intent.optional if id(k) in matched)
+        optional_score = matched_optional / len(intent.optional) if intent.optional else 0
+        return max(0.8 + 0.2 * optional_score, 0.5)
+
+
+class _RegisteredIntents(Mapping[str, KeywordIntent]):
+    """read-only view of the intents of an index snapshot, iterated in registration order"""
+    __slots__ = ("_index",)
+
+    def __init__(self, index: IntentIndex):
+        self._index = index
+
+    def __getitem__(self, name: str) -> KeywordIntent:
+        return self._index.intents[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index.intents
+
+    def __len__(self) -> int:
+        return len(self._index.intents)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._index.intents.keys(), key=self._index.sequence.__getitem__))
+
+
 class IntentEngine:
     """
     Engine for managing and scoring intents.
+
+    Intents are kept in an IntentIndex, so only intents whose required
+    keywords appear in the utterance get scored.
+
+    Reads never lock: each call scores against the index snapshot that was
+    current when it started, while register/deregister build a new snapshot
+    and publish it with a single assignment. Writers are serialized, use
+    ``batch()`` to publish many changes at once.
+
+    When ``adaptive_order`` is enabled, intents are evaluated by
+    ``calc_intent`` in order of observed hit frequency instead of
+    registration order, so the few intents that handle most turns are
+    checked first and the early exit triggers sooner. Only performance
+    changes, ties are still broken by registration order, so calc_intent
+    always agrees with the first result of calc_intents.
+
+    With ``fuzzy`` enabled, utterances that match no intent get a second
+    chance with typos corrected through a FuzzyIndex over the keyword
+    samples, see resolve(). It is built on first use, then every published
+    snapshot only updates the words of the keywords it added, removed or
+    compiled again.
+
+    With ``cache_size`` set, the last results of resolve() are memoized by
+    normalized utterance (lowercase, collapsed whitespace). Every published
+    snapshot bumps ``generation``, which invalidates all cached results, so
+    the cache is safe to share between the sessions using this engine.
+
+    With a ``normalizer``, e.g. the one of a BuiltinKeywords locale, keyword
+    samples and utterances are matched after normalization (accents, plurals,
+    verb forms...) instead of just lowercased. Samples are normalized once
+    when their intent is registered, utterances once per lookup.
     """
+    MAX_SCORE = 1.0
 
-    def __init__(self, intent_cache: Optional[str] = None):
-        self.intents: Dict[str, KeywordIntent] = {}
+    def __init__(self, intent_cache: Optional[str] = None,
+                 adaptive_order: bool = False,
+                 early_exit: bool = True,
+                 reorder_interval: int = 100,
+                 fuzzy: bool = False,
+                 max_edit_distance: int = 1,
+                 fuzzy_penalty: float = 0.75,
+                 cache_size: int = 0,
+                 normalizer: Optional[Normalizer] = None):
+        self.normalizer = normalizer
+        self.index = IntentIndex(normalizer)
+        self._lock = threading.RLock()
+        self._pending: Optional[IntentIndex] = None
+        self._subscribers = weakref.WeakSet()
+        self.stats: Dict[str, IntentStats] = {}  # updated by readers without a lock, see _record
+        self.adaptive_order = adaptive_order
+        self.early_exit = early_exit
+        self.reorder_interval = reorder_interval
+        self.fuzzy = fuzzy
+        self.max_edit_distance = max_edit_distance
+        self.fuzzy_penalty = fuzzy_penalty
+        self._fuzzy_index: Optional[FuzzyIndex] = None  # built on first use, then kept up to date by writers
+        self._fuzzy_tokens: Dict[int, List[str]] = {}  # keyword id -> words it added to the fuzzy index
+        self._synced_edits = _sample_edits.generation  # keyword edits before are compiled on register
+        self._ranking: Dict[str, int] = {}
+        self._observations = 0
+        self.cache_size = cache_size
+        self.generation = 0  # bumped whenever a new index is published
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._memo: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._saved: Dict[str, Dict[str, dict]] = {}  # directory -> entries as last saved/loaded
         self.cache = intent_cache
         if self.cache:
-            intents_path = os.path.join(self.cache, "intents")
-            if os.path.isdir(intents_path):
-                for fname in os.listdir(intents_path):
-                    if fname.endswith(".json"):
-                        intent = KeywordIntent.from_file(os.path.join(intents_path, fname))
-                        self.intents[intent.name] = intent
+            self.load_all(self.cache)
+
+    @property
+    def intents(self) -> Mapping[str, KeywordIntent]:
+        """
+        Registered intents by name in registration order, use register_intent/deregister_intent to modify
+        """
+        return _RegisteredIntents(self.index)
+
+    @property
+    def evaluation_order(self) -> List[KeywordIntent]:
+        """
+        Get the order in which intents are evaluated by calc_intent.
+        """
+        index = self.index
+        return sorted(index.intents.values(), key=lambda intent: self._order_key(index, intent.name))
+
+    def _order_key(self, index: IntentIndex, name: str) -> Tuple[int, int]:
+        # ties keep registration order
+        hits = self._ranking.get(name, 0) if self.adaptive_order else 0
+        return -hits, index.sequence[name]
+
+    def _record(self, best: Optional[KeywordIntent], matches: List[KeywordIntent]) -> None:
+        """
+        Update hit/near-miss counters after an utterance was scored.
+
+        Readers don't lock, concurrent increments of the same counter may
+        be lost. The counters only steer adaptive_order and are reported as
+        statistics, being slightly low under contention is harmless.
+        """
+        if best is None:
+            return
+        stats = self.stats
+        for intent in matches:
+            counters = stats.get(intent.name)
+            if counters is None:
+                counters = stats.setdefault(intent.name, IntentStats())  # atomic, racing readers get the same one
+            if intent is best:
+                counters.hits += 1
+            else:
+                counters.near_misses += 1
+        self._observations += 1
+        if self.adaptive_order and self._observations % self.reorder_interval == 0:
+            self._update_ranking()
+
+    def _update_ranking(self) -> None:
+        # dict.copy() is atomic, readers may add counters meanwhile
+        self._ranking = {name: stats.hits for name, stats in self.stats.copy().items()}
 
     def calc_intents(self, utterance: str) -> List[Tuple[KeywordIntent, float]]:
         """
         Calculate matching intents and their scores for the given utterance.
+
+        Falls back to fuzzy matching like resolve() when nothing matches exactly.
+        """
+        if self._synced_edits != _sample_edits.generation:
+            self.sync_keywords()
+        matches = self._calc_intents(utterance)
+        if not matches and self.fuzzy:
+            corrected = self.correct(utterance)
+            if corrected != utterance:
+                return [(intent, score * self.fuzzy_penalty)
+                        for intent, score in self._calc_intents(corrected)]
+        return matches
+
+    def _calc_intents(self, utterance: str) -> List[Tuple[KeywordIntent, float]]:
+        index = self.index  # snapshot, may be replaced by a writer at any time
+        matched = index.match(utterance)
+        scored = [(intent, index.score(intent, matched))
+                  for intent in index.candidates(matched)]
+        sequence = index.sequence
+        matches = sorted([item for item in scored if item[1] >= 0.5],
+                         key=lambda item: (-item[1], sequence[item[0].name]))
+        self._record(matches[0][0] if matches else None,
+                     [intent for intent, _ in matches])
+        return matches
+
+    def calc_intent(self, utterance: str,
+                    matched: Optional[Set[int]] = None) -> Tuple[Optional[KeywordIntent], float]:
+        """
+        Calculate the best matching intent for the given utterance.
+
+        Once an intent reaches MAX_SCORE only intents registered before it
+        are still scored, since nothing else can beat it, ties always go to
+        the intent registered first.
+
+        Args:
+            utterance: The user's input.
+            matched: Ids of the keywords matching the utterance, if already
+                known from a previous scan, e.g. by the KeywordMatcher of a
+                SceneRouter.
+        """
+        intent, score, _ = self.resolve(utterance, matched)
+        return intent, score
+
+    def resolve(self, utterance: str,
+                matched: Optional[Set[int]] = None) -> Tuple[Optional[KeywordIntent], float, str]:
+        """
+        Like calc_intent, but also returns the utterance the intent matched.
+
+        When fuzzy matching is enabled and no intent matches exactly, the
+        utterance is corrected against the keyword vocabulary and scored
+        again, the score is scaled by ``fuzzy_penalty`` so fuzzy hits always
+        rank below exact hits, and the corrected utterance is returned.
+        """
+        if self._synced_edits != _sample_edits.generation:
+            self.sync_keywords()
+        if not self.cache_size:
+            return self._resolve(utterance, matched)[:3]
+        key = " ".join(utterance.lower().split())
+        generation = self.generation  # read before the index, see _publish
+        with self._memo_lock:
+            entry = self._memo.get(key)
+            if entry is not None and entry[0] == generation:
+                self._memo.move_to_end(key)
+                self.cache_hits += 1
+            else:
+                entry = None
+                self.cache_misses += 1
+        if entry is not None:
+            _, intent, score, corrected, matches = entry
+            self._record(intent, matches)
+        else:
+            # the matched keywords were found in the raw utterance, only reuse them if it is the key
+            intent, score, corrected, matches = self._resolve(key, matched if key == utterance else None)
+            with self._memo_lock:
+                self._memo[key] = (generation, intent, score, corrected, matches)
+                self._memo.move_to_end(key)
+                while len(self._memo) > self.cache_size:
+                    self._memo.popitem(last=False)
+        return intent, score, utterance if corrected == key else corrected
+
+    def _resolve(self, utterance: str, matched: Optional[Set[int]] = None
+                 ) -> Tuple[Optional[KeywordIntent], float, str, List[KeywordIntent]]:
+        intent, score, matches = self._calc_intent(utterance, matched)
+        if intent is None and self.fuzzy:
+            corrected = self.correct(utterance)
+            if corrected != utterance:
+                fuzzy_intent, fuzzy_score, fuzzy_matches = self._calc_intent(corrected)
+                if fuzzy_intent is not None:
+                    self._record(fuzzy_intent, fuzzy_matches)
+                    return fuzzy_intent, fuzzy_score * self.fuzzy_penalty, corrected, fuzzy_matches
+        self._record(intent, matches)
+        return intent, score, utterance, matches
+
+    def sync_keywords(self) -> int:
+        """
+        Compile again the keywords whose samples were edited since they were
+        indexed, e.g. reloaded with Keyword.reload or changed in place.
+
+        Called by lookups once keyword samples were edited anywhere, only the
+        edited keywords are checked, publishes a new snapshot if any of them
+        is registered here.
+
+        Returns:
+            The number of keywords compiled again.
         """
-        return sorted(
-            [(intent, intent.score(utterance))
-            for intent in self.intents.values()
-            if intent.score(utterance) >= 0.5],
-            key=lambda item: item[1],
-            reverse=True,
-        )
+        if self._synced_edits == _sample_edits.generation:
+            return 0
+        generation, edited = _sample_edits.since(self._synced_edits)
+        self._synced_edits = generation
+        stale = self.index.stale(edited)
+        if stale:
+            with self._edit() as index:
+                for kw in stale:
+                    index.refresh(kw)
+            if DEBUG:
+                print(f"   - DEBUG: keyword samples changed: {[kw.name for kw in stale]}")
+        return len(stale)
+
+    def cache_stats(self) -> Dict[str, float]:
+        """
+        Get the prediction cache counters.
+
+        Returns:
+            A dict with the number of cached utterances, hits, misses and the hit rate.
+        """
+        with self._memo_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {"size": len(self._memo), "hits": self.cache_hits, "misses": self.cache_misses,
+                    "hit_rate": self.cache_hits / lookups if lookups else 0.0}
+
+    def clear_cache(self) -> None:
+        """
+        Drop all memoized predictions and reset the cache counters.
+        """
+        with self._memo_lock:
+            self._memo.clear()
+            self.cache_hits = self.cache_misses = 0
+
+    def memory_report(self, shared: Iterable[Any] = ()) -> 'MemoryReport':
+        """
+        Bytes used by this engine, by category.
+
+        Args:
+            shared: Objects known to be shared, e.g. another engine, data
+                also reachable from them is reported as shared.
+        """
+        from text_engine.memory import MemoryWalker
+        walker = MemoryWalker(shared)
+        self._measure_memory(walker)
+        return walker.report
+
+    def _measure_memory(self, walker: 'MemoryWalker') -> None:
+        index = self.index
+        walker.add("keywords", *index.keywords.values())
+        walker.add("intents", *index.intents.values())
+        walker.add("intent index", index)
+        walker.add("prediction cache", self._memo)
+        walker.add("fuzzy index", self._fuzzy_index, self._fuzzy_tokens)
+        walker.add("intent engine", self)
+
+    def correct(self, utterance: str) -> str:
+        """
+        Fix typos in the utterance using the vocabulary of the registered keywords.
+        """
+        fuzzy = self._fuzzy_index
+        if fuzzy is None:
+            with self._lock:  # no snapshot is published while it is built
+                fuzzy = self._fuzzy_index
+                if fuzzy is None:
+                    fuzzy = FuzzyIndex(max_distance=self.max_edit_distance)
+                    self._update_fuzzy(fuzzy, self.index, self.index.keywords.keys())
+                    self._fuzzy_index = fuzzy
+        return fuzzy.correct(utterance)
+
+    def _update_fuzzy(self, fuzzy: FuzzyIndex, index: IntentIndex, kids: Iterable[int]) -> None:
+        """
+        Replace the words of some keywords in the fuzzy index, call with the writer lock held.
+        """
+        for kid in kids:
+            for word in self._fuzzy_tokens.pop(kid, ()):
+                fuzzy.remove(word)
+            kw = index.keywords.get(kid)
+            if kw is not None:
+                words = self._fuzzy_tokens[kid] = keyword_tokens(kw)
+                for word in words:
+                    fuzzy.add(word)
+
+    def _calc_intent(self, utterance: str, matched: Optional[Set[int]] = None
+                     ) -> Tuple[Optional[KeywordIntent], float, List[KeywordIntent]]:
+        index = self.index  # snapshot, may be replaced by a writer at any time
+        if matched is None:
+            matched = index.match(utterance)
+        candidates = sorted(index.candidates(matched),
+                            key=lambda intent: self._order_key(index, intent.name))
+        sequence = index.sequence
+        best, best_score = None, 0.0
+        matches = []
+        for intent in candidates:
+            if self.early_exit and best_score >= self.MAX_SCORE and sequence[intent.name] > sequence[best.name]:
+                # can at most tie with the best, ties go to the earlier registered intent
+                continue
+            score = index.score(intent, matched)
+            if score < 0.5:
+                continue
+            matches.append(intent)
+            if score > best_score or (score == best_score and sequence[intent.name] < sequence[best.name]):
+                best, best_score = intent, score
+                if self.early_exit and score >= self.MAX_SCORE and not self.adaptive_order:
+                    break  # in registration order, nothing after can win a tie either
+        return best, best_score, matches
+
+    def export_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Export the intent usage counters as a json serializable dict.
+        """
+        return {name: {"hits": s.hits, "near_misses": s.near_misses}
+                for name, s in self.stats.copy().items()}
+
+    def import_stats(self, data: Dict[str, Dict[str, int]]) -> None:
+        """
+        Load intent usage counters, e.g. persisted from a previous session.
+        """
+        for name, counters in data.items():
+            self.stats[name] = IntentStats(hits=counters.get("hits", 0),
+                                           near_misses=counters.get("near_misses", 0))
+        self._update_ranking()
+
+    def save_stats(self, path: Optional[str] = None) -> None:
+        """
+        Save the intent usage counters to a json file, by default inside the intent cache.
+        """
+        path = path or os.path.join(self.cache, "intent_stats.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        db = _json_storage(path)
+        db.clear()
+        db.update(self.export_stats())
+        db.store()
+
+    def load_stats(self, path: Optional[str] = None) -> None:
+        """
+        Load intent usage counters from a json file, by default inside the intent cache.
+        """
+        path = path or os.path.join(self.cache, "intent_stats.json")
+        if os.path.isfile(path):
+            self.import_stats(dict(_json_storage(path)))
+
+    @contextmanager
+    def _edit(self) -> Iterator[IntentIndex]:
+        with self._lock:
+            if self._pending is not None:  # inside batch(), published on exit
+                yield self._pending
+                return
+            index = self.index.transaction()
+            yield index
+            self._publish(index.freeze())
+
+    def _publish(self, index: IntentIndex) -> None:
+        if self._fuzzy_index is not None:
+            # only the keywords the transaction touched, lookups may see a partial update
+            self._update_fuzzy(self._fuzzy_index, index, index.touched)
+        self.index = index
+        # bumped after the swap, a reader that sees the new generation also sees the new index
+        self.generation += 1
+        for subscriber in list(self._subscribers):
+            subscriber.invalidate()
+
+    def subscribe(self, subscriber: Any) -> None:
+        """
+        Call ``subscriber.invalidate()`` whenever a new index snapshot is published.
+
+        Subscribers are held by weak reference, use this to drop state
+        compiled from the engine's intents and keywords.
+        """
+        self._subscribers.add(subscriber)
+
+    @contextmanager
+    def batch(self) -> Iterator['IntentEngine']:
+        """
+        Group several register/deregister calls into a single published snapshot.
+
+        Readers keep seeing the previous snapshot until the block exits, if
+        the block raises no changes are published.
+        """
+        with self._lock:
+            if self._pending is not None:  # nested batch
+                yield self
+                return
+            self._pending = self.index.transaction()
+            try:
+                yield self
+                self._publish(self._pending.freeze())
+            finally:
+                self._pending = None
 
     def register_intent(self, intent: KeywordIntent) -> None:
         """
         Register a new intent in the engine.
         """
-        self.intents[intent.name] = intent
+        with self._edit() as index:
+            index.add(intent)
         if DEBUG:
             print(f"   - DEBUG: registering intent: {intent.name}")
 
     def deregister_intent(self, name: str) -> None:
         """
         Deregister an intent by name.
+
+        With an intent cache the intent's file is deleted, the bundle is
+        only written again by the next save_all.
         """
-        if name in self.intents:
-            intent = self.intents.pop(name)
-            if self.cache:
-                path = os.path.join(self.cache, intent.file_path)
-                if os.path.isfile(path):
-                    os.remove(path)
+        with self._edit() as index:
+            intent = index.remove(name)
+        if intent is not None and self.cache:
+            path = os.path.join(self.cache, intent.file_path)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    @staticmethod
+    def _entries(intents: Iterable[KeywordIntent]) -> Dict[str, dict]:
+        """
+        Serializable view of intents, keywords are deduplicated by name.
+        """
+        entries, keywords = {}, {}
+        for intent in intents:
+            entries[intent.name] = {"required": [k.name for k in intent.required],
+                                    "optional": [k.name for k in intent.optional],
+                                    "excludes": [k.name for k in intent.excludes]}
+            for kw in intent.required + intent.optional + intent.excludes:
+                if DEBUG and kw.name in keywords and keywords[kw.name] != list(kw.samples):
+                    print(f"   - DEBUG: keyword name clash, saving last seen samples: {kw.name}")
+                keywords[kw.name] = list(kw.samples)
+        return {"intents": entries, "keywords": keywords}
+
+    def save_all(self, directory: Optional[str] = None, bundle: bool = True) -> int:
+        """
+        Save all intents and their keywords in one bulk operation.
+
+        By default everything goes into a single json bundle that is written
+        atomically, with ``bundle=False`` the per-file layout of
+        KeywordIntent.save is written instead, each keyword only once.
+        Entries unchanged since the last save/load of that directory are
+        skipped, the bundle is only written if something was added, changed
+        or removed.
+
+        Returns:
+            The number of intents and keywords written or removed.
+        """
+        directory = directory or self.cache
+        with self._lock:  # a single writer, saves don't race with each other or with reloads
+            return self._save_all(directory, bundle)
+
+    def _save_all(self, directory: str, bundle: bool) -> int:
+        index = self.index
+        # keep registration order, it breaks ties between equal scores
+        entries = self._entries(sorted(index.intents.values(), key=lambda i: index.sequence[i.name]))
+        saved = self._saved.get(os.path.abspath(directory), {"intents": {}, "keywords": {}})
+        dirty = {kind: [name for name, entry in entries[kind].items()
+                        if saved[kind].get(name) != entry]
+                 for kind in ("intents", "keywords")}
+        removed = [name for kind in ("intents", "keywords") for name in saved[kind] if name not in entries[kind]]
+        n_dirty = len(dirty["intents"]) + len(dirty["keywords"]) + len(removed)
+        if bundle:
+            path = os.path.join(directory, BUNDLE_FILE)
+            if n_dirty or not os.path.isfile(path):
+                os.makedirs(directory, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"version": BUNDLE_VERSION, **entries}, f)
+                os.replace(tmp, path)  # readers never see a partial bundle
+            else:
+                n_dirty = 0
+        else:
+            n_dirty -= len(removed)  # the per-file layout keeps removed entries
+            for name in dirty["intents"]:
+                intent = self.intents[name]
+                path = os.path.join(directory, intent.file_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump({"name": name, **entries["intents"][name]}, f)
+            for name in dirty["keywords"]:
+                Keyword(name=name, samples=entries["keywords"][name]).save(directory)
+        self._saved[os.path.abspath(directory)] = entries
+        if DEBUG:
+            print(f"   - DEBUG: saved {n_dirty} changed intents/keywords to: {directory}")
+        return n_dirty
+
+    def load_all(self, directory: Optional[str] = None) -> int:
+        """
+        Load and register all intents saved in a directory.
+
+        Reads the json bundle written by save_all in one go when present,
+        otherwise falls back to the per-file layout of KeywordIntent.save.
+        In both layouts keywords used by several intents are shared, one
+        Keyword object per name.
+
+        Returns:
+            The number of intents loaded.
+        """
+        directory = directory or self.cache
+        path = os.path.join(directory, BUNDLE_FILE)
+        if os.path.isfile(path):
+            entries, intents = self._read_bundle(path)
+        else:
+            keywords: Dict[str, Keyword] = {}  # the first loaded keyword of each name
+
+            def shared(kws: List[Keyword]) -> List[Keyword]:
+                return [keywords.setdefault(kw.name, kw) for kw in kws]
+
+            intents = []
+            intents_path = os.path.join(directory, "intents")
+            if os.path.isdir(intents_path):
+                for fname in os.listdir(intents_path):
+                    if fname.endswith(".json"):
+                        intent = KeywordIntent.from_file(os.path.join(intents_path, fname))
+                        intents.append(replace(intent, required=shared(intent.required),
+                                               optional=shared(intent.optional),
+                                               excludes=shared(intent.excludes)))
+            entries = self._entries(intents)
+        with self.batch():
+            for intent in intents:
+                self.register_intent(intent)
+            self._saved[os.path.abspath(directory)] = entries
+        return len(intents)
+
+    @staticmethod
+    def _read_bundle(path: str) -> Tuple[Dict[str, dict], List[KeywordIntent]]:
+        """
+        Read a bundle written by save_all, keywords shared between intents are shared.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        entries = {"intents": data["intents"], "keywords": data["keywords"]}
+        keywords = {name: Keyword(name=name, samples=samples)
+                    for name, samples in entries["keywords"].items()}
+        intents = [KeywordIntent(name=name,
+                                 required=[keywords[k] for k in entry["required"]],
+                                 optional=[keywords[k] for k in entry["optional"]],
+                                 excludes=[keywords[k] for k in entry["excludes"]])
+                   for name, entry in entries["intents"].items()]
+        return entries, intents
+
+    def reload_bundle(self, directory: Optional[str] = None) -> int:
+        """
+        Reload the bundle written by save_all after it changed on disk.
+
+        Intents whose definition or keyword samples changed since the last
+        save/load of that directory are swapped in at once, keeping their
+        handlers. Intents no longer in the bundle are deregistered.
+
+        Returns:
+            The number of intents replaced or removed.
+        """
+        directory = directory or self.cache
+        path = os.path.join(directory, BUNDLE_FILE)
+        if not directory or not os.path.isfile(path):
+            return 0
+        entries, intents = self._read_bundle(path)
+
+        def changed(intent: KeywordIntent) -> bool:
+            if saved["intents"].get(intent.name) != entries["intents"][intent.name]:
+                return True
+            return any(saved["keywords"].get(kw.name) != entries["keywords"][kw.name]
+                       for kw in intent.required + intent.optional + intent.excludes)
+
+        n_changed = 0
+        with self._edit() as index:
+            saved = self._saved.get(os.path.abspath(directory), {"intents": {}, "keywords": {}})
+            for intent in intents:
+                if not changed(intent):
+                    continue
+                old = index.intents.get(intent.name)
+                index.add(replace(intent, handler=old.handler) if old is not None else intent)
+                n_changed += 1
+            for name in saved["intents"]:
+                if name not in entries["intents"] and index.remove(name) is not None:
+                    n_changed += 1
+            self._saved[os.path.abspath(directory)] = entries
+        if DEBUG:
+            print(f"   - DEBUG: reloaded {n_changed} intents from: {path}")
+        return n_changed
+
+    def update_keyword(self, name: str, samples: List[str]) -> int:
+        """
+        Replace the samples of every registered keyword with the given name.
+
+        The samples list is swapped in a single assignment, utterances being
+        scored concurrently see either the old or the new samples. Frozen
+        keywords can't change, a copy with the new samples replaces them in
+        every registered intent, those intents are replaced by copies too
+        if frozen. Copies are only known to this engine, other holders of
+        the frozen keyword (e.g. object names) keep the old samples.
+
+        Returns:
+            The number of keyword instances updated.
+        """
+        snapshot = self.index
+        updated = [kw for kw in snapshot.keywords.values() if kw.name == name]
+        if updated:
+            with self._edit() as index:
+                copies: Dict[int, Keyword] = {}  # frozen keyword id -> copy with the new samples
+                for kw in updated:
+                    try:
+                        kw.samples = type(kw.samples)(samples)
+                    except FrozenInstanceError:
+                        # hashed by value, changing it in place would corrupt sets and dicts holding it
+                        copies[id(kw)] = replace(kw, samples=type(kw.samples)(samples))
+                    else:
+                        index.refresh(kw)
+
+                def swap(kws):
+                    return type(kws)(copies.get(id(k), k) for k in kws)
+
+                for intent_name, kids in snapshot.links.items():
+                    if any(kid in copies for kid in kids):
+                        intent = index.intents[intent_name]
+                        index.add(replace(intent, required=swap(intent.required),
+                                          optional=swap(intent.optional), excludes=swap(intent.excludes)))
+        n_updated = len(updated)
+        if DEBUG and n_updated:
+            print(f"   - DEBUG: updated keyword: {name} / {samples}")
+        return n_updated
+
+    def reload_intent(self, name: str, directory: Optional[str] = None) -> bool:
+        """
+        Reload an intent definition from files and swap it in atomically.
+
+        The intent is loaded into a new instance that replaces the
+        registered intent once fully loaded, the handler is kept.
+
+        Returns:
+            True if the intent was reloaded.
+        """
+        directory = directory or self.cache
+        intent = self.intents.get(name)
+        if intent is None or not directory:
+            return False
+        if not os.path.isfile(os.path.join(directory, intent.file_path)):
+            return False
+        new_intent = type(intent).from_file(os.path.join(directory, intent.file_path))
+        self.register_intent(replace(new_intent, handler=intent.handler))
+        return True
 
 
 class BuiltinKeywords:
     """
     Handles built-in keywords for a specific language.
+
+    ``normalizer`` is the language's normalization pipeline, read from the
+    locale's normalize.json, pass it to the IntentEngine using these keywords.
     """
 
     def __init__(self, lang: str):
         self.lang = lang
         self.directory = os.path.join(os.path.dirname(__file__), "locale", lang)
+        self.normalizer = Normalizer.from_locale(self.directory, lang)
         for fname in os.listdir(self.directory):
-            name = os.path.splitext(fname)[0]
+            name, ext = os.path.splitext(fname)
+            if ext != ".voc":
+                continue
             samples = load_template_file(os.path.join(self.directory, fname))
             setattr(self, name, Keyword(name=name, samples=samples))
             if DEBUG:
@@ -0,0 +1,266 @@
+"""load test games with many concurrent synthetic players
+
+every session plays a game in its own thread, the player types utterances
+built from the keyword samples of the intents in the active scene, waiting
+a random think time before each one, finished games are started again
+until the stage ends
+
+the number of sessions is ramped up in stages, each stage reports per turn
+latency percentiles (time the engine spends on a turn, think time
+excluded), turns per second, memory per session and GC pauses
+
+    python -m text_engine.loadtest demo:EscapeRoom --sessions 1,10,100 --duration 10 --think exp:0.5
+"""
+import argparse
+import gc
+import random
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional
+
+from text_engine.engine import IFGameEngine
+from text_engine.intents import KeywordIntent
+from text_engine.utils import load_object, percentile
+
+GameFactory = Callable[[], IFGameEngine]
+ThinkTime = Callable[[random.Random], float]  # args: rng, returns seconds
+
+NOISE = ["xyzzy", "what now", "hmm", "dance", "sing a song"]
+
+
+def think_time(spec: str) -> ThinkTime:
+    """
+    Parse a think time distribution.
+
+    Args:
+        spec: ``const:S``, ``uniform:A,B``, ``exp:MEAN`` or
+            ``lognormal:MU,SIGMA``, all in seconds, ``0`` for no think time.
+    """
+    kind, _, params = spec.partition(":")
+    args = [float(p) for p in params.split(",") if p]
+    if kind in ("0", "none"):
+        return lambda rng: 0.0
+    if kind == "const":
+        return lambda rng: args[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / args[0]) if args[0] else 0.0
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(args[0], args[1])
+    raise ValueError(f"unknown think time distribution: {spec}")
+
+
+def scene_intents(game: IFGameEngine) -> List[KeywordIntent]:
+    """
+    The intents a player can trigger in the active scene.
+    """
+    scene = game.active_scene
+    intents = list(scene.intents.intents) if scene.intents else []
+    for obj in scene.game_objects:
+        intents += obj.intent_handlers.intents
+    return intents
+
+
+def make_utterance(intents: List[KeywordIntent], rng: random.Random,
+                   noise: float = 0.1) -> str:
+    """
+    Build an utterance from the keyword samples of a random intent.
+
+    One sample of every required keyword and sometimes one optional
+    keyword, a ``noise`` fraction of utterances matches nothing.
+    """
+    if not intents or rng.random() < noise:
+        return rng.choice(NOISE)
+    intent = rng.choice(intents)
+    words = [rng.choice(kw.samples) for kw in intent.required]
+    if intent.optional and rng.random() < 0.5:
+        words.append(rng.choice(rng.choice(intent.optional).samples))
+    return " ".join(words)
+
+
+@dataclass
+class GCStats:
+    """
+    Garbage collector pauses observed through gc.callbacks.
+    """
+    pauses: List[float] = field(default_factory=list)
+    _started: Dict[int, float] = field(default_factory=dict)
+
+    def __call__(self, phase: str, info: Dict[str, int]) -> None:
+        if phase == "start":
+            self._started[threading.get_ident()] = time.perf_counter()
+        else:
+            start = self._started.pop(threading.get_ident(), None)
+            if start is not None:
+                self.pauses.append(time.perf_counter() - start)
+
+
+@dataclass
+class StageResult:
+    """
+    Measurements of a load test stage.
+
+    Attributes:
+        sessions: Concurrent sessions.
+        turns: Turns played by all sessions.
+        games: Games started by all sessions.
+        seconds: Duration of the stage.
+        latencies: Engine time per turn, in seconds.
+        memory_per_session: Bytes allocated building one game.
+        gc_pauses: Duration of every garbage collection, in seconds.
+        errors: Exceptions raised by the games.
+    """
+    sessions: int
+    turns: int
+    games: int
+    seconds: float
+    latencies: List[float]
+    memory_per_session: float
+    gc_pauses: List[float]
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.seconds if self.seconds else 0.0
+
+    def percentile(self, p: float) -> float:
+        return percentile(self.latencies, p)
+
+
+class PlayerSession(threading.Thread):
+    """
+    A synthetic player playing games back to back until stopped.
+    """
+
+    def __init__(self, factory: GameFactory, think: ThinkTime, seed: int,
+                 stop: threading.Event, noise: float = 0.1):
+        super().__init__(daemon=True)
+        self.factory = factory
+        self.think = think
+        self.rng = random.Random(seed)
+        self.noise = noise
+        self.stop = stop
+        self.latencies: List[float] = []
+        self.games = 0
+        self.errors: List[str] = []
+        self._returned: Optional[float] = None
+
+    def on_input(self, game: IFGameEngine, prompt: str) -> str:
+        now = time.perf_counter()
+        if self._returned is not None:
+            self.latencies.append(now - self._returned)
+        utterance = make_utterance(scene_intents(game), self.rng, self.noise)
+        delay = self.think(self.rng)
+        if self.stop.wait(delay) if delay > 0 else self.stop.is_set():
+            raise EOFError  # stage over, ends the game
+        self._returned = time.perf_counter()
+        return utterance
+
+    def run(self) -> None:
+        while not self.stop.is_set():
+            game = self.factory()
+            game.handlers = replace(game.handlers, on_input=self.on_input,
+                                    on_print=lambda g, text: None)
+            self.games += 1
+            self._returned = None
+            try:
+                game.run()  # played in this thread
+            except Exception as e:
+                self.errors.append(repr(e))
+                self._returned = None
+
+
+def session_memory(factory: GameFactory, samples: int = 5) -> float:
+    """
+    Average bytes allocated building one game, after a warm up game.
+    """
+    factory()  # caches, shared resources...
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [factory() for _ in range(samples)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del games
+    return size / samples
+
+
+def run_stage(factory: GameFactory, sessions: int, duration: float,
+              think: ThinkTime, seed: int = 0, noise: float = 0.1) -> StageResult:
+    """
+    Play ``sessions`` concurrent sessions for ``duration`` seconds.
+    """
+    memory = session_memory(factory)
+    stop = threading.Event()
+    players = [PlayerSession(factory, think, seed + i, stop, noise) for i in range(sessions)]
+    gc_stats = GCStats()
+    gc.callbacks.append(gc_stats)
+    try:
+        start = time.perf_counter()
+        for player in players:
+            player.start()
+        stop.wait(duration)
+        stop.set()
+        for player in players:
+            player.join()
+        seconds = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(gc_stats)
+    latencies = [lat for player in players for lat in player.latencies]
+    return StageResult(sessions=sessions, turns=len(latencies),
+                       games=sum(player.games for player in players),
+                       seconds=seconds, latencies=latencies,
+                       memory_per_session=memory, gc_pauses=gc_stats.pauses,
+                       errors=[e for player in players for e in player.errors])
+
+
+def run_load_test(factory: GameFactory, levels: List[int], duration: float,
+                  think: ThinkTime, seed: int = 0, noise: float = 0.1,
+                  report: Optional[Callable[[StageResult], None]] = None) -> List[StageResult]:
+    """
+    Ramp up the number of concurrent sessions, one stage per level.
+    """
+    results = []
+    for sessions in levels:
+        result = run_stage(factory, sessions, duration, think, seed, noise)
+        results.append(result)
+        if report:
+            report(result)
+    return results
+
+
+HEADER = (f"{'sessions':>8} | {'turns/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | "
+          f"{'max ms':>7} | {'KiB/sess':>8} | {'gcs':>5} | {'gc ms':>7} | {'gc max':>6}")
+
+
+def format_result(result: StageResult) -> str:
+    line = (f"{result.sessions:>8} | {result.turns_per_second:>8.0f} | "
+            f"{result.percentile(50) * 1000:>7.2f} | {result.percentile(95) * 1000:>7.2f} | "
+            f"{result.percentile(99) * 1000:>7.2f} | {max(result.latencies, default=0) * 1000:>7.2f} | "
+            f"{result.memory_per_session / 1024:>8.1f} | {len(result.gc_pauses):>5} | "
+            f"{sum(result.gc_pauses) * 1000:>7.1f} | {max(result.gc_pauses, default=0) * 1000:>6.1f}")
+    if result.errors:
+        line += f"\n    {len(result.errors)} errors, first: {result.errors[0]}"
+    return line
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="load test a game with synthetic players")
+    parser.add_argument("factory", help="module:callable building a game, e.g. demo:EscapeRoom")
+    parser.add_argument("--sessions", default="1,10,50,100", help="comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per stage")
+    parser.add_argument("--think", default="exp:0.5",
+                        help="think time: 0, const:S, uniform:A,B, exp:MEAN or lognormal:MU,SIGMA")
+    parser.add_argument("--noise", type=float, default=0.1, help="fraction of utterances matching nothing")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(HEADER)
+    run_load_test(load_object(args.factory),
+                  levels=[int(n) for n in args.sessions.split(",")],
+                  duration=args.duration, think=think_time(args.think),
+                  seed=args.seed, noise=args.noise,
+                  report=lambda result: print(format_result(result), flush=True))
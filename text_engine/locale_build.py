@@ -0,0 +1,266 @@
+"""compile and lint locale folders
+
+expands every .voc and .dialog template under the given locale folders in
+a process pool and reports, per file, how many lines the templates expand
+to, how long that took and how much memory it needed
+
+samples shared by keywords with different names are listed as collisions,
+they make every intent using one of those keywords match the other too
+
+the build fails (exit code 1) when a file breaks one of the size budgets,
+can't be read, or when collisions are found and --fail-on-collisions is set
+
+    python -m text_engine.locale_build eldritch_escape/en text_engine/locale/en --max-file 5000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+
+from text_engine.utils import expand_template
+
+TEMPLATE_EXTENSIONS = (".voc", ".dialog")
+
+
+@dataclass
+class Budgets:
+    """
+    Size limits enforced by the build, None disables a limit.
+
+    Attributes:
+        max_template: Expansions of a single template line.
+        max_file: Expansions of a whole file.
+        max_seconds: Time to compile a file.
+        max_memory: Peak memory to compile a file, in bytes.
+    """
+    max_template: Optional[int] = 1000
+    max_file: Optional[int] = 10000
+    max_seconds: Optional[float] = 1.0
+    max_memory: Optional[int] = 64 * 1024 * 1024
+
+
+@dataclass
+class FileReport:
+    """
+    Compilation result of a template file.
+
+    Attributes:
+        path: The template file.
+        templates: Number of template lines.
+        expansions: Number of lines after expansion, without duplicates.
+        largest_template: Expansions of the largest template line.
+        seconds: Compile time.
+        peak_memory: Peak memory allocated while compiling, in bytes.
+        lines: The expanded lines, only kept for .voc files.
+        skipped: Templates not expanded because their estimated size
+            is far beyond the budget, with the estimate.
+        error: Why the file could not be compiled.
+    """
+    path: str
+    templates: int = 0
+    expansions: int = 0
+    largest_template: int = 0
+    seconds: float = 0.0
+    peak_memory: int = 0
+    lines: List[str] = field(default_factory=list)
+    skipped: List[Tuple[str, int]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def violations(self, budgets: Budgets) -> List[str]:
+        """
+        Budgets broken by this file.
+        """
+        found = []
+        if self.error:
+            found.append(self.error)
+        for template, estimate in self.skipped:
+            found.append(f"template expands to ~{estimate} lines: {template!r}")
+        if budgets.max_template is not None and self.largest_template > budgets.max_template:
+            found.append(f"template expands to {self.largest_template} lines (max {budgets.max_template})")
+        if budgets.max_file is not None and self.expansions > budgets.max_file:
+            found.append(f"file expands to {self.expansions} lines (max {budgets.max_file})")
+        if budgets.max_seconds is not None and self.seconds > budgets.max_seconds:
+            found.append(f"compiled in {self.seconds:.2f}s (max {budgets.max_seconds}s)")
+        if budgets.max_memory is not None and self.peak_memory > budgets.max_memory:
+            found.append(f"needed {self.peak_memory // 1024} KiB (max {budgets.max_memory // 1024} KiB)")
+        return found
+
+
+def estimate_expansions(template: str) -> int:
+    """
+    Upper bound of the number of lines a template expands to, without expanding it.
+
+    Counts the combinations of [optional] parts and (alternative|choices),
+    duplicates are not removed so the real count can be lower.
+    """
+    text = re.sub(r"\[([^\[\]]+)\]", lambda m: f"({m.group(1)}|)", template)
+    pos = 0
+
+    def sequence() -> int:
+        # product of the groups until the end of the current option
+        nonlocal pos
+        total = 1
+        while pos < len(text) and text[pos] not in "|)":
+            if text[pos] == "(":
+                pos += 1
+                total *= alternatives()
+            else:
+                pos += 1
+        return total
+
+    def alternatives() -> int:
+        # sum of the options of a group
+        nonlocal pos
+        total = sequence()
+        while pos < len(text) and text[pos] == "|":
+            pos += 1
+            total += sequence()
+        pos += 1  # closing parenthesis
+        return total
+
+    count = sequence()
+    while pos < len(text):  # stray | or ) at top level, expand_template keeps them as text
+        pos += 1
+        count *= sequence()
+    return count
+
+
+def compile_file(path: str, budgets: Optional[Budgets] = None) -> FileReport:
+    """
+    Expand every template of a file, measuring time and memory.
+
+    Templates estimated to expand to more than 100 times the template
+    budget are not expanded at all, they are reported as skipped.
+    """
+    budgets = budgets or Budgets()
+    report = FileReport(path=path)
+    try:
+        with open(path) as f:
+            templates = [l for l in f.read().split("\n") if l and not l.startswith("# ")]
+    except (OSError, UnicodeDecodeError) as e:
+        report.error = f"can't read file: {e}"
+        return report
+    report.templates = len(templates)
+    limit = budgets.max_template * 100 if budgets.max_template is not None else None
+
+    lines = set()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        for template in templates:
+            estimate = estimate_expansions(template)
+            if limit is not None and estimate > limit:
+                report.skipped.append((template, estimate))
+                continue
+            expanded = expand_template(template)
+            report.largest_template = max(report.largest_template, len(expanded))
+            lines.update(expanded)
+    finally:
+        report.seconds = time.perf_counter() - start
+        report.peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    report.expansions = len(lines)
+    if path.endswith(".voc"):
+        report.lines = sorted(lines)
+    return report
+
+
+def find_templates(roots: List[str]) -> List[str]:
+    """
+    All template files under the given folders, sorted.
+    """
+    paths = []
+    for root in roots:
+        for folder, _, files in os.walk(root):
+            paths += [os.path.join(folder, f) for f in files if f.endswith(TEMPLATE_EXTENSIONS)]
+    return sorted(paths)
+
+
+def find_collisions(reports: List[FileReport]) -> Dict[str, List[str]]:
+    """
+    Samples shared by keywords with different names.
+
+    Returns:
+        The keyword files of every shared sample.
+    """
+    owners: Dict[str, List[FileReport]] = {}
+    for report in reports:
+        for sample in report.lines:
+            owners.setdefault(sample.lower(), []).append(report)
+    return {sample: [r.path for r in found]
+            for sample, found in sorted(owners.items())
+            if len({r.name for r in found}) > 1}
+
+
+def build(roots: List[str], budgets: Optional[Budgets] = None,
+          jobs: Optional[int] = None) -> List[FileReport]:
+    """
+    Compile all the templates under the given locale folders in parallel.
+    """
+    budgets = budgets or Budgets()
+    paths = find_templates(roots)
+    if jobs == 1:
+        return [compile_file(path, budgets) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(compile_file, paths, [budgets] * len(paths), chunksize=8))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="compile and lint locale folders")
+    parser.add_argument("roots", nargs="+", help="locale folders, e.g. eldritch_escape/en")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-template", type=int, default=Budgets.max_template,
+                        help="max expansions of a template line, 0 for no limit")
+    parser.add_argument("--max-file", type=int, default=Budgets.max_file,
+                        help="max expansions of a file, 0 for no limit")
+    parser.add_argument("--max-seconds", type=float, default=Budgets.max_seconds,
+                        help="max compile time of a file, 0 for no limit")
+    parser.add_argument("--max-memory", type=int, default=Budgets.max_memory // 1024,
+                        help="max memory to compile a file in KiB, 0 for no limit")
+    parser.add_argument("--fail-on-collisions", action="store_true",
+                        help="fail the build when keywords share samples")
+    parser.add_argument("--top", type=int, default=20, help="largest files to list, 0 for all")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    budgets = Budgets(max_template=args.max_template or None, max_file=args.max_file or None,
+                      max_seconds=args.max_seconds or None,
+                      max_memory=args.max_memory * 1024 if args.max_memory else None)
+    start = time.perf_counter()
+    reports = build(args.roots, budgets, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    largest = sorted(reports, key=lambda r: r.expansions, reverse=True)
+    print(f"{'expansions':>10} | {'largest':>7} | {'ms':>7} | {'KiB':>7} | file")
+    for report in largest[:args.top or None]:
+        print(f"{report.expansions:>10} | {report.largest_template:>7} | {report.seconds * 1000:>7.2f} | "
+              f"{report.peak_memory / 1024:>7.1f} | {report.path}")
+    print(f"{len(reports)} files, {sum(r.expansions for r in reports)} lines in {elapsed:.2f}s")
+
+    failed = False
+    for report in reports:
+        for violation in report.violations(budgets):
+            failed = True
+            print(f"ERROR {report.path}: {violation}")
+
+    collisions = find_collisions([r for r in reports if r.path.endswith(".voc")])
+    if collisions:
+        print(f"{len(collisions)} samples shared by different keywords:")
+        for sample, paths in collisions.items():
+            print(f"  {sample!r}: {', '.join(paths)}")
+        failed |= args.fail_on_collisions
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"files": [asdict(r) for r in reports], "collisions": collisions}, f, indent=2)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,178 @@
+"""memory accounting for games, intent engines and dialog renderers
+
+walks the object graph of a game and reports the bytes it uses by category
+(keywords, intents, index, dialog lines, scenes...). Objects also reachable
+from other sessions are reported as shared, the rest is what every extra
+session costs
+
+the command line builds two sessions of a game and reports the first one,
+anything also used by the second session counts as shared
+
+    python -m text_engine.memory eldritch_escape.eldritch_escape:EldritchEscape --turns 20
+"""
+import argparse
+import json
+import mmap
+import random
+import sys
+import types
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, Iterator, Set
+
+from immutables import Map as FrozenMap
+
+# code is shared by every session and handlers would lead back into the game
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+         types.MethodType, types.CodeType)
+_LEAVES = (str, bytes, int, float, complex, bool, type(None), range)
+
+
+@dataclass
+class MemoryReport:
+    """
+    Bytes used by an object graph, by category.
+
+    Sizes are shallow ``sys.getsizeof`` sizes summed over every reachable
+    object, each object counted once. Nodes of ``immutables`` maps are not
+    visible, only their keys and values are counted.
+
+    Attributes:
+        session: Bytes only this object uses, by category.
+        shared: Bytes it uses that are shared with others, by category.
+        objects: Number of objects counted.
+    """
+    session: Dict[str, int] = field(default_factory=dict)
+    shared: Dict[str, int] = field(default_factory=dict)
+    objects: int = 0
+
+    @property
+    def session_total(self) -> int:
+        return sum(self.session.values())
+
+    @property
+    def shared_total(self) -> int:
+        return sum(self.shared.values())
+
+    @property
+    def total(self) -> int:
+        return self.session_total + self.shared_total
+
+    def add(self, category: str, size: int, shared: bool = False) -> None:
+        counts = self.shared if shared else self.session
+        counts[category] = counts.get(category, 0) + size
+        self.objects += 1
+
+    def format(self) -> str:
+        """
+        The report as a table, in KiB.
+        """
+        categories = list(dict.fromkeys(list(self.session) + list(self.shared)))
+        lines = [f"{'category':>20} | {'session KiB':>11} | {'shared KiB':>10}"]
+        for category in categories:
+            lines.append(f"{category:>20} | {self.session.get(category, 0) / 1024:>11.1f} | "
+                         f"{self.shared.get(category, 0) / 1024:>10.1f}")
+        lines.append(f"{'total':>20} | {self.session_total / 1024:>11.1f} | {self.shared_total / 1024:>10.1f}")
+        return "\n".join(lines)
+
+
+def _referents(obj: Any) -> Iterator[Any]:
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield key
+            yield value
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        yield from obj
+    elif isinstance(obj, FrozenMap):
+        for key in obj:
+            yield key
+            yield obj[key]
+    else:
+        attrs = getattr(obj, "__dict__", None)
+        if attrs is not None:
+            yield attrs
+        for cls in type(obj).__mro__:
+            slots = getattr(cls, "__slots__", ())
+            for name in [slots] if isinstance(slots, str) else slots:
+                if name != "__dict__" and hasattr(obj, name):
+                    yield getattr(obj, name)
+
+
+class MemoryWalker:
+    """
+    Measures object graphs category by category.
+
+    Every object is counted once, under the first category it was reached
+    from, so measure the most specific categories first. Objects reachable
+    from the ``shared`` roots are counted as shared.
+    """
+
+    def __init__(self, shared: Iterable[Any] = ()):
+        self.report = MemoryReport()
+        self._seen: Set[int] = set()
+        self._shared: Set[int] = set()
+        self.mark_shared(*shared)
+
+    def _walk(self, roots: Iterable[Any], seen: Set[int]) -> Iterator[Any]:
+        stack = [root for root in roots if root is not None]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen or isinstance(obj, _SKIP):
+                continue
+            seen.add(id(obj))
+            yield obj
+            if not isinstance(obj, _LEAVES):
+                stack.extend(_referents(obj))
+
+    def mark_shared(self, *roots: Any) -> None:
+        """
+        Count everything reachable from these objects as shared.
+        """
+        for _ in self._walk(roots, self._shared):
+            pass
+
+    def add(self, category: str, *roots: Any) -> None:
+        """
+        Count the objects reachable from the roots that were not counted yet.
+        """
+        for obj in self._walk(roots, self._seen):
+            if isinstance(obj, mmap.mmap):
+                # mapped files live in the page cache, shared by every process mapping them
+                self.report.add(category, len(obj), shared=True)
+            else:
+                self.report.add(category, sys.getsizeof(obj), shared=id(obj) in self._shared)
+
+
+if __name__ == "__main__":
+    from text_engine.loadtest import make_utterance, scene_intents
+    from text_engine.utils import load_object
+
+    parser = argparse.ArgumentParser(description="report the memory used by a game session")
+    parser.add_argument("factory", help="module:callable building a game, called with no arguments")
+    parser.add_argument("--turns", type=int, default=0,
+                        help="random turns to play first, so caches fill up like in a real session")
+    parser.add_argument("--max-session", type=int, default=None,
+                        help="fail if a session uses more than this many KiB of its own")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    factory = load_object(args.factory)
+    game, other = factory(), factory()
+    rng = random.Random(0)
+    for session in (game, other):
+        session.handlers.on_print = lambda g, text: None
+        session.begin()
+        for _ in range(args.turns):
+            if not session.running.is_set() or not session.turn(make_utterance(scene_intents(session), rng)):
+                break
+    report = game.memory_report(shared=[other])
+    print(report.format())
+    print(f"{report.objects} objects, {report.session_total / 1024:.1f} KiB per session, "
+          f"{report.shared_total / 1024:.1f} KiB shared")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(asdict(report), f, indent=2)
+    over = args.max_session is not None and report.session_total > args.max_session * 1024
+    if over:
+        print(f"ERROR session uses more than {args.max_session} KiB")
+    sys.exit(1 if over else 0)
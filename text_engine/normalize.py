@@ -0,0 +1,134 @@
+"""normalize text before keyword matching
+
+keyword samples and utterances go through the same per language pipeline:
+tokenize, lowercase, fold accents, drop stopwords and strip suffixes, so a
+single "open door" sample also covers "Opening the doors". Samples are
+normalized once when intents are indexed, utterances once per lookup
+
+a locale folder carries its pipeline in a normalize.json file, e.g.
+
+    {"stopwords": ["a", "the"], "suffixes": [["ies", "y"], ["s", ""]], "min_stem": 3}
+"""
+import json
+import os.path
+import unicodedata
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from text_engine.utils import word_tokenize
+
+CONFIG_FILE = "normalize.json"  # pipeline config inside a locale folder
+
+
+def fold_accents(text: str) -> str:
+    """strip diacritics, e.g. café -> cafe"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@dataclass(frozen=True)
+class Normalizer:
+    """
+    Per language normalization applied to keyword samples and utterances.
+
+    Text is tokenized with utils.word_tokenize and the tokens joined by a
+    single space, the intent engine pads both sides with a space so matching
+    stays a substring check but only on whole tokens.
+
+    Attributes:
+        lang: Language of the pipeline.
+        lowercase: Case folding.
+        fold_accents: Strip diacritics, "café" matches "cafe".
+        stopwords: Words dropped before matching.
+        suffixes: Light stemming rules, ``(suffix, replacement)`` pairs.
+            Rules are tried in order, each at most once, and every rule
+            matching the end of the word so far is applied, e.g. "closes"
+            -> "close" -> "clos" with ``("s", "")`` then ``("e", "")``.
+            A rule whose replacement is not shorter than its suffix (e.g.
+            ``("ss", "ss")``) stops stemming, use it to protect endings
+            from later rules.
+        min_stem: Shortest stem a rule may leave.
+    """
+    lang: str = "en"
+    lowercase: bool = True
+    fold_accents: bool = True
+    stopwords: FrozenSet[str] = frozenset()
+    suffixes: Tuple[Tuple[str, str], ...] = ()
+    min_stem: int = 3
+
+    def __call__(self, text: str) -> str:
+        return " ".join(self.tokens(text))
+
+    def tokens(self, text: str) -> List[str]:
+        """
+        Normalized tokens of a text.
+        """
+        if self.lowercase:
+            text = text.lower()
+        if self.fold_accents:
+            text = fold_accents(text)
+        tokens = word_tokenize(text)
+        if self.stopwords:
+            tokens = [t for t in tokens if t not in self.stopwords]
+        if self.suffixes:
+            tokens = [self.stem(t) for t in tokens]
+        return tokens
+
+    def stem(self, word: str) -> str:
+        """
+        Strip suffixes from a word, see ``suffixes``.
+        """
+        for suffix, replacement in self.suffixes:
+            if not word.endswith(suffix):
+                continue
+            if len(replacement) >= len(suffix):
+                break
+            if len(word) - len(suffix) >= self.min_stem:
+                word = word[:-len(suffix)] + replacement
+        return word
+
+    def normalize_samples(self, samples: Iterable[str]) -> Tuple[str, ...]:
+        """
+        Normalize keyword samples, samples collapsing to the same form are kept once.
+
+        Samples made only of stopwords are kept whole, normalized without
+        dropping stopwords, instead of becoming empty and matching anything.
+        """
+        forms = {}
+        for sample in samples:
+            form = self(sample)
+            if not form and sample.strip():
+                form = replace(self, stopwords=frozenset())(sample)
+            forms[form] = None
+        return tuple(forms)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], lang: Optional[str] = None) -> 'Normalizer':
+        """
+        Build a pipeline from a config dict, as stored in normalize.json.
+        """
+        fields = {"lang": config.get("lang", lang or cls.lang)}
+        for key in ("lowercase", "fold_accents", "min_stem"):
+            if key in config:
+                fields[key] = config[key]
+        # stopwords are compared with tokens that were already case and accent folded
+        stopwords = config.get("stopwords", ())
+        if fields.get("lowercase", cls.lowercase):
+            stopwords = [word.lower() for word in stopwords]
+        if fields.get("fold_accents", cls.fold_accents):
+            stopwords = [fold_accents(word) for word in stopwords]
+        stopwords = frozenset(stopwords)
+        suffixes = tuple((suffix, replacement) for suffix, replacement in config.get("suffixes", ()))
+        return cls(stopwords=stopwords, suffixes=suffixes, **fields)
+
+    @classmethod
+    def from_locale(cls, directory: str, lang: Optional[str] = None) -> 'Normalizer':
+        """
+        Load the pipeline of a locale folder, lowercase and accent folding only if it has no normalize.json.
+        """
+        lang = lang or os.path.basename(os.path.normpath(directory))
+        path = os.path.join(directory, CONFIG_FILE)
+        if not os.path.isfile(path):
+            return cls(lang=lang)
+        with open(path) as f:
+            return cls.from_config(json.load(f), lang)
@@ -0,0 +1,65 @@
+import threading
+from typing import List, Optional
+
+
+class OutputSink:
+    """
+    Receives everything the game prints.
+
+    The base sink hands every line to ``handlers.on_print`` right away,
+    subclasses can collect lines and decide when to emit them.
+    """
+
+    def write(self, game: 'IFGameEngine', text: str) -> None:
+        """
+        Output a line of text.
+        """
+        game.handlers.on_print(game, text)
+
+    def flush(self, game: 'IFGameEngine') -> None:
+        """
+        Emit any pending output, called once per turn by the game loop.
+        """
+
+
+class BufferedSink(OutputSink):
+    """
+    Collects a turn's output and emits it with a single on_print call.
+
+    The buffer is flushed by the game loop before waiting for input and
+    when the game ends, or explicitly with IFGameEngine.flush. It is also
+    flushed early whenever it grows beyond the configured limits.
+
+    Attributes:
+        max_lines: Flush once this many lines are buffered, None for no limit.
+        max_chars: Flush once the buffered text reaches this size, None for no limit.
+        separator: Joins the buffered lines.
+    """
+
+    def __init__(self, max_lines: Optional[int] = None,
+                 max_chars: Optional[int] = None,
+                 separator: str = "\n"):
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.separator = separator
+        self._lines: List[str] = []
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def write(self, game: 'IFGameEngine', text: str) -> None:
+        with self._lock:
+            self._lines.append(text)
+            self._chars += len(text)
+            full = ((self.max_lines is not None and len(self._lines) >= self.max_lines) or
+                    (self.max_chars is not None and self._chars >= self.max_chars))
+        if full:
+            self.flush(game)
+
+    def flush(self, game: 'IFGameEngine') -> None:
+        with self._lock:
+            if not self._lines:
+                return
+            text = self.separator.join(self._lines)
+            self._lines = []
+            self._chars = 0
+        game.handlers.on_print(game, text)
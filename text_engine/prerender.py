@@ -0,0 +1,262 @@
+"""pre-render every dialog line, e.g. to speech, ahead of time
+
+expands every .dialog file of a locale folder, deduplicates the lines and
+calls a renderer (text -> bytes, e.g. a TTS engine) for each line on a
+worker pool. Artifacts are stored in a content-addressed cache keyed by a
+hash of the text, so re-runs only render new or changed lines, and at
+runtime a line's artifact is found from its text alone
+
+lines with named slots, e.g. {sanity}, depend on runtime values and are
+skipped
+
+    python -m text_engine.prerender eldritch_escape/en/dialogs --cache tts_cache --renderer my_tts:synthesize
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from text_engine.dialog import DialogTemplate, compile_dialog
+
+LineRenderer = Callable[[str], bytes]
+MANIFEST_FILE = "manifest.json"
+
+
+def stub_render(text: str) -> bytes:
+    """a renderer that stores the text itself, for trying the pipeline without a TTS engine"""
+    return text.encode("utf-8")
+
+
+def _is_key(name: str) -> bool:
+    return len(name) == 64 and all(c in "0123456789abcdef" for c in name)
+
+
+class ArtifactCache:
+    """
+    Rendered artifacts on disk, keyed by a hash of their text.
+
+    Artifacts live at ``<directory>/<key[:2]>/<key><extension>`` and are
+    written atomically. The manifest lists the lines of every dialog as of
+    the last pre-render run.
+
+    Attributes:
+        directory: Cache folder.
+        extension: File extension of the artifacts, e.g. ".wav".
+        salt: Mixed into every key, change it (e.g. to the voice name) to
+            render everything again.
+    """
+
+    def __init__(self, directory: str, extension: str = ".wav", salt: str = ""):
+        self.directory = directory
+        self.extension = extension
+        self.salt = salt
+        self._known: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.salt}\0{text}".encode("utf-8")).hexdigest()
+
+    def path_of(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.extension)
+
+    def get(self, text: str) -> Optional[str]:
+        """
+        Path of the artifact of a line, None if it was not rendered.
+        """
+        key = self.key(text)
+        path = self.path_of(key)
+        if key in self._known:
+            return path
+        if os.path.isfile(path):
+            with self._lock:
+                self._known.add(key)
+            return path
+        return None
+
+    def put(self, text: str, data: bytes) -> str:
+        """
+        Store the artifact of a line.
+        """
+        key = self.key(text)
+        path = self.path_of(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # readers never see a partial artifact
+        with self._lock:
+            self._known.add(key)
+        return path
+
+    def read_manifest(self) -> Dict[str, List[str]]:
+        """
+        Keys of the lines of every dialog, as of the last run.
+        """
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.isfile(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)["dialogs"]
+
+    def write_manifest(self, dialogs: Dict[str, List[str]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"salt": self.salt, "extension": self.extension, "dialogs": dialogs}, f, indent=1)
+        os.replace(tmp, path)
+
+    def prune(self, keep: Set[str]) -> int:
+        """
+        Delete artifacts whose key is not in ``keep``.
+
+        Returns:
+            The number of files deleted.
+        """
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for fname in files:
+                if fname == MANIFEST_FILE or fname.endswith(".tmp") or not fname.endswith(self.extension):
+                    continue
+                key = fname[:-len(self.extension)] if self.extension else fname
+                if not _is_key(key) or key[:2] != os.path.basename(root):
+                    continue  # not an artifact, e.g. a file put there by hand
+                if key not in keep:
+                    os.remove(os.path.join(root, fname))
+                    removed += 1
+                    with self._lock:
+                        self._known.discard(key)
+        return removed
+
+
+@dataclass
+class PrerenderReport:
+    """
+    Outcome of a pre-render run.
+
+    Attributes:
+        dialogs: Dialog files found.
+        lines: Expanded lines, duplicates included.
+        unique: Distinct lines that can be pre-rendered.
+        rendered: Lines rendered by this run.
+        cached: Lines already in the cache.
+        skipped: Lines with named slots, not pre-rendered.
+        failed: Lines the renderer failed on, with the error.
+        pruned: Stale artifacts deleted.
+        seconds: Duration of the run.
+    """
+    dialogs: int = 0
+    lines: int = 0
+    unique: int = 0
+    rendered: int = 0
+    cached: int = 0
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    pruned: int = 0
+    seconds: float = 0.0
+
+
+def enumerate_lines(directory: str) -> Dict[str, List[DialogTemplate]]:
+    """
+    The expanded lines of every .dialog file under a folder, by dialog name.
+    """
+    dialogs = {}
+    for root, _, files in os.walk(directory):
+        for fname in sorted(files):
+            if fname.endswith(".dialog"):
+                path = os.path.join(root, fname)
+                name = os.path.splitext(os.path.relpath(path, directory))[0]
+                dialogs[name] = compile_dialog(path)
+    return dict(sorted(dialogs.items()))
+
+
+def prerender(directory: str, cache: ArtifactCache, render: LineRenderer = stub_render,
+              workers: int = 4, executor: Optional[Executor] = None,
+              prune: bool = False) -> PrerenderReport:
+    """
+    Render every line of the dialogs under a folder that is not cached yet.
+
+    Args:
+        directory: Dialog folder, as given to DialogRenderer.
+        cache: Where artifacts are stored.
+        render: Turns a line into its artifact, called from the worker threads.
+        workers: Size of the thread pool, ignored if an executor is given.
+        executor: Pool to render on, e.g. a ProcessPoolExecutor for CPU
+            bound renderers, which must then be picklable.
+        prune: Delete artifacts of lines that no longer exist.
+    """
+    start = time.perf_counter()
+    report = PrerenderReport()
+    dialogs = enumerate_lines(directory)
+    manifest: Dict[str, List[str]] = {}
+    pending: Dict[str, str] = {}  # key -> text
+    seen: Set[str] = set()
+    for name, templates in dialogs.items():
+        report.dialogs += 1
+        keys = []
+        for template in templates:
+            report.lines += 1
+            if template.has_slots:
+                if template.text not in report.skipped:
+                    report.skipped.append(template.text)
+                continue
+            key = cache.key(template.text)
+            keys.append(key)
+            if key in seen:
+                continue
+            seen.add(key)
+            if cache.get(template.text) is None:
+                pending[key] = template.text
+            else:
+                report.cached += 1
+        manifest[name] = keys
+    report.unique = len(seen)
+
+    pool = executor or ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {key: pool.submit(render, text) for key, text in pending.items()}
+        for key, future in futures.items():
+            text = pending[key]
+            try:
+                cache.put(text, future.result())
+                report.rendered += 1
+            except Exception as e:  # one bad line doesn't stop the run
+                report.failed[text] = repr(e)
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    cache.write_manifest(manifest)
+    if prune:
+        report.pruned = cache.prune(seen)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+    from text_engine.utils import load_object
+
+    parser = argparse.ArgumentParser(description="pre-render every dialog line, e.g. to speech")
+    parser.add_argument("directory", help="dialog folder, e.g. eldritch_escape/en/dialogs")
+    parser.add_argument("--cache", required=True, help="artifact cache folder")
+    parser.add_argument("--renderer", default="text_engine.prerender:stub_render",
+                        help="module:callable turning a line into bytes (default: store the text)")
+    parser.add_argument("--extension", default=".wav", help="artifact file extension")
+    parser.add_argument("--salt", default="", help="mixed into the cache keys, e.g. the voice name")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--prune", action="store_true", help="delete artifacts of removed lines")
+    args = parser.parse_args()
+
+    result = prerender(args.directory, ArtifactCache(args.cache, args.extension, args.salt),
+                       load_object(args.renderer), workers=args.workers, prune=args.prune)
+    print(f"{result.dialogs} dialogs, {result.lines} lines, {result.unique} unique: "
+          f"{result.rendered} rendered, {result.cached} cached, {len(result.skipped)} with slots skipped, "
+          f"{len(result.failed)} failed, {result.pruned} pruned in {result.seconds:.2f}s")
+    for text, error in result.failed.items():
+        print(f"ERROR {text!r}: {error}")
+    raise SystemExit(1 if result.failed else 0)
@@ -0,0 +1,229 @@
+"""on demand sampling profiler for live games
+
+nothing is hooked or traced until a profile is requested, so profiling
+costs nothing while idle. A requested profile runs a background thread
+that samples the stacks of every thread playing a turn (inside
+IFGameEngine.begin/turn/finish) for a fixed window and writes them in the
+collapsed stack format read by flamegraph.pl, speedscope and others
+
+every stack is labelled by the engine phase its innermost engine frame
+belongs to, the label is the root frame of the stack:
+
+    prediction  matching the utterance to an intent
+    handler     intent handlers, and picking the scene object
+    dialog      rendering dialogs and texts
+    output      printing, output sinks and on_print
+    callbacks   game handlers (on_start, end_turn...), win/loss checks and scheduled events
+    checkpoints recording undo checkpoints and restoring them
+    engine      the turn loop itself
+
+start a profile from code with ``start_profile()``, or call
+``install_signal_handler()`` once and send the process a signal:
+
+    kill -USR2 <pid>
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+_PHASES: Optional[Dict[Any, str]] = None  # code object -> phase
+_ROOTS: Optional[set] = None  # code objects of the turn loop entry points
+
+
+def _phase_codes() -> None:
+    # built on first profile, importing this module does not load the engine
+    global _PHASES, _ROOTS
+    if _PHASES is not None:
+        return
+    from text_engine.checkpoints import CheckpointRing
+    from text_engine.dialog import DialogRenderer, DialogTemplate
+    from text_engine.engine import IFGameEngine, GameIntents, GameObject, GameScene
+    from text_engine.intents import IntentEngine
+    from text_engine.output import BufferedSink, OutputSink
+    from text_engine.routing import SceneRouter
+    from text_engine.scheduler import CachedCheck, TurnScheduler
+
+    phases = {
+        "prediction": [IntentEngine.resolve, IntentEngine.calc_intent, IntentEngine.calc_intents,
+                       GameIntents.predict, GameIntents.parse, SceneRouter.route],
+        "handler": [GameScene.interact, GameObject.interact, SceneRouter.interact],
+        "dialog": [DialogRenderer.get_dialog, DialogRenderer.get_text, DialogRenderer.iter_text,
+                   DialogTemplate.render, IFGameEngine.get_dialog],
+        "output": [IFGameEngine.print, IFGameEngine.flush, OutputSink.write, BufferedSink.write,
+                   BufferedSink.flush],
+        "callbacks": [IFGameEngine._check, CachedCheck.__call__, TurnScheduler.run_due],
+        "checkpoints": [CheckpointRing.record, CheckpointRing.restore, IFGameEngine.undo],
+        "engine": [IFGameEngine.begin, IFGameEngine.turn, IFGameEngine.finish],
+    }
+    _PHASES = {func.__code__: phase for phase, funcs in phases.items() for func in funcs}
+    _ROOTS = {func.__code__ for func in phases["engine"]}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def classify(frames: List[Any]) -> Optional[str]:
+    """
+    Engine phase of a stack, given its frames from the innermost out.
+
+    Returns None for threads that are not playing a turn.
+    """
+    _phase_codes()
+    phase = None
+    for depth, frame in enumerate(frames):
+        code = frame.f_code
+        if phase is None and code in _PHASES:
+            phase = _PHASES[code]
+            if phase == "engine" and depth > 0:
+                phase = "callbacks"  # called straight from the turn loop, a game handler
+        if code in _ROOTS:
+            return phase
+    return None
+
+
+@dataclass
+class Profile:
+    """
+    Stacks sampled by a SamplingProfiler.
+
+    Attributes:
+        stacks: Sample count of every collapsed stack, ``phase;outer;...;inner``.
+        samples: Number of samples taken.
+        seconds: Length of the sampling window.
+        path: The file the stacks were written to.
+    """
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+    seconds: float = 0.0
+    path: Optional[str] = None
+
+    def phases(self) -> Dict[str, int]:
+        """
+        Samples per engine phase.
+        """
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[stack.split(";", 1)[0]] += count
+        return dict(counts.most_common())
+
+    def collapsed(self) -> str:
+        """
+        The stacks in collapsed format, one ``stack count`` line each.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        self.path = path
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Samples the stacks of the threads playing turns for a fixed window.
+
+    Attributes:
+        duration: Length of the sampling window, in seconds.
+        interval: Seconds between samples.
+        path: Where to write the collapsed stacks when done, None to keep them in memory only.
+        on_done: Called with the Profile when done.
+    """
+
+    def __init__(self, duration: float = 10.0, interval: float = 0.005,
+                 path: Optional[str] = None,
+                 on_done: Optional[Callable[[Profile], None]] = None):
+        super().__init__(daemon=True, name="text_engine-profiler")
+        self.duration = duration
+        self.interval = interval
+        self.path = path
+        self.on_done = on_done
+        self.profile = Profile()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        _phase_codes()
+        profile = self.profile
+        me = threading.get_ident()
+        start = time.perf_counter()
+        end = start + self.duration
+        while not self._stop_event.is_set():
+            now = time.perf_counter()
+            if now >= end:
+                break
+            self._sample(me)
+            self._stop_event.wait(self.interval)
+        profile.seconds = time.perf_counter() - start
+        if self.path:
+            profile.save(self.path)
+        if self.on_done:
+            self.on_done(profile)
+
+    def _sample(self, me: int) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            phase = classify(frames)
+            if phase is not None:
+                self.profile.stacks[";".join([phase] + [_frame_label(f.f_code) for f in reversed(frames)])] += 1
+        self.profile.samples += 1
+
+    def stop(self) -> Profile:
+        """
+        End the window early and wait for the profile.
+        """
+        self._stop_event.set()
+        self.join()
+        return self.profile
+
+
+_active: Optional[SamplingProfiler] = None
+_active_lock = threading.Lock()
+
+
+def start_profile(duration: float = 10.0, interval: float = 0.005,
+                  path: Optional[str] = None, directory: str = ".",
+                  on_done: Optional[Callable[[Profile], None]] = None) -> SamplingProfiler:
+    """
+    Profile the running games in the background, one profile at a time.
+
+    The stacks are written to ``path``, by default
+    ``<directory>/text_engine-<pid>-<time>.collapsed``. If a profile is
+    already running it is returned instead of starting another one.
+    """
+    global _active
+    with _active_lock:
+        if _active is not None and _active.is_alive():
+            return _active
+        if path is None:
+            path = os.path.join(directory, f"text_engine-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+        _active = SamplingProfiler(duration=duration, interval=interval, path=path, on_done=on_done)
+        _active.start()
+        return _active
+
+
+def install_signal_handler(signum: Optional[int] = None,
+                           duration: float = 10.0, interval: float = 0.005,
+                           directory: str = ".") -> None:
+    """
+    Start a profile whenever the process receives the signal, SIGUSR2 by default.
+
+    Must be called from the main thread. Forked workers inherit the handler,
+    each one writes its own file.
+    """
+    if signum is None:
+        signum = signal.SIGUSR2
+
+    def handler(signum, frame):
+        start_profile(duration=duration, interval=interval, directory=directory)
+
+    signal.signal(signum, handler)
@@ -0,0 +1,166 @@
+"""record game sessions and replay them deterministically at full speed
+
+a transcript holds the session seed, every input and every printed output,
+replaying feeds the inputs back into a freshly built game with the same
+seed, without any I/O, and checks the output is unchanged
+
+usable as a regression harness and as a throughput benchmark for full games
+
+    python -m text_engine.replay my_game:make_game session.json --repeat 100
+
+where ``make_game`` takes a seed and returns an IFGameEngine
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass, field, asdict, replace
+from typing import Callable, List, Optional
+
+from text_engine.engine import IFGameEngine
+from text_engine.utils import load_object
+
+GameFactory = Callable[[int], IFGameEngine]  # args: seed
+
+
+@dataclass
+class Transcript:
+    """
+    A recorded game session.
+
+    Attributes:
+        seed: Seed of the session's random stream.
+        inputs: Everything the player typed, in order.
+        outputs: Everything the game printed, in order.
+    """
+    seed: int
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+
+    def save(self, path: str) -> None:
+        """Save the transcript as json."""
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'Transcript':
+        """Load a transcript saved with save()."""
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+@dataclass
+class ReplayResult:
+    """
+    Outcome of a replay.
+
+    Attributes:
+        turns: Number of turns played.
+        seconds: Wall time spent playing.
+        mismatch: Index of the first output that differs from the
+            transcript, None if the output matched.
+        outputs: The output of the replay.
+    """
+    turns: int
+    seconds: float
+    mismatch: Optional[int] = None
+    outputs: List[str] = field(default_factory=list)
+
+    @property
+    def matched(self) -> bool:
+        return self.mismatch is None
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.seconds if self.seconds else 0.0
+
+
+def record(game: IFGameEngine) -> Transcript:
+    """
+    Start recording a game, play it as usual afterwards with game.run().
+
+    The game's on_input and on_print handlers keep working, inputs and
+    outputs are also appended to the returned transcript.
+    """
+    transcript = Transcript(seed=game.seed)
+    on_input, on_print = game.handlers.on_input, game.handlers.on_print
+
+    def recording_input(g: IFGameEngine, prompt: str) -> str:
+        utterance = on_input(g, prompt)
+        transcript.inputs.append(utterance)
+        return utterance
+
+    def recording_print(g: IFGameEngine, text: str) -> None:
+        transcript.outputs.append(text)
+        on_print(g, text)
+
+    game.handlers = replace(game.handlers, on_input=recording_input, on_print=recording_print)
+    return transcript
+
+
+def replay(factory: GameFactory, transcript: Transcript) -> ReplayResult:
+    """
+    Play a transcript again, without any I/O.
+
+    Args:
+        factory: Builds the game for the transcript's seed.
+        transcript: The recorded session.
+
+    Returns:
+        The timing of the replay and the first output mismatch, if any.
+    """
+    game = factory(transcript.seed)
+    inputs = iter(transcript.inputs)
+    outputs: List[str] = []
+    turns = 0
+
+    def replay_input(g: IFGameEngine, prompt: str) -> str:
+        nonlocal turns
+        try:
+            utterance = next(inputs)
+        except StopIteration:
+            raise EOFError from None  # ends the game like a closed stdin
+        turns += 1
+        return utterance
+
+    game.handlers = replace(game.handlers, on_input=replay_input,
+                            on_print=lambda g, text: outputs.append(text))
+    start = time.perf_counter()
+    game.run()
+    seconds = time.perf_counter() - start
+
+    mismatch = None
+    for idx in range(max(len(outputs), len(transcript.outputs))):
+        if idx >= len(outputs) or idx >= len(transcript.outputs) or \
+                outputs[idx] != transcript.outputs[idx]:
+            mismatch = idx
+            break
+    return ReplayResult(turns=turns, seconds=seconds,
+                        mismatch=mismatch, outputs=outputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="replay recorded game transcripts")
+    parser.add_argument("factory", help="module:callable building the game from a seed")
+    parser.add_argument("transcripts", nargs="+", help="transcript json files")
+    parser.add_argument("--repeat", type=int, default=1, help="replays per transcript")
+    args = parser.parse_args()
+
+    factory = load_object(args.factory)
+    failed = False
+    for path in args.transcripts:
+        transcript = Transcript.from_file(path)
+        turns, seconds = 0, 0.0
+        for _ in range(args.repeat):
+            result = replay(factory, transcript)
+            turns += result.turns
+            seconds += result.seconds
+            if not result.matched:
+                failed = True
+                idx = result.mismatch
+                expected = transcript.outputs[idx] if idx < len(transcript.outputs) else "<end of output>"
+                got = result.outputs[idx] if idx < len(result.outputs) else "<end of output>"
+                print(f"{path}: output {idx} differs\n  expected: {expected!r}\n  got:      {got!r}")
+                break
+        else:
+            print(f"{path}: ok, {turns} turns in {seconds:.3f}s, {turns / seconds:.0f} turns/s")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,147 @@
+from typing import Dict, List, Optional, Tuple
+
+from text_engine.fuzzy import FuzzyIndex
+from text_engine.intents import Keyword, KeywordIntent, IntentEngine, KeywordMatcher, DEBUG, samples_generation
+
+
+class SceneRouter:
+    """
+    Routes an utterance within a scene in a single keyword scan.
+
+    The keywords of the scene intents, every object's name and the object
+    intents are compiled into one KeywordMatcher. Each utterance is scanned
+    once and the result decides both the target object and the intent, so
+    the cost of a turn depends on the length of the utterance, not on how
+    many objects the scene holds.
+
+    Routing follows GameScene.interact: a scene intent scoring above 0.5
+    wins, otherwise an object named in the utterance gets the focus
+    (scene.active_object is updated), otherwise the already active object
+    handles the utterance. When several objects are named the active object
+    keeps the focus if it is one of them, else the first one in scene order
+    gets it.
+
+    The table is rebuilt whenever an intent engine publishes a new index,
+    objects are added to or removed from the scene or keyword samples are
+    edited, call invalidate() after replacing objects or their name
+    keywords in place.
+
+    Utterances are normalized like the scene's intent engines do, so those
+    engines must all use the same normalizer.
+
+    With ``fuzzy`` enabled, utterances that reach neither an intent nor an
+    object are corrected against the whole scene vocabulary, object names
+    included, and routed again with scores scaled by ``fuzzy_penalty``.
+    """
+
+    def __init__(self, fuzzy: bool = False, max_edit_distance: int = 1,
+                 fuzzy_penalty: float = 0.75):
+        self.fuzzy = fuzzy
+        self.max_edit_distance = max_edit_distance
+        self.fuzzy_penalty = fuzzy_penalty
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._keywords: Dict[int, Keyword] = {}
+        self._matcher: Optional[KeywordMatcher] = None
+        self._fuzzy_index: Optional[FuzzyIndex] = None
+        self._names: Dict[int, int] = {}  # name keyword id -> first object using it
+
+    @staticmethod
+    def _engines(scene: 'GameScene') -> List[IntentEngine]:
+        engines = []
+        if scene.intents:
+            engines.append(scene.intents.parser)
+        engines += [obj.intent_handlers.parser for obj in scene.game_objects]
+        return engines
+
+    @staticmethod
+    def _signature_of(scene: 'GameScene') -> Tuple[int, int, int]:
+        return id(scene.game_objects), len(scene.game_objects), samples_generation()
+
+    def invalidate(self) -> None:
+        """
+        Rebuild the keyword table on the next turn.
+        """
+        self._signature = None
+
+    def compile(self, scene: 'GameScene') -> None:
+        """
+        Build the keyword table for a scene.
+        """
+        signature = self._signature_of(scene)
+        keywords = {}
+        engines = self._engines(scene)
+        for engine in engines:
+            engine.sync_keywords()  # edited samples are compiled in the engine before the table
+            engine.subscribe(self)
+            keywords.update(engine.index.keywords.items())
+        for obj in scene.game_objects:
+            keywords[id(obj.name)] = obj.name
+        normalizers = {engine.normalizer for engine in engines}
+        if len(normalizers) > 1:
+            raise ValueError("the intent engines of a routed scene must share the same normalizer")
+        self._keywords = keywords
+        self._matcher = KeywordMatcher(keywords, normalizers.pop() if normalizers else None)
+        self._fuzzy_index = None  # built on first use
+        self._names = {}
+        for idx, obj in enumerate(scene.game_objects):
+            self._names.setdefault(id(obj.name), idx)
+        self._signature = signature
+        if DEBUG:
+            print(f"   - DEBUG: compiled scene router: {len(keywords)} keywords")
+
+    def route(self, scene: 'GameScene',
+              utterance: str) -> Tuple[int, Optional[KeywordIntent], float, str]:
+        """
+        Decide the target and intent for an utterance.
+
+        Returns:
+            A tuple of the target object index (-1 for the scene itself),
+            the matched intent (if any), its confidence score and the
+            utterance it matched, with typos corrected.
+        """
+        if self._signature != self._signature_of(scene):
+            self.compile(scene)
+        target, intent, score, resolved = self._route(scene, utterance)
+        if intent is None and self.fuzzy:
+            if self._fuzzy_index is None:
+                self._fuzzy_index = FuzzyIndex.from_keywords(self._keywords, self.max_edit_distance)
+            corrected = self._fuzzy_index.correct(utterance)
+            if corrected != utterance:
+                fuzzy_target, fuzzy_intent, fuzzy_score, resolved = self._route(scene, corrected)
+                if fuzzy_intent is not None or (target == -1 and fuzzy_target != -1):
+                    return fuzzy_target, fuzzy_intent, fuzzy_score * self.fuzzy_penalty, resolved
+        return target, intent, score, resolved
+
+    def _route(self, scene: 'GameScene',
+               utterance: str) -> Tuple[int, Optional[KeywordIntent], float, str]:
+        matched = self._matcher.match(utterance)
+
+        if scene.intents:
+            intent, score, resolved = scene.intents.parser.resolve(utterance, matched=matched)
+            if score > 0.5:
+                return -1, intent, score, resolved
+
+        named = {self._names[kid] for kid in matched if kid in self._names}
+        if not named or scene.active_object in named:
+            target = scene.active_object
+        else:
+            target = min(named)
+        if target == -1 or target >= len(scene.game_objects):
+            return -1, None, 0.0, utterance
+        obj = scene.game_objects[target]
+        intent, score, resolved = obj.intent_handlers.parser.resolve(utterance, matched=matched)
+        return target, intent, score, resolved
+
+    def interact(self, scene: 'GameScene', game: 'IFGameEngine', utterance: str) -> str:
+        """
+        Process user interaction within the scene, see GameScene.interact
+        """
+        target, intent, score, utterance = self.route(scene, utterance)
+        if target == -1:
+            if intent is not None:
+                return intent.handler(game, utterance)
+            return scene.description
+        scene.active_object = target
+        if score < 0.5:
+            return scene.game_objects[target].default_dialog
+        return intent.handler(game, utterance)
@@ -0,0 +1,419 @@
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+DEBUG = False  # just a helper during development
+
+# plain data attributes that make up a scene's state when it doesn't declare state_fields
+STATE_TYPES = (type(None), bool, int, float, str, list, tuple, dict, set)
+
+_REMOVED = object()  # tombstone left in SceneRegistry._keys by remove
+
+
+def _attributes(obj: Any) -> Dict[str, Any]:
+    """instance attributes, both from __dict__ and __slots__"""
+    attrs = dict(getattr(obj, "__dict__", {}))
+    for cls in type(obj).__mro__:
+        slots = getattr(cls, "__slots__", ())
+        for name in [slots] if isinstance(slots, str) else slots:
+            if name not in attrs and hasattr(obj, name):
+                attrs[name] = getattr(obj, name)
+    return attrs
+
+
+def _is_plain(value: Any) -> bool:
+    """plain data, containers only hold plain data too (e.g. not the list of game objects)"""
+    if isinstance(value, dict):
+        return all(_is_plain(k) and _is_plain(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return all(_is_plain(v) for v in value)
+    return isinstance(value, STATE_TYPES)
+
+
+def state_fields(scene: 'GameScene', fields: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Names of the attributes making up the state of a scene.
+
+    Args:
+        scene: The scene.
+        fields: Attribute names, defaults to the scene's ``state_fields``
+            or else every attribute holding plain data.
+    """
+    fields = fields or getattr(scene, "state_fields", None)
+    if fields is None:
+        return [k for k, v in _attributes(scene).items() if _is_plain(v)]
+    return list(fields)
+
+
+def scene_state(scene: 'GameScene', fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Snapshot the mutable state of a scene.
+
+    Args:
+        scene: The scene to snapshot.
+        fields: Attribute names to snapshot, see state_fields for the default.
+
+    Returns:
+        A deep copy of the selected attributes.
+    """
+    return {k: copy.deepcopy(getattr(scene, k)) for k in state_fields(scene, fields)}
+
+
+def restore_scene_state(scene: 'GameScene', state: Dict[str, Any]) -> None:
+    """
+    Restore a snapshot taken with scene_state.
+    """
+    for k, v in state.items():
+        setattr(scene, k, copy.deepcopy(v))
+
+
+@dataclass
+class SceneLoader:
+    """
+    Builds a scene the first time it is activated.
+
+    Attributes:
+        factory: Callable that builds the scene.
+        adjacent: Keys of scenes reachable from this one, prefetched on activation.
+        state_fields: Attributes snapshotted when the scene is unloaded,
+            see scene_state for the default.
+    """
+    factory: Callable[[], 'GameScene']
+    adjacent: List[Hashable] = field(default_factory=list)
+    state_fields: Optional[List[str]] = None
+
+
+class SceneRegistry:
+    """
+    Keyed collection of game scenes.
+
+    Scenes are looked up by key or by instance in O(1). Scenes can also be
+    registered as SceneLoaders, built on first use and unloaded again, with
+    their state snapshotted, once the loaded scenes exceed ``budget``.
+
+    Integers always refer to a position, like in a list, so scene keys
+    should be names (strings) rather than numbers. Removing a scene is O(1),
+    it leaves a tombstone in its place, the positions of the scenes after
+    it are renumbered in one pass the next time a position is needed.
+
+    Attributes:
+        budget: Maximum total cost of loaded lazy scenes, None for no limit.
+        cost: Callable returning the cost of a loaded scene, 1 per scene by default.
+        prefetch: Build adjacent scenes in a background thread on activation,
+            a single thread builds the adjacent scenes of the last activated
+            scene, those of scenes the player already left are skipped.
+    """
+
+    def __init__(self, scenes: Optional[Iterable['GameScene']] = None,
+                 budget: Optional[int] = None,
+                 cost: Callable[['GameScene'], int] = lambda scene: 1,
+                 prefetch: bool = False):
+        self.budget = budget
+        self.cost = cost
+        self.prefetch = prefetch
+        self._keys: List[Hashable] = []  # in order, with _REMOVED tombstones
+        self._positions: Dict[Hashable, int] = {}  # key -> index in _keys
+        self._removed = 0  # tombstones in _keys
+        self._scenes: Dict[Hashable, 'GameScene'] = {}  # always loaded
+        self._loaders: Dict[Hashable, SceneLoader] = {}
+        self._loaded: 'OrderedDict[Hashable, GameScene]' = OrderedDict()  # lazy scenes, LRU order
+        self._snapshots: Dict[Hashable, Dict[str, Any]] = {}
+        self._by_id: Dict[int, Hashable] = {}
+        self._lock = threading.RLock()
+        self._build_locks: Dict[Hashable, threading.Lock] = {}
+        self._active: Optional[Hashable] = None  # never unloaded
+        self._prefetching: List[Hashable] = []  # adjacent scenes still to build, replaced on activation
+        self._prefetcher: Optional[threading.Thread] = None
+        for scene in scenes or []:
+            self.add(scene)
+
+    def add(self, scene: 'GameScene', key: Optional[Hashable] = None) -> Hashable:
+        """
+        Add a scene instance, does nothing if the scene is already registered.
+
+        Returns:
+            The key of the scene.
+        """
+        with self._lock:
+            if id(scene) in self._by_id:
+                return self._by_id[id(scene)]
+            # not an int, ints are positions
+            key = ("scene", id(scene)) if key is None else key
+            self._add_key(key)
+            self._scenes[key] = scene
+            self._by_id[id(scene)] = key
+            return key
+
+    def add_loader(self, key: Hashable, loader: SceneLoader) -> Hashable:
+        """
+        Add a scene that is only built when first needed.
+        """
+        with self._lock:
+            self._add_key(key)
+            self._loaders[key] = loader
+            return key
+
+    def _add_key(self, key: Hashable) -> None:
+        if key in self._scenes or key in self._loaders:
+            raise KeyError(f"duplicate scene key: {key}")
+        self._positions[key] = len(self._keys)
+        self._keys.append(key)
+
+    def _compact(self) -> None:
+        """drop the tombstones of removed scenes and renumber positions, call with the lock held"""
+        if not self._removed:
+            return
+        self._keys = [key for key in self._keys if key is not _REMOVED]
+        self._positions = {key: idx for idx, key in enumerate(self._keys)}
+        self._removed = 0
+
+    def remove(self, scene: Union[int, Hashable, 'GameScene']) -> None:
+        """
+        Remove a scene by position, key or instance.
+        """
+        with self._lock:
+            key = self.key_of(scene)
+            self._keys[self._positions.pop(key)] = _REMOVED
+            self._removed += 1
+            if self._removed * 2 > len(self._keys):  # amortized, keeps _keys at most twice the scenes
+                self._compact()
+            instance = self._scenes.pop(key, None)
+            if instance is None:
+                instance = self._loaded.pop(key, None)
+            if instance is not None:
+                self._by_id.pop(id(instance), None)
+            self._loaders.pop(key, None)
+            self._snapshots.pop(key, None)
+
+    def key_of(self, scene: Union[int, Hashable, 'GameScene']) -> Hashable:
+        """
+        Resolve a position, key or scene instance to its key.
+        """
+        if isinstance(scene, int):
+            if self._removed:
+                with self._lock:
+                    self._compact()
+            return self._keys[scene]
+        key = self._by_id.get(id(scene))
+        if key is not None:
+            return key
+        try:
+            if scene in self._scenes or scene in self._loaders:
+                return scene
+        except TypeError:  # unhashable, an unregistered scene instance
+            pass
+        raise KeyError(f"unknown scene: {scene}")
+
+    def get(self, key: Hashable) -> 'GameScene':
+        """
+        Get a scene by key, building it if needed.
+        """
+        scene = self._scenes.get(key)
+        if scene is not None:
+            return scene
+        scene = self._loaded.get(key)
+        if scene is None:
+            return self._load(key)
+        return scene
+
+    def activate(self, key: Hashable) -> 'GameScene':
+        """
+        Get a scene that is becoming active, marking it as most recently used.
+
+        Lazy scenes over the budget are unloaded and, if enabled, adjacent
+        scenes are prefetched in the background.
+        """
+        self._active = key
+        scene = self.get(key)
+        loader = self._loaders.get(key)
+        if loader is None:
+            return scene
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+            self._evict()
+        if self.prefetch and loader.adjacent:
+            with self._lock:
+                self._prefetching = list(loader.adjacent)
+                if self._prefetcher is None:
+                    self._prefetcher = threading.Thread(target=self._prefetch, daemon=True)
+                    self._prefetcher.start()
+        return scene
+
+    def _prefetch(self) -> None:
+        while True:
+            with self._lock:
+                if not self._prefetching:
+                    self._prefetcher = None
+                    return
+                key = self._prefetching.pop(0)
+            if key in self._loaders and key not in self._loaded:
+                try:
+                    self._load(key)
+                except Exception as e:  # fails again when activated, keep prefetching the others
+                    if DEBUG:
+                        print(f"   - DEBUG: failed to prefetch scene: {key} / {e!r}")
+
+    def _load(self, key: Hashable) -> 'GameScene':
+        loader = self._loaders[key]  # KeyError for unknown keys
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:  # other scenes keep loading while this one builds
+            scene = self._loaded.get(key)
+            if scene is not None:
+                return scene
+            scene = loader.factory()
+            with self._lock:
+                snapshot = self._snapshots.pop(key, None)
+                if snapshot is not None:
+                    restore_scene_state(scene, snapshot)
+                self._loaded[key] = scene
+                self._by_id[id(scene)] = key
+                self._evict(keep=key)
+            if DEBUG:
+                print(f"   - DEBUG: loaded scene: {key}")
+        return scene
+
+    def _evict(self, keep: Optional[Hashable] = None) -> None:
+        if self.budget is None:
+            return
+        total = sum(self.cost(scene) for scene in self._loaded.values())
+        for key in list(self._loaded):
+            if total <= self.budget:
+                break
+            if key == keep or key == self._active:
+                continue
+            total -= self.cost(self._loaded[key])
+            self.unload(key)
+
+    def unload(self, key: Hashable) -> None:
+        """
+        Unload a lazy scene, its state is restored when it is built again.
+        """
+        with self._lock:
+            scene = self._loaded.pop(key, None)
+            if scene is None:
+                return
+            self._by_id.pop(id(scene), None)
+            self._snapshots[key] = scene_state(scene, self._loaders[key].state_fields)
+            if DEBUG:
+                print(f"   - DEBUG: unloaded scene: {key}")
+
+    def snapshot(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Snapshot the state of all scenes, including unloaded lazy scenes.
+
+        Scenes are identified by position, so a snapshot can be restored
+        into another registry built the same way, e.g. in another process.
+        """
+        with self._lock:
+            self._compact()
+            states = {}
+            for idx, key in enumerate(self._keys):
+                if key in self._scenes:
+                    states[idx] = scene_state(self._scenes[key])
+                elif key in self._loaded:
+                    states[idx] = scene_state(self._loaded[key], self._loaders[key].state_fields)
+                elif key in self._snapshots:
+                    states[idx] = copy.deepcopy(self._snapshots[key])
+            return states
+
+    def restore(self, states: Dict[int, Dict[str, Any]]) -> None:
+        """
+        Restore a snapshot taken with snapshot().
+
+        Lazy scenes that are not loaded keep their state until they are built.
+        """
+        with self._lock:
+            self._compact()
+            for idx, state in states.items():
+                key = self._keys[int(idx)]
+                scene = self._scenes.get(key) or self._loaded.get(key)
+                if scene is not None:
+                    restore_scene_state(scene, state)
+                else:
+                    self._snapshots[key] = copy.deepcopy(state)
+
+    def loaded_items(self) -> List[Tuple[Hashable, 'GameScene', Optional[List[str]]]]:
+        """
+        Get the key, instance and declared state fields of every scene in
+        memory, the fields are None unless given to the scene's SceneLoader.
+        """
+        with self._lock:
+            items = [(key, scene, None) for key, scene in self._scenes.items()]
+            items += [(key, scene, self._loaders[key].state_fields) for key, scene in self._loaded.items()]
+            return items
+
+    def unloaded_states(self) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        Get the snapshotted state of every unloaded lazy scene, by key.
+
+        The snapshots are the registry's own, do not modify them.
+        """
+        with self._lock:
+            return dict(self._snapshots)
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Drop a lazy scene and its state, it is built from scratch when needed again.
+        """
+        with self._lock:
+            if key not in self._loaders:
+                return
+            scene = self._loaded.pop(key, None)
+            if scene is not None:
+                self._by_id.pop(id(scene), None)
+            self._snapshots.pop(key, None)
+
+    def is_loaded(self, key: Hashable) -> bool:
+        """
+        Check if a scene is currently in memory.
+        """
+        return key in self._scenes or key in self._loaded
+
+    def loaded(self) -> List['GameScene']:
+        """
+        Get all scenes currently in memory, without building any.
+        """
+        with self._lock:
+            return list(self._scenes.values()) + list(self._loaded.values())
+
+    def keys(self) -> List[Hashable]:
+        """
+        Get all scene keys in order.
+        """
+        return [key for key in self._keys if key is not _REMOVED]
+
+    def index(self, scene: Union[Hashable, 'GameScene']) -> int:
+        """
+        Get the position of a scene, by key or instance.
+        """
+        key = self.key_of(scene)
+        with self._lock:
+            self._compact()
+            return self._positions[key]
+
+    def append(self, scene: 'GameScene') -> None:
+        """list compat, same as add"""
+        self.add(scene)
+
+    def __contains__(self, scene: Union[Hashable, 'GameScene']) -> bool:
+        try:
+            self.key_of(scene)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __getitem__(self, item: Union[int, Hashable]) -> 'GameScene':
+        return self.get(self.key_of(item))
+
+    def __iter__(self) -> Iterator['GameScene']:
+        """iterate all scenes in order, building lazy scenes as needed"""
+        for key in list(self._keys):
+            if key is not _REMOVED:
+                yield self.get(key)
+
+    def __len__(self) -> int:
+        return len(self._keys) - self._removed
@@ -0,0 +1,169 @@
+import heapq
+import threading
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Callable, List, Optional, Tuple
+
+EventCallback = Callable[['IFGameEngine'], None]
+
+
+@dataclass
+class ScheduledEvent:
+    """
+    A callback waiting for its turn.
+
+    Attributes:
+        turn: Turn at the end of which the callback fires.
+        callback: Called with the game.
+        interval: Fire again every this many turns, None to fire once.
+        cancelled: Set by cancel, the event is dropped instead of fired.
+        fired: Set once a one-shot event fired, it is no longer pending.
+    """
+    turn: int
+    callback: EventCallback
+    interval: Optional[int] = None
+    cancelled: bool = False
+    fired: bool = False
+
+
+class TurnScheduler:
+    """
+    Priority queue of callbacks keyed by turn.
+
+    Checking for due events is O(1) when nothing is due, firing k events
+    costs O(k log n), so the per turn overhead does not depend on how many
+    events are pending. Cancelled events are removed lazily and the heap
+    is compacted once they make up half of it.
+    """
+
+    def __init__(self):
+        # (turn, seq, event), seq keeps scheduling order among events due on the same turn
+        self._heap: List[Tuple[int, int, ScheduledEvent]] = []
+        self._seq = 0
+        self._cancelled = 0
+        self._lock = threading.RLock()
+
+    def schedule_at(self, turn: int, callback: EventCallback,
+                    interval: Optional[int] = None) -> ScheduledEvent:
+        """
+        Fire a callback at the end of the given turn, and every ``interval`` turns after that if given.
+        """
+        if interval is not None and interval < 1:
+            raise ValueError("interval must be at least 1 turn")
+        with self._lock:
+            self._seq += 1
+            event = ScheduledEvent(turn=turn, callback=callback, interval=interval)
+            heapq.heappush(self._heap, (turn, self._seq, event))
+            return event
+
+    def cancel(self, event: ScheduledEvent) -> None:
+        """
+        Stop an event from firing (again).
+        """
+        with self._lock:
+            if event.cancelled:
+                return
+            event.cancelled = True
+            if event.fired:  # no longer in the heap, nothing to clean up
+                return
+            self._cancelled += 1
+            if self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def due(self, turn: int) -> List[ScheduledEvent]:
+        """
+        Pop the events due by the given turn, repeating events are scheduled again.
+        """
+        fired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= turn:
+                event = heapq.heappop(self._heap)[2]
+                if event.cancelled:
+                    self._cancelled -= 1
+                    continue
+                fired.append(event)
+                if event.interval is None:
+                    event.fired = True
+                else:
+                    self._seq += 1
+                    event.turn = max(event.turn + event.interval, turn + 1)
+                    heapq.heappush(self._heap, (event.turn, self._seq, event))
+        return fired
+
+    def run_due(self, game: 'IFGameEngine', turn: int) -> int:
+        """
+        Fire the events due by the given turn.
+
+        Returns:
+            The number of callbacks called.
+        """
+        fired = self.due(turn)
+        for event in fired:
+            if not event.cancelled:  # may be cancelled by an earlier callback
+                event.callback(game)
+        return len(fired)
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+
+def depends_on(*fields: str) -> Callable[[Callable], Callable]:
+    """
+    Declare the game state a win/loss condition reads.
+
+    Fields are attribute paths from the game, e.g. ``"active_scene.sanity"``.
+    The engine only evaluates the condition again when one of them changed,
+    values are compared by value, containers shallowly.
+    """
+    def decorator(check: Callable) -> Callable:
+        check.depends_on = fields
+        return check
+    return decorator
+
+
+_MISSING = object()
+
+
+def _fingerprint(value: Any) -> Any:
+    if isinstance(value, list):
+        return list, tuple(value)
+    if isinstance(value, dict):
+        return dict, tuple(value.items())
+    if isinstance(value, set):
+        return set, frozenset(value)
+    return value
+
+
+class CachedCheck:
+    """
+    Evaluates a condition only when the fields it depends on changed.
+
+    Conditions without a ``depends_on`` declaration are always evaluated.
+    """
+
+    def __init__(self, check: Callable[['IFGameEngine'], bool]):
+        self.check = check
+        fields = getattr(check, "depends_on", None)
+        self._getters = [attrgetter(f) for f in fields] if fields is not None else None
+        self._key: Optional[Tuple] = None
+        self._result = False
+
+    def _state(self, game: 'IFGameEngine') -> Tuple:
+        values = []
+        for getter in self._getters:
+            try:
+                values.append(_fingerprint(getter(game)))
+            except AttributeError:
+                values.append(_MISSING)
+        return tuple(values)
+
+    def __call__(self, game: 'IFGameEngine') -> bool:
+        if self._getters is None:
+            return self.check(game)
+        key = self._state(game)
+        if key != self._key:
+            self._key = key
+            self._result = self.check(game)
+        return self._result
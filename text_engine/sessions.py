@@ -0,0 +1,375 @@
+"""fair turn scheduling for many sessions sharing one process
+
+SessionScheduler plays the turns of many games on a small pool of worker
+threads. Turns of a session run one at a time and in order, sessions with
+pending turns take turns round-robin, so a player sending many commands
+only delays their own session
+
+every session gets a token bucket rate limit and a bounded queue, turns
+over either limit are rejected right away. A turn running longer than its
+time budget replies with status "timeout" and whatever it printed so far,
+the rest of its output comes with the session's next reply. Threads can't
+be interrupted, the handler keeps running and keeps its worker until it
+returns, the caller just stops waiting for it. The session then waits
+before its next turn in proportion to the overrun, so a slow game gets
+fewer turns instead of more workers
+"""
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from text_engine.engine import IFGameEngine
+from text_engine.hosting import SessionFactory, TurnResult
+from text_engine.utils import percentile
+
+
+@dataclass
+class SessionQuota:
+    """
+    Limits applied to every session.
+
+    Attributes:
+        rate: Turns per second a session may submit on average, None for no limit.
+        burst: Turns a session may submit at once on top of the rate.
+        max_queue: Turns waiting per session, further turns are rejected.
+        turn_budget: Seconds before the caller of a turn gets a timeout reply, None for no limit.
+        penalty: A session whose turn overran the budget waits this many
+            times the overrun before its next turn starts.
+    """
+    rate: Optional[float] = 5.0
+    burst: int = 10
+    max_queue: int = 8
+    turn_budget: Optional[float] = 0.5
+    penalty: float = 1.0
+
+
+@dataclass
+class SchedulerMetrics:
+    """
+    Snapshot of a SessionScheduler.
+
+    Attributes:
+        sessions: Open sessions.
+        queued: Turns waiting, all sessions together.
+        queue_depths: Turns waiting per session, only sessions with any.
+        ready: Sessions waiting for a worker.
+        delayed: Sessions waiting out a penalty.
+        running: Turns being played.
+        completed: Turns played.
+        rate_limited: Turns rejected by the rate limit.
+        queue_full: Turns rejected because their session's queue was full.
+        timeouts: Turns that overran their budget.
+        p50: Median seconds from submitting a turn to its reply, over recent turns.
+        p99: 99th percentile of the same.
+    """
+    sessions: int = 0
+    queued: int = 0
+    queue_depths: Dict[str, int] = field(default_factory=dict)
+    ready: int = 0
+    delayed: int = 0
+    running: int = 0
+    completed: int = 0
+    rate_limited: int = 0
+    queue_full: int = 0
+    timeouts: int = 0
+    p50: float = 0.0
+    p99: float = 0.0
+
+
+class _Session:
+    def __init__(self, session_id: str, game: IFGameEngine, burst: int, now: float):
+        self.session_id = session_id
+        self.game = game
+        self.queue: Deque[Tuple[Optional[str], Future, float]] = deque()  # utterance (None closes), reply, submit time
+        self.tokens = float(burst)
+        self.refilled = now
+        self.busy = False  # a turn is being played, or the session is queued for a worker
+        self.not_before = 0.0  # penalty for overrunning the turn budget, no turn starts earlier
+        self.output: List[str] = []
+        self.output_lock = threading.Lock()
+
+    def print(self, game: IFGameEngine, text: str) -> None:
+        with self.output_lock:
+            self.output.append(text)
+
+    def take_output(self) -> List[str]:
+        with self.output_lock:
+            output, self.output = self.output, []
+        return output
+
+
+class _Ticket:
+    # a turn being played, resolved by the worker or by the watchdog at its deadline
+    __slots__ = ("session", "reply", "submitted", "started", "timed_out")
+
+    def __init__(self, session: _Session, reply: Future, submitted: float, started: float):
+        self.session = session
+        self.reply = reply
+        self.submitted = submitted
+        self.started = started
+        self.timed_out = False
+
+
+class SessionScheduler:
+    """
+    Plays game sessions on worker threads with fair turn scheduling.
+
+    Methods are thread safe. ``submit`` returns a Future, ``turn`` waits for it.
+
+    Attributes:
+        factory: Builds the game of a session.
+        n_workers: Number of worker threads.
+        quota: Limits applied to every session.
+    """
+
+    def __init__(self, factory: SessionFactory, workers: int = 4,
+                 quota: Optional[SessionQuota] = None, latency_window: int = 10000,
+                 clock=time.monotonic):
+        self.factory = factory
+        self.n_workers = workers
+        self.quota = quota or SessionQuota()
+        self.clock = clock
+        self._sessions: Dict[str, _Session] = {}
+        self._opening: Set[str] = set()  # ids of sessions whose game is starting
+        self._ready: Deque[_Session] = deque()
+        self._delayed: List[Tuple[float, int, _Session]] = []  # (ready at, seq, session) heap
+        self._deadlines: List[Tuple[float, int, _Ticket]] = []  # (deadline, seq, ticket) heap
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # workers wait on it
+        self._watchdog_cond = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._running = 0
+        self._completed = 0
+        self._rate_limited = 0
+        self._queue_full = 0
+        self._timeouts = 0
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+
+    def start(self) -> 'SessionScheduler':
+        """Start the worker threads."""
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.n_workers)]
+        if self.quota.turn_budget is not None:
+            self._threads.append(threading.Thread(target=self._watch, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the workers once the turns being played finish, open sessions are discarded."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            self._watchdog_cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        with self._cond:
+            for session in self._sessions.values():
+                self._abort(session, "closed")
+            self._sessions.clear()
+            self._ready.clear()
+            self._delayed = []
+            self._deadlines = []
+
+    def __enter__(self) -> 'SessionScheduler':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def open(self, session_id: str, seed: Optional[int] = None) -> TurnResult:
+        """
+        Start a game for a new session.
+
+        Returns:
+            The game's opening output.
+        """
+        with self._cond:
+            if session_id in self._sessions or session_id in self._opening:
+                raise KeyError(f"session already open: {session_id}")
+            self._opening.add(session_id)  # claims the id while the game starts
+        try:
+            game = self.factory(session_id, seed)
+            session = _Session(session_id, game, self.quota.burst, self.clock())
+            game.handlers = replace(game.handlers, on_print=session.print)
+            game.begin()
+            game.flush()
+            running = game.running.is_set()
+        except BaseException:
+            with self._cond:
+                self._opening.discard(session_id)
+            raise
+        with self._cond:
+            self._opening.discard(session_id)
+            if running:
+                self._sessions[session_id] = session
+        return TurnResult(output=session.take_output(), running=running)
+
+    def submit(self, session_id: str, utterance: str) -> 'Future[TurnResult]':
+        """
+        Queue a turn of a session.
+
+        Turns over the session's rate limit or queue size are not queued,
+        their reply is ready right away with status "rate_limited" or
+        "queue_full". Raises KeyError for sessions that are not open.
+        """
+        return self._submit(session_id, utterance)
+
+    def turn(self, session_id: str, utterance: str) -> TurnResult:
+        """
+        Play a turn of a session and wait for the reply, the session is closed once the game ends.
+        """
+        return self.submit(session_id, utterance).result()
+
+    def close(self, session_id: str) -> TurnResult:
+        """
+        End a session's game early, after the turns already queued.
+        """
+        return self._submit(session_id, None).result()
+
+    def sessions(self) -> List[str]:
+        """Open sessions."""
+        with self._cond:
+            return list(self._sessions)
+
+    def metrics(self) -> SchedulerMetrics:
+        """Queue depths, rejections and latency percentiles."""
+        with self._cond:
+            depths = {sid: len(s.queue) for sid, s in self._sessions.items() if s.queue}
+            latencies = list(self._latencies)
+            return SchedulerMetrics(sessions=len(self._sessions), queued=sum(depths.values()),
+                                    queue_depths=depths, ready=len(self._ready),
+                                    delayed=len(self._delayed), running=self._running,
+                                    completed=self._completed, rate_limited=self._rate_limited,
+                                    queue_full=self._queue_full, timeouts=self._timeouts,
+                                    p50=percentile(latencies, 50), p99=percentile(latencies, 99))
+
+    def _submit(self, session_id: str, utterance: Optional[str]) -> 'Future[TurnResult]':
+        reply = Future()
+        now = self.clock()
+        quota = self.quota
+        with self._cond:
+            session = self._sessions[session_id]
+            if utterance is not None:
+                if quota.rate is not None:
+                    session.tokens = min(quota.burst, session.tokens + (now - session.refilled) * quota.rate)
+                    session.refilled = now
+                    if session.tokens < 1:
+                        self._rate_limited += 1
+                        reply.set_result(TurnResult(running=True, status="rate_limited"))
+                        return reply
+                if len(session.queue) >= quota.max_queue:
+                    self._queue_full += 1
+                    reply.set_result(TurnResult(running=True, status="queue_full"))
+                    return reply
+                if quota.rate is not None:
+                    session.tokens -= 1
+            session.queue.append((utterance, reply, now))
+            if not session.busy:
+                session.busy = True
+                self._schedule(session, now)
+        return reply
+
+    def _schedule(self, session: _Session, now: float) -> None:
+        # called with the lock held, queues a session with pending turns for a worker
+        if session.not_before > now:
+            self._seq += 1
+            heapq.heappush(self._delayed, (session.not_before, self._seq, session))
+        else:
+            self._ready.append(session)  # back of the line, round-robin
+        self._cond.notify()
+
+    def _next(self) -> Optional[_Session]:
+        # called with the lock held, waits for a session with a turn to play
+        while not self._stopping:
+            now = self.clock()
+            while self._delayed and self._delayed[0][0] <= now:
+                self._ready.append(heapq.heappop(self._delayed)[2])
+            if self._ready:
+                return self._ready.popleft()
+            self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                session = self._next()
+                if session is None:
+                    return
+                utterance, reply, submitted = session.queue.popleft()
+                ticket = _Ticket(session, reply, submitted, self.clock())
+                self._running += 1
+                if utterance is not None and self.quota.turn_budget is not None:
+                    self._seq += 1
+                    heapq.heappush(self._deadlines, (ticket.started + self.quota.turn_budget, self._seq, ticket))
+                    self._watchdog_cond.notify_all()
+            self._play(ticket, utterance)
+
+    def _play(self, ticket: _Ticket, utterance: Optional[str]) -> None:
+        session = ticket.session
+        game = session.game
+        try:
+            if utterance is None:
+                running = False
+            else:
+                running = game.turn(utterance)
+            if not running:
+                game.finish()
+            game.flush()
+            error = None
+        except Exception as e:  # a broken handler ends its session only
+            running, error = False, e
+        finished = self.clock()
+        with self._cond:
+            self._running -= 1
+            self._completed += 1
+            if not ticket.timed_out:
+                self._latencies.append(finished - ticket.submitted)
+                if error is not None:
+                    ticket.reply.set_exception(error)
+                else:
+                    ticket.reply.set_result(TurnResult(output=session.take_output(), running=running))
+            elif error is not None or not running:
+                # the caller already got a timeout reply, nothing else will collect the output
+                session.take_output()
+            if not running:
+                self._sessions.pop(session.session_id, None)
+                self._abort(session, "closed")
+                return
+            budget = self.quota.turn_budget
+            if budget is not None and finished - ticket.started > budget:
+                session.not_before = finished + (finished - ticket.started - budget) * self.quota.penalty
+            if session.queue:
+                self._schedule(session, finished)
+            else:
+                session.busy = False
+
+    def _abort(self, session: _Session, status: str) -> None:
+        # called with the lock held, answers the turns still queued
+        while session.queue:
+            _, reply, _ = session.queue.popleft()
+            reply.set_result(TurnResult(running=False, status=status))
+
+    def _watch(self) -> None:
+        with self._cond:
+            while not self._stopping:
+                now = self.clock()
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    ticket = heapq.heappop(self._deadlines)[2]
+                    if ticket.reply.done():
+                        continue
+                    ticket.timed_out = True
+                    self._timeouts += 1
+                    self._latencies.append(now - ticket.submitted)
+                    # what it printed so far, the rest comes with the session's next reply
+                    ticket.reply.set_result(TurnResult(output=ticket.session.take_output(),
+                                                       running=True, status="timeout"))
+                # finished turns stay in the heap until their deadline, they are skipped above
+                self._watchdog_cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
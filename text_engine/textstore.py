@@ -0,0 +1,167 @@
+import mmap
+import os.path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _Mapping:
+    # one mapping of a file, replaced as a whole when the file changes
+    __slots__ = ("key", "data", "paragraphs", "pages")
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty files can't be mapped
+                self.data = b""
+        self.paragraphs: List[Tuple[int, int]] = []
+        self.pages: List[Tuple[int, int]] = []
+        self._index()
+
+    def _index(self) -> None:
+        data = self.data
+        first = 0  # paragraph starting the current page
+        pos, size = 0, len(data)
+        while pos < size:
+            end = data.find(b"\n", pos)
+            if end == -1:
+                end = size
+            line_end = end
+            while line_end > pos and data[line_end - 1:line_end] in (b"\r", b" ", b"\t"):
+                line_end -= 1
+            if line_end > pos:
+                self.paragraphs.append((pos, line_end))
+            elif first < len(self.paragraphs):  # blank line ends the page
+                self.pages.append((first, len(self.paragraphs)))
+                first = len(self.paragraphs)
+            pos = end + 1
+        if first < len(self.paragraphs):
+            self.pages.append((first, len(self.paragraphs)))
+
+    def decode(self, start: int, end: int) -> str:
+        return self.data[start:end].decode("utf-8").replace("\r\n", "\n")
+
+
+class TextDocument:
+    """
+    A long-form text file (book, journal, recording...) served page by page.
+
+    The file is memory mapped and indexed once: every non-blank line is a
+    paragraph and pages are runs of paragraphs separated by blank lines.
+    Reading a page or paragraph only decodes that slice of the file.
+
+    Every read first checks the file's inode, size and mtime against the
+    mapping and maps it again if the file changed, e.g. edited in place
+    while hot reloading, so a truncated file is never read through a stale
+    mapping. A file truncated between that check and the read itself can
+    still fault, replace files atomically (write a copy, then rename it).
+
+    Attributes:
+        path: The text file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mapping = _Mapping(path)
+
+    def _current(self) -> _Mapping:
+        mapping = self._mapping
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:  # deleted, the mapped inode stays readable
+            return mapping
+        if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != mapping.key:
+            mapping = self._mapping = _Mapping(self.path)
+        return mapping
+
+    @property
+    def paragraphs(self) -> List[Tuple[int, int]]:
+        """Byte offsets (start, end) of every paragraph."""
+        return self._current().paragraphs
+
+    @property
+    def pages(self) -> List[Tuple[int, int]]:
+        """Paragraph indexes (first, last + 1) of every page."""
+        return self._current().pages
+
+    @property
+    def n_pages(self) -> int:
+        return len(self.pages)
+
+    @property
+    def n_paragraphs(self) -> int:
+        return len(self.paragraphs)
+
+    def text(self) -> str:
+        """
+        The whole file, as open().read() would return it.
+        """
+        mapping = self._current()
+        return mapping.decode(0, len(mapping.data)).replace("\r", "\n")
+
+    def paragraph(self, n: int) -> str:
+        """
+        A single paragraph, IndexError if there is no such paragraph.
+        """
+        mapping = self._current()
+        return mapping.decode(*mapping.paragraphs[n])
+
+    def page(self, n: int) -> str:
+        """
+        A single page, IndexError if there is no such page.
+        """
+        mapping = self._current()
+        first, last = mapping.pages[n]
+        return mapping.decode(mapping.paragraphs[first][0], mapping.paragraphs[last - 1][1])
+
+    def iter_paragraphs(self, page: Optional[int] = None) -> Iterator[str]:
+        """
+        Decode paragraphs one at a time, of a single page or of the whole file.
+
+        The file is checked for changes before every paragraph, if it
+        changed the iteration continues from the same paragraph number.
+        """
+        mapping = self._current()
+        first, last = mapping.pages[page] if page is not None else (0, len(mapping.paragraphs))
+        for n in range(first, last):
+            mapping = self._current()
+            if n >= len(mapping.paragraphs):
+                return
+            yield mapping.decode(*mapping.paragraphs[n])
+
+
+class TextStore:
+    """
+    Memory mapped ``.txt`` files of a folder, opened and indexed on first use.
+
+    Dropped documents are unmapped once no reader holds them anymore.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._documents: Dict[str, TextDocument] = {}
+
+    def get(self, name: str) -> TextDocument:
+        """
+        The document for ``<directory>/<name>.txt``.
+        """
+        doc = self._documents.get(name)
+        if doc is None:
+            doc = self._documents[name] = TextDocument(os.path.join(self.directory, name + ".txt"))
+        return doc
+
+    def preload(self) -> None:
+        """map and index every text file up front"""
+        for root, _, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(".txt"):
+                    name = os.path.splitext(os.path.relpath(os.path.join(root, fname), self.directory))[0]
+                    self.get(name)
+
+    def reload(self, name: Optional[str] = None) -> None:
+        """drop documents so they are mapped again on next use, all of them if no name is given"""
+        if name is None:
+            self._documents = {}
+        else:
+            self._documents.pop(name, None)
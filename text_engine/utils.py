@@ -1,12 +1,20 @@
+import importlib
 import itertools
 import re
-from typing import List
+from typing import Any, List
 
-try:
-    from quebra_frases import word_tokenize
-except ImportError:
-    def word_tokenize(text: str, *args, **kwargs) -> List[str]:
-        return text.split()
+_tokenize = None
+
+
+def word_tokenize(text: str, *args, **kwargs) -> List[str]:
+    # quebra_frases is slow to import, load it on first use
+    global _tokenize
+    if _tokenize is None:
+        try:
+            from quebra_frases import word_tokenize as _tokenize
+        except ImportError:
+            _tokenize = lambda text, *args, **kwargs: text.split()
+    return _tokenize(text, *args, **kwargs)
 
 
 def load_template_file(path: str) -> List[str]:
@@ -62,3 +70,22 @@ def expand_template(template: str) -> List[str]:
 
     # Fully expand all combinations of alternatives
     return fully_expand([template])
+
+
+def percentile(values: List[float], p: float) -> float:
+    """nearest rank percentile, p in 0-100"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def load_object(spec: str) -> Any:
+    """import the object named by a "module:attr" string, e.g. a game factory given on the command line"""
+    module, sep, name = spec.partition(":")
+    if not sep or not module or not name:
+        raise ValueError(f"expected module:attr, got {spec!r}")
+    obj = importlib.import_module(module)
+    for attr in name.split("."):
+        obj = getattr(obj, attr)
+    return obj
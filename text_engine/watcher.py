@@ -0,0 +1,128 @@
+"""watch a locale folder and hot reload changed resources into running games
+
+only the affected keywords/intents/dialogs are reloaded, IntentEngines get
+the new definitions swapped in atomically so active sessions keep playing,
+intents bundled in engine.json by IntentEngine.save_all included
+"""
+import os.path
+import threading
+from typing import Dict, List, Optional
+
+from text_engine.dialog import DialogRenderer
+from text_engine.intents import BUNDLE_FILE, IntentEngine, DEBUG
+from text_engine.utils import load_template_file
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+WATCHED_EXTENSIONS = (".voc", ".dialog", ".txt", ".json")
+
+
+class LocaleWatcher(threading.Thread):
+    """
+    Watches a locale folder for changed resource files.
+
+    inotify is used to wake up on changes when available, otherwise the
+    folder is polled every ``interval`` seconds.
+
+    Attributes:
+        directory: Root of the locale folder to watch.
+        engines: IntentEngines that receive updated keywords and intents.
+        renderers: DialogRenderers that receive updated dialogs and texts.
+    """
+
+    def __init__(self, directory: str,
+                 engines: Optional[List[IntentEngine]] = None,
+                 renderers: Optional[List[DialogRenderer]] = None,
+                 interval: float = 1.0,
+                 use_inotify: bool = True):
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.engines = engines or []
+        self.renderers = renderers or []
+        self.interval = interval
+        self.use_inotify = use_inotify and INotify is not None
+        self._stopped = threading.Event()
+        self._mtimes = self._scan()
+
+    def _scan(self) -> Dict[str, float]:
+        mtimes = {}
+        for root, _, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(WATCHED_EXTENSIONS):
+                    path = os.path.join(root, fname)
+                    try:
+                        mtimes[path] = os.stat(path).st_mtime_ns
+                    except FileNotFoundError:  # deleted while scanning
+                        continue
+        return mtimes
+
+    def poll(self) -> List[str]:
+        """
+        Check the locale folder once and reload every changed file.
+
+        Returns:
+            The paths that were reloaded.
+        """
+        mtimes = self._scan()
+        changed = [path for path, mtime in mtimes.items()
+                   if self._mtimes.get(path) != mtime]
+        self._mtimes = mtimes
+        for path in changed:
+            self.reload_file(path)
+        return changed
+
+    def reload_file(self, path: str) -> None:
+        """
+        Reload a single resource file into the watched engines and renderers.
+        """
+        name, ext = os.path.splitext(os.path.basename(path))
+        if DEBUG:
+            print(f"   - DEBUG: locale file changed: {path}")
+        if ext == ".voc":
+            samples = load_template_file(path)
+            for engine in self.engines:
+                engine.update_keyword(name, samples)
+        elif os.path.basename(path) == BUNDLE_FILE:
+            for engine in self.engines:
+                engine.reload_bundle(os.path.dirname(path))
+        elif ext == ".json":
+            intents_dir = os.path.dirname(path)
+            if os.path.basename(intents_dir) != "intents":
+                return
+            for engine in self.engines:
+                engine.reload_intent(name, directory=os.path.dirname(intents_dir))
+        else:
+            for renderer in self.renderers:
+                if not renderer.directory:
+                    continue
+                rel = os.path.relpath(path, renderer.directory)
+                if not rel.startswith(os.pardir):
+                    renderer.reload(os.path.splitext(rel)[0])
+
+    def _wait_inotify(self, inotify: 'INotify') -> None:
+        inotify.read(timeout=int(self.interval * 1000))
+        # the events only wake us up, the mtime scan decides what changed
+        self.poll()
+
+    def run(self) -> None:
+        """Watch the locale folder until stopped."""
+        if not self.use_inotify:
+            while not self._stopped.wait(self.interval):
+                self.poll()
+            return
+        inotify = INotify()
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        for root, _, _ in os.walk(self.directory):
+            inotify.add_watch(root, mask)
+        try:
+            while not self._stopped.is_set():
+                self._wait_inotify(inotify)
+        finally:
+            inotify.close()
+
+    def stop(self) -> None:
+        """Stop watching."""
+        self._stopped.set()